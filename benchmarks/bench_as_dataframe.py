@@ -0,0 +1,92 @@
+"""Benchmark of the DataFrame assembly of QueryBuilder.as_dataframe on synthetic pages of products.
+
+Compares the single-pass columnar assembly of :class:`pds.peppi.dataframe.DataFrameBuilder`
+with the previous implementation, which built the DataFrame from the list of
+property dictionaries and then unwrapped single-valued columns row by row.
+
+Usage::
+
+    python benchmarks/bench_as_dataframe.py --rows 20000 --columns 30
+"""
+import argparse
+import time
+
+import pandas as pd
+from pds.peppi.dataframe import DataFrameBuilder
+
+
+def synthetic_products(rows, columns, multi_valued_columns):
+    """Returns the (lidvid, properties) of synthetic products, as returned by the PDS Registry API."""
+    products = []
+
+    for i in range(rows):
+        properties = {f"ns:Class.ns:property_{j}": [f"value_{i}_{j}"] for j in range(columns - multi_valued_columns)}
+        properties.update(
+            {f"ns:Class.ns:multi_{j}": [f"value_{i}_{j}_a", f"value_{i}_{j}_b"] for j in range(multi_valued_columns)}
+        )
+        products.append((f"urn:nasa:pds:bench:data:product_{i}::1.0", properties))
+
+    return products
+
+
+def legacy_as_dataframe(products):
+    """Previous implementation of as_dataframe, kept as the reference of this benchmark."""
+    result_as_dict_list = [properties for _, properties in products]
+    lidvid_index = [lidvid for lidvid, _ in products]
+
+    df = pd.DataFrame.from_records(result_as_dict_list, index=lidvid_index)
+
+    for column in df.columns:
+        only_1_element = df.apply(lambda x: len(x[column]) <= 1, axis=1)  # noqa
+        if only_1_element.all():
+            df[column] = df.apply(lambda x: x[column][0], axis=1)  # noqa
+
+    return df
+
+
+def columnar_as_dataframe(products):
+    """Current implementation of as_dataframe."""
+    builder = DataFrameBuilder()
+
+    for lidvid, properties in products:
+        builder.append(lidvid, properties)
+
+    return builder.build()
+
+
+def timed(fn, products, repeat):
+    """Returns the best duration of the given number of runs of fn, and its result."""
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(products)
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+def main():
+    """Runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=20000, help="number of products")
+    parser.add_argument("--columns", type=int, default=30, help="number of properties per product")
+    parser.add_argument("--multi-valued", type=int, default=3, help="number of multi-valued properties")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    products = synthetic_products(args.rows, args.columns, args.multi_valued)
+
+    legacy_time, legacy_df = timed(legacy_as_dataframe, products, args.repeat)
+    columnar_time, columnar_df = timed(columnar_as_dataframe, products, args.repeat)
+
+    pd.testing.assert_frame_equal(legacy_df, columnar_df)
+
+    print(f"{args.rows} rows x {args.columns} columns")
+    print(f"  legacy   : {legacy_time:8.3f} s  ({args.rows / legacy_time:12,.0f} rows/s)")
+    print(f"  columnar : {columnar_time:8.3f} s  ({args.rows / columnar_time:12,.0f} rows/s)")
+    print(f"  speedup  : {legacy_time / columnar_time:8.1f} x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Benchmark of the deserialization of pages of products, as API client models and as raw records.
+
+Decodes the same synthetic response bodies with both modes of
+:class:`pds.peppi.result_set.ResultSet`: the generated ``PdsProducts`` models,
+and the :class:`pds.peppi.raw.RawProduct` records of the raw mode. Reports the
+products deserialized per second, the memory retained by the products of all
+the pages, and the peak memory used while deserializing them.
+
+Usage::
+
+    python benchmarks/bench_raw_pages.py --pages 50 --page-size 100 --properties 60
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+import pds.peppi as pep
+from pds.peppi.raw import _loads
+from pds.peppi.result_set import ResultSet
+
+
+def synthetic_page(page, page_size, properties):
+    """Returns the body of a synthetic page of products, as returned by the PDS Registry API."""
+    data = []
+
+    for i in range(page * page_size, (page + 1) * page_size):
+        lidvid = f"urn:nasa:pds:bench:data:product_{i:08d}::1.0"
+        props = {f"ns:Class.ns:property_{j}": [f"value_{i}_{j}"] for j in range(properties)}
+        props["ops:Harvest_Info.ops:harvest_date_time"] = ["2024-01-01T00:00:00.000000Z"]
+        metadata = {"label_url": f"https://pds.example/{i:08d}.xml", "node_name": "bench"}
+        data.append({"id": lidvid, "type": "Product_Observational", "metadata": metadata, "properties": props})
+
+    body = {"summary": {"hits": page_size, "limit": page_size, "took": 1}, "data": data}
+    return json.dumps(body).encode("utf-8")
+
+
+def deserialize(result_set, bodies):
+    """Deserializes all the page bodies, returns the products."""
+    products = []
+
+    for body in bodies:
+        products.extend(result_set._deserialize_page(body).data)
+
+    return products
+
+
+def measure(result_set, bodies, repeat):
+    """Returns the best duration of deserializing the pages, the memory retained by their products, and its peak."""
+    best = float("inf")
+
+    for _ in range(repeat):
+        # As timeit does, keep the garbage collector from adding noise to the timings
+        gc.collect()
+        gc.disable()
+        start = time.perf_counter()
+        products = deserialize(result_set, bodies)
+        best = min(best, time.perf_counter() - start)
+        gc.enable()
+        del products
+
+    tracemalloc.start()
+    products = deserialize(result_set, bodies)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, retained, peak, len(products)
+
+
+def main():
+    """Runs the benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50, help="number of pages")
+    parser.add_argument("--page-size", type=int, default=100, help="number of products per page")
+    parser.add_argument("--properties", type=int, default=60, help="number of properties per product")
+    parser.add_argument("--repeat", type=int, default=3, help="number of runs, the best one is reported")
+    args = parser.parse_args()
+
+    bodies = [synthetic_page(page, args.page_size, args.properties) for page in range(args.pages)]
+    result_set = ResultSet(pep.PDSRegistryClient())
+
+    print(f"{args.pages} pages x {args.page_size} products x {args.properties} properties")
+    print(f"  JSON decoder: {_loads.__module__}")
+
+    results = {}
+    for mode in ("model", "raw"):
+        result_set.raw = mode == "raw"
+        results[mode] = measure(result_set, bodies, args.repeat)
+        duration, retained, peak, rows = results[mode]
+        print(
+            f"  {mode:5s}: {duration:8.3f} s  ({rows / duration:10,.0f} rows/s)"
+            f"  retained {retained / 1024**2:7.1f} MiB  peak {peak / 1024**2:7.1f} MiB"
+        )
+
+    print(f"  speedup: {results['model'][0] / results['raw'][0]:8.1f} x")
+    print(f"  memory : {results['model'][1] / results['raw'][1]:8.1f} x less retained")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""Benchmark suite of the queries of peppi against a local mock of the PDS Registry API.
+
+Runs the main ways of consuming query results, iteration over models or raw
+records, as_dataframe and OREX spatial queries, against a
+``MockRegistry`` of the test suite started in a child process, so
+that the server does not compete with the client for the interpreter. For
+each scenario, reports the products per second, the pages per second, the
+time to the first product and the peak memory allocated by the client.
+
+Results can be saved as JSON and compared with the ones of a previous
+release, the scenarios slower or heavier than the tolerance being reported
+as regressions, with a non-zero exit status.
+
+Usage::
+
+    python benchmarks/bench_suite.py --products 20000 --latency 0.02 --json results.json
+    python benchmarks/bench_suite.py --baseline results.json --tolerance 0.15
+"""
+import argparse
+import importlib.metadata
+import json
+import multiprocessing
+import os
+import sys
+import time
+import tracemalloc
+import urllib.request
+
+import pds.peppi as pep
+
+# The mock registry is part of the tests of the repository, not of the installed package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tests.pds.peppi.mock_registry import load_fixture  # noqa: E402
+from tests.pds.peppi.mock_registry import MockRegistry  # noqa: E402
+
+
+def _serve(kwargs, urls, stop):
+    """Runs a mock registry in a child process until the stop event is set."""
+    with MockRegistry(**kwargs) as registry:
+        urls.put(registry.base_url)
+        stop.wait()
+
+
+def _stats(base_url):
+    """Returns the request and product counters of the mock registry."""
+    with urllib.request.urlopen(f"{base_url}/_stats") as response:
+        return json.load(response)
+
+
+def _consume(products):
+    """Iterates over the products, returns their number and the time to the first one."""
+    start = time.perf_counter()
+    first = None
+    n = 0
+
+    for _ in products:
+        if first is None:
+            first = time.perf_counter() - start
+        n += 1
+
+    return n, first
+
+
+def _dataframe(products):
+    """Builds the DataFrame of the products, returns its number of rows and None as time to first product."""
+    return len(products.as_dataframe()), None
+
+
+SCENARIOS = {
+    "iter": lambda client: _consume(pep.Products(client).observationals()),
+    "iter_raw": lambda client: _consume(pep.Products(client).observationals().raw()),
+    "iter_prefetch": lambda client: _consume(pep.Products(client, prefetch=2).observationals().raw()),
+    "iter_instrumented": lambda client: _consume(
+        pep.Products(pep.PDSRegistryClient(client.base_url, instrument=pep.MetricsAggregator())).observationals().raw()
+    ),
+    "iter_parallel": lambda client: _consume(pep.Products(client).observationals().raw().parallel(shards=4)),
+    "as_dataframe": lambda client: _dataframe(pep.Products(client).observationals()),
+    "orex_bbox": lambda client: _consume(pep.OrexProducts(client).within_bbox(-45.0, 45.0, 90.0, 270.0)),
+    "orex_range": lambda client: _consume(pep.OrexProducts(client).within_range(10.0)),
+}
+"""Scenarios of the suite, each one returning the number of products received and the time to the first one"""
+
+
+def run_scenario(name, base_url, repeat):
+    """Runs a scenario, returns its metrics: best of the timed runs, peak memory of an extra traced run."""
+    scenario = SCENARIOS[name]
+    best = None
+
+    for _ in range(repeat):
+        client = pep.PDSRegistryClient(base_url)
+        before = _stats(base_url)
+        start = time.perf_counter()
+        rows, first = scenario(client)
+        duration = time.perf_counter() - start
+        pages = _stats(base_url)["requests"] - before["requests"]
+
+        if best is None or duration < best["seconds"]:
+            best = {
+                "rows": rows,
+                "pages": pages,
+                "seconds": duration,
+                "rows_per_second": rows / duration,
+                "pages_per_second": pages / duration,
+                "time_to_first_product": first,
+            }
+
+    tracemalloc.start()
+    scenario(pep.PDSRegistryClient(base_url))
+    best["peak_memory"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return best
+
+
+def compare(results, baseline, tolerance):
+    """Returns the descriptions of the metrics of the results worse than the baseline beyond the tolerance."""
+    regressions = []
+    higher_is_better = {"rows_per_second": True, "time_to_first_product": False, "peak_memory": False}
+
+    for name, metrics in results.items():
+        reference = baseline.get("scenarios", {}).get(name)
+        if reference is None:
+            continue
+
+        for metric, higher in higher_is_better.items():
+            value, expected = metrics.get(metric), reference.get(metric)
+            if not value or not expected:
+                continue
+
+            ratio = value / expected if higher else expected / value
+            if ratio < 1 - tolerance:
+                regressions.append(f"{name}.{metric}: {value:,.4g} vs {expected:,.4g} ({ratio - 1:+.0%})")
+
+    return regressions
+
+
+def main():
+    """Runs the benchmark suite."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--products", type=int, default=20000, help="number of synthetic products")
+    parser.add_argument("--properties", type=int, default=20, help="number of filler properties per product")
+    parser.add_argument("--fixture", help="fixture file of products to replay instead of synthetic ones")
+    parser.add_argument("--latency", type=float, default=0.01, help="delay before each response, in seconds")
+    parser.add_argument("--max-page-size", type=int, default=10000, help="maximum number of products per page")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs, the best one is reported")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--json", help="file to save the results to")
+    parser.add_argument("--baseline", help="results of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="relative degradation reported as a regression")
+    args = parser.parse_args()
+
+    kwargs = {"latency": args.latency, "max_page_size": args.max_page_size}
+    if args.fixture:
+        kwargs["products"] = load_fixture(args.fixture)
+    else:
+        kwargs.update(n_products=args.products, n_properties=args.properties)
+
+    context = multiprocessing.get_context("spawn")
+    urls, stop = context.Queue(), context.Event()
+    server = context.Process(target=_serve, args=(kwargs, urls, stop), daemon=True)
+    server.start()
+
+    version = importlib.metadata.version("pds.peppi")
+
+    try:
+        base_url = urls.get(timeout=120)
+        results = {}
+
+        print(f"pds.peppi {version} against {base_url}, latency {args.latency} s")
+        print(f"  {'scenario':17s} {'rows':>8s} {'rows/s':>10s} {'pages/s':>8s} {'first (s)':>9s} {'peak MiB':>9s}")
+
+        for name in args.scenarios:
+            metrics = results[name] = run_scenario(name, base_url, args.repeat)
+            first = metrics["time_to_first_product"]
+            print(
+                f"  {name:17s} {metrics['rows']:8d} {metrics['rows_per_second']:10,.0f}"
+                f" {metrics['pages_per_second']:8.1f} {'-' if first is None else f'{first:.3f}':>9s}"
+                f" {metrics['peak_memory'] / 1024**2:9.1f}"
+            )
+    finally:
+        stop.set()
+        server.join(timeout=10)
+
+    report = {"version": version, "scenarios": results}
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"Compared with {baseline.get('version')}: {len(regressions)} regression(s)")
+        for regression in regressions:
+            print(f"  {regression}")
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
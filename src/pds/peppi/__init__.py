@@ -1,5 +1,15 @@
 # -*- coding: utf-8 -*-
 """PDS peppi."""
+from .cache import PageCache  # noqa
+from .client import AsyncPDSRegistryClient  # noqa
 from .client import PDSRegistryClient  # noqa
+from .context import ContextResolver  # noqa
+from .hierarchy import HierarchyWalker  # noqa
+from .instrumentation import MetricsAggregator  # noqa
 from .orex import OrexProducts  # noqa
+from .predicates import prop  # noqa
+from .products import AsyncProducts  # noqa
 from .products import Products  # noqa
+from .retry import RetryPolicy  # noqa
+from .scheduler import QueryScheduler  # noqa
+from .sync import SyncState  # noqa
@@ -0,0 +1,281 @@
+"""Persistent cache of the pages of results returned by the PDS Registry API."""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import NamedTuple
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "pds.peppi", "pages.sqlite")
+"""Default location of the page cache database"""
+
+
+class CacheStats(NamedTuple):
+    """Statistics of a PageCache."""
+
+    entries: int
+    """Number of pages currently stored."""
+
+    size: int
+    """Total size of the stored pages, in bytes."""
+
+    hits: int
+    """Number of lookups answered from the cache since it was opened."""
+
+    misses: int
+    """Number of lookups not found, or expired, since the cache was opened."""
+
+    evictions: int
+    """Number of pages removed to keep the cache under its size limit since it was opened."""
+
+
+def _enclosed(query_string: str) -> bool:
+    """Returns True if the whole query string is enclosed in a single pair of parentheses."""
+    if not (query_string.startswith("(") and query_string.endswith(")")):
+        return False
+
+    depth = 0
+    quoted = False
+
+    for i, char in enumerate(query_string):
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+            if depth == 0 and i < len(query_string) - 1:
+                return False
+
+    return True
+
+
+def normalize_query(query_string: Optional[str]) -> str:
+    """Returns the query string with its whitespaces collapsed and enclosing parentheses removed.
+
+    This is the form used to identify the pages of a query in the cache, so
+    that the query string built by a QueryBuilder and the one sent to the PDS
+    Registry API are equivalent.
+
+    """
+    normalized = " ".join((query_string or "").split())
+
+    while _enclosed(normalized):
+        normalized = normalized[1:-1].strip()
+
+    return normalized
+
+
+class PageCache:
+    """Stores the pages of results returned by the PDS Registry API in a local SQLite database.
+
+    Pages are identified by the API they were requested from, the normalized
+    query string, the projection of fields, the page size and the cursor
+    position. Each page expires after its time-to-live, and the least recently
+    used pages are evicted once the total size of the cache exceeds its limit.
+
+    A cache is used by setting it on the PDSRegistryClient the queries are run
+    with, it may be shared by several clients and threads.
+
+    """
+
+    _SCHEMA = """
+        PRAGMA journal_mode = WAL;
+        PRAGMA synchronous = NORMAL;
+        CREATE TABLE IF NOT EXISTS pages (
+            key TEXT PRIMARY KEY,
+            query TEXT NOT NULL,
+            body BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            expires REAL NOT NULL,
+            last_access REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS pages_query ON pages (query);
+        CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access);
+        CREATE TABLE IF NOT EXISTS totals (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            size INTEGER NOT NULL
+        );
+        INSERT OR IGNORE INTO totals (id, size) SELECT 0, COALESCE(SUM(size), 0) FROM pages WHERE NOT EXISTS (SELECT 1 FROM totals);
+        CREATE TRIGGER IF NOT EXISTS pages_inserted AFTER INSERT ON pages BEGIN
+            UPDATE totals SET size = size + NEW.size WHERE id = 0;
+        END;
+        CREATE TRIGGER IF NOT EXISTS pages_deleted AFTER DELETE ON pages BEGIN
+            UPDATE totals SET size = size - OLD.size WHERE id = 0;
+        END;
+    """
+    """Schema of the cache database, the total size of the pages is kept up to date by triggers"""
+
+    def __init__(self, path: str = _DEFAULT_CACHE_PATH, ttl: float = 86400.0, max_size: int = 1024**3):
+        """Opens, or creates, a page cache.
+
+        Parameters
+        ----------
+        path : str, optional
+            Path of the SQLite database file. Defaults to ``~/.cache/pds.peppi/pages.sqlite``.
+            Use ``":memory:"`` for a cache lasting only as long as this instance.
+        ttl : float, optional
+            Default time-to-live of the stored pages, in seconds. Defaults to one day.
+        max_size : int, optional
+            Maximum total size of the stored pages, in bytes. Defaults to 1 GiB.
+
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._path = path
+        self._ttl = ttl
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.executescript(self._SCHEMA)
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @staticmethod
+    def key(base_url: str, kwargs: dict) -> str:
+        """Returns the key identifying the page requested with the given arguments.
+
+        Parameters
+        ----------
+        base_url : str
+            The base endpoint URL of the PDS Registry API the page is requested from.
+        kwargs : dict
+            Arguments of the page request.
+
+        Returns
+        -------
+        The hexadecimal digest identifying the page.
+
+        """
+        normalized = {
+            "url": base_url,
+            "q": normalize_query(kwargs.get("q")),
+            "fields": sorted(set(kwargs.get("fields") or [])),
+            "sort": kwargs.get("sort"),
+            "limit": kwargs.get("limit"),
+            "search_after": kwargs.get("search_after"),
+        }
+        return hashlib.sha256(json.dumps(normalized, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Returns the body of the page stored with the given key, or None if missing or expired."""
+        now = time.time()
+
+        with self._lock:
+            row = self._connection.execute("SELECT body, expires FROM pages WHERE key = ?", (key,)).fetchone()
+
+            if row is None or row[1] <= now:
+                if row is not None:
+                    self._delete("key = ?", (key,))
+                self._misses += 1
+                return None
+
+            self._connection.execute("UPDATE pages SET last_access = ? WHERE key = ?", (now, key))
+            self._hits += 1
+
+        return row[0]
+
+    def put(self, key: str, query_string: Optional[str], body: bytes, ttl: Optional[float] = None):
+        """Stores the body of a page, evicting the least recently used pages if the cache becomes too large.
+
+        Parameters
+        ----------
+        key : str
+            Key identifying the page, as returned by `key()`.
+        query_string : str
+            The query string the page was requested with, used by `invalidate()`.
+        body : bytes
+            The body of the response to the page request.
+        ttl : float, optional
+            Time-to-live of this page in seconds, instead of the default of this cache.
+
+        """
+        if len(body) > self._max_size:
+            return
+
+        now = time.time()
+        expires = now + (self._ttl if ttl is None else ttl)
+
+        with self._lock, self._transaction():
+            self._delete("key = ?", (key,))
+            self._connection.execute(
+                "INSERT INTO pages (key, query, body, size, expires, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, normalize_query(query_string), body, len(body), expires, now),
+            )
+
+            # The total is read from the database, which other clients or processes may share
+            size = self._stored_size()
+
+            while size > self._max_size:
+                oldest = self._connection.execute("SELECT key, size FROM pages ORDER BY last_access LIMIT 1").fetchone()
+
+                if oldest is None:
+                    break
+
+                self._delete("key = ?", (oldest[0],))
+                size -= oldest[1]
+                self._evictions += 1
+
+    @contextmanager
+    def _transaction(self):
+        """Runs the statements of the context in a single transaction, locking the database for writing."""
+        self._connection.execute("BEGIN IMMEDIATE")
+
+        try:
+            yield
+        except BaseException:
+            self._connection.execute("ROLLBACK")
+            raise
+
+        self._connection.execute("COMMIT")
+
+    def _stored_size(self) -> int:
+        """Returns the total size of the stored pages, in bytes, as maintained by the triggers of the schema."""
+        return self._connection.execute("SELECT size FROM totals WHERE id = 0").fetchone()[0]
+
+    def _delete(self, where: str, parameters: tuple) -> int:
+        """Deletes the pages matching the where clause, returns their number."""
+        return self._connection.execute(f"DELETE FROM pages WHERE {where}", parameters).rowcount
+
+    def invalidate(self, query_string: Optional[str] = None) -> int:
+        """Removes the pages of a query, or all the pages if no query is given.
+
+        Parameters
+        ----------
+        query_string : str, optional
+            The query string whose pages are removed, as sent to the PDS Registry API.
+
+        Returns
+        -------
+        The number of pages removed.
+
+        """
+        with self._lock:
+            if query_string is None:
+                return self._delete("1 = 1", ())
+
+            return self._delete("query = ?", (normalize_query(query_string),))
+
+    def purge_expired(self) -> int:
+        """Removes the pages whose time-to-live has elapsed, returns their number."""
+        with self._lock:
+            return self._delete("expires <= ?", (time.time(),))
+
+    def stats(self) -> CacheStats:
+        """Returns the statistics of this cache."""
+        with self._lock:
+            entries = self._connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+            return CacheStats(entries, self._stored_size(), self._hits, self._misses, self._evictions)
+
+    def close(self):
+        """Closes the database of this cache."""
+        with self._lock:
+            self._connection.close()
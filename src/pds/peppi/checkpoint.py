@@ -0,0 +1,118 @@
+"""Checkpoints of the iteration over the results of a query, to resume it after an interruption."""
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import datetime
+from datetime import timezone
+from typing import NamedTuple
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_FORMAT_VERSION = 1
+"""Version of the format of the checkpoint files"""
+
+
+class IterationCheckpoint(NamedTuple):
+    """Position reached by the iteration over the results of a query, with the definition of the query."""
+
+    query: str
+    """Query string of the iterated query."""
+
+    query_hash: str
+    """Hash of the query, see `pds.peppi.query_builder.QueryBuilder.query_hash()`."""
+
+    fields: list
+    """Fields requested for each product, empty for all of them."""
+
+    max_products: Optional[int]
+    """Maximum number of products of the query, None for all of them."""
+
+    harvest_time: Optional[str]
+    """Harvest time of the last product consumed, the iteration resumes right after it. None if none was consumed."""
+
+    received: int
+    """Number of products consumed so far."""
+
+    hits: Optional[int]
+    """Number of products matching the query, when the checkpoint was saved."""
+
+    complete: bool
+    """True once all the products of the query have been consumed."""
+
+
+class Checkpointer:
+    """Saves the position of an iteration to a JSON file, at regular intervals, and loads it back to resume.
+
+    A checkpoint is saved once all the products of a page have been consumed,
+    every given number of pages or seconds, whichever comes first, and once
+    the iteration completes. Each save replaces the file atomically, so that a
+    process killed while saving leaves the previous checkpoint intact.
+
+    """
+
+    def __init__(self, path: str, every_pages: int = 10, every_seconds: Optional[float] = None):
+        """Creates a new Checkpointer.
+
+        Parameters
+        ----------
+        path : str
+            Path of the JSON checkpoint file.
+        every_pages : int, optional
+            Number of pages consumed between two checkpoints. Defaults to 10.
+        every_seconds : float, optional
+            Maximum time between two checkpoints, in seconds, checked once each
+            page has been consumed. Defaults to no time limit.
+
+        """
+        if every_pages < 1:
+            raise ValueError(f"every_pages must be a positive number of pages, got {every_pages}")
+
+        self.path = path
+        self.every_pages = every_pages
+        self.every_seconds = every_seconds
+        self._pages = 0
+        self._saved_at = time.monotonic()
+
+    def load(self) -> Optional[IterationCheckpoint]:
+        """Returns the checkpoint saved to the file, None if there is none."""
+        if not os.path.exists(self.path):
+            return None
+
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+
+        if state.get("version") != _FORMAT_VERSION:
+            raise ValueError(f"Checkpoint {self.path} is of unsupported version {state.get('version')}")
+
+        return IterationCheckpoint(**{field: state[field] for field in IterationCheckpoint._fields})
+
+    def page_consumed(self) -> bool:
+        """Records that all the products of a page have been consumed, returns True if a checkpoint is due."""
+        self._pages += 1
+
+        if self._pages >= self.every_pages:
+            return True
+
+        return self.every_seconds is not None and time.monotonic() - self._saved_at >= self.every_seconds
+
+    def save(self, checkpoint: IterationCheckpoint):
+        """Replaces the checkpoint saved to the file, atomically."""
+        state = dict(checkpoint._asdict(), version=_FORMAT_VERSION, saved_at=datetime.now(timezone.utc).isoformat())
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+        self._pages = 0
+        self._saved_at = time.monotonic()
+        logger.debug("Checkpoint saved to %s after %d product(s)", self.path, checkpoint.received)
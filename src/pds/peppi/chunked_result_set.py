@@ -0,0 +1,295 @@
+"""Module of the ChunkedResultSet."""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .client import AsyncPDSRegistryClient
+from .client import PDSRegistryClient
+from .result_set import AsyncResultSet
+from .sharded_result_set import ShardedResultSet
+
+logger = logging.getLogger(__name__)
+
+MAX_CHUNK_VALUES = 50
+"""Maximum number of values of a single OR clause sent to the PDS Registry API"""
+
+MAX_CHUNK_LENGTH = 4000
+"""Maximum length of a single OR clause sent to the PDS Registry API, kept well below the URL length limits"""
+
+
+def or_clauses(
+    property_name: str, values: list, max_values: int = MAX_CHUNK_VALUES, max_length: int = MAX_CHUNK_LENGTH
+):
+    """Returns the OR clauses selecting the products whose property equals any of the values, in bounded chunks.
+
+    Parameters
+    ----------
+    property_name : str
+        Name of the property, for example ``lidvid``.
+    values : list of str
+        Values to select, duplicates are ignored.
+    max_values : int, optional
+        Maximum number of values per clause.
+    max_length : int, optional
+        Maximum length of a clause, in characters, unless a single value is longer.
+
+    Returns
+    -------
+    The list of clauses, one per chunk of values.
+
+    """
+    clauses = []
+    terms = []
+    length = 0
+
+    for value in dict.fromkeys(values):
+        term = f'{property_name} eq "{value}"'
+
+        if terms and (len(terms) >= max_values or length + len(term) + 4 > max_length):
+            clauses.append(" or ".join(terms))
+            terms, length = [], 0
+
+        terms.append(term)
+        length += len(term) + 4
+
+    if terms:
+        clauses.append(" or ".join(terms))
+
+    return clauses
+
+
+def _chunk_queries(query_string, chunk_clauses):
+    """Returns the query string restricted to each chunk clause."""
+    if not query_string:
+        return list(chunk_clauses)
+
+    return [f"({query_string}) and ({clause})" for clause in chunk_clauses]
+
+
+class ChunkedResultSet(ShardedResultSet):
+    """ResultSet of a query selecting long lists of values, sent as several bounded queries.
+
+    Each chunk query combines the query string with one of the OR clauses of
+    the list-valued filter. Chunk queries are paged concurrently on a pool of
+    worker threads and their products are merged as soon as they are
+    received, each product being yielded once, whatever the number of chunks
+    it matches.
+
+    """
+
+    def __init__(self, client: PDSRegistryClient, clauses: list, max_workers: Optional[int] = 8):
+        """Constructor of the ChunkedResultSet.
+
+        Parameters
+        ----------
+        client : PDSRegistryClient
+            Client defining the connexion with the PDS Search API.
+        clauses : list of str
+            OR clauses of the list-valued filter, as returned by `or_clauses()`.
+            A chunk query is sent for each clause.
+        max_workers : int, optional
+            Maximum number of concurrent page requests. Defaults to 8.
+
+        """
+        self._chunk_clauses = list(clauses)
+        super().__init__(client, shards=max(len(self._chunk_clauses), 1), ordered=False, max_workers=max_workers)
+        self._seen: set = set()
+        self._seen_lock = threading.Lock()
+
+    def _shard_queries(self, query_string, executor):
+        """Returns the query strings of the chunks to page concurrently."""
+        logger.debug("Sending %d chunk queries", len(self._chunk_clauses))
+        return _chunk_queries(query_string, self._chunk_clauses)
+
+    def _accept(self, product):
+        """Returns True the first time a product is received, from any chunk."""
+        with self._seen_lock:
+            if product.id in self._seen:
+                return False
+
+            self._seen.add(product.id)
+            return True
+
+    def count(self, query_string=""):
+        """Returns the sum of the number of products matching each chunk, within the maximum number of products if any.
+
+        Products matching several chunks are counted once per chunk, which
+        cannot happen when the chunks select distinct LIDVIDs. The QueryBuilder
+        counts the products of the other chunk queries by fetching their LIDVIDs.
+
+        Parameters
+        ----------
+        query_string : str, optional
+            The query string to submit to the PDS API.
+
+        """
+        queries = _chunk_queries(query_string, self._chunk_clauses)
+
+        with ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="peppi-chunk") as executor:
+            hits = sum(executor.map(self._count_hits, queries))
+
+        return self._expected_hits(hits)
+
+    def reset(self):
+        """Resets internal pagination state to default, forgetting the products already yielded."""
+        super().reset()
+        self._seen = set()
+
+
+class AsyncChunkedResultSet(AsyncResultSet):
+    """AsyncResultSet of a query selecting long lists of values, sent as several bounded queries.
+
+    The chunk queries are built as for the `ChunkedResultSet` and paged
+    concurrently on the event loop, at most max_workers requests being in
+    flight at any time.
+
+    """
+
+    _QUEUE_DEPTH = 2
+    """Number of pages a chunk may fetch ahead of the consumer."""
+
+    _CHUNK_DONE = object()
+    """Sentinel put on the queue once a chunk has been exhausted."""
+
+    def __init__(self, client: AsyncPDSRegistryClient, clauses: list, max_workers: Optional[int] = 8):
+        """Constructor of the AsyncChunkedResultSet.
+
+        Parameters
+        ----------
+        client : AsyncPDSRegistryClient
+            Client defining the connexion with the PDS Search API.
+        clauses : list of str
+            OR clauses of the list-valued filter, as returned by `or_clauses()`.
+        max_workers : int, optional
+            Maximum number of concurrent page requests. Defaults to 8.
+
+        """
+        super().__init__(client)
+        self._chunk_clauses = list(clauses)
+        self._max_workers = max_workers or 1
+        self._seen: set = set()
+
+    async def _run_chunk(self, query_string, fields, out_queue, semaphore):
+        """Pages through the products of one chunk, putting each page on the output queue."""
+        kwargs = self._build_page_kwargs(query_string, fields)
+        kwargs.pop("search_after", None)
+        kwargs["limit"] = self._page_size()
+        fetched_products = 0
+
+        try:
+            while True:
+                async with semaphore:
+                    results = await self._fetch_page(kwargs)
+
+                fetched_products += len(results.data)
+
+                if results.data:
+                    await out_queue.put(results.data)
+
+                # The server may return less products than requested, the chunk ends with its hits
+                if not results.data or fetched_products >= results.summary.hits:
+                    break
+
+                kwargs["limit"] = self._page_size(fetched_products)
+                if kwargs["limit"] <= 0:
+                    break
+
+                kwargs["search_after"] = [results.data[-1].properties[self._SORT_PROPERTY][0]]
+        except Exception as err:
+            await out_queue.put(err)
+            return
+
+        await out_queue.put(self._CHUNK_DONE)
+
+    async def init_new_page(self, query_string="", fields=None):
+        """Queries all the chunks of the query concurrently and yields their products, each one once.
+
+        All the products of the query are yielded on the first call of this
+        method, nothing is yielded by subsequent calls until `reset()` is called.
+
+        Parameters
+        ----------
+        query_string : str, optional
+            The query string to submit to the PDS API.
+        fields : iterable, optional
+            Additional fields to include with the query parameters.
+
+        Yields
+        ------
+        product : pds.api_client.models.pds_product.PDSProduct
+            The next product fetched from any of the chunks.
+
+        """
+        import asyncio
+
+        if self._expected_pages is not None:
+            return
+
+        queries = _chunk_queries(query_string, self._chunk_clauses)
+        self._expected_pages = len(queries)
+        self._page_counter = 0
+
+        out_queue: asyncio.Queue = asyncio.Queue(maxsize=self._QUEUE_DEPTH * min(len(queries), self._max_workers))
+        semaphore = asyncio.Semaphore(self._max_workers)
+        tasks = [asyncio.create_task(self._run_chunk(q, fields, out_queue, semaphore)) for q in queries]
+        completed = False
+
+        try:
+            while self._page_counter < self._expected_pages:
+                item = await out_queue.get()
+
+                if item is self._CHUNK_DONE:
+                    self._page_counter += 1
+                    continue
+
+                if isinstance(item, Exception):
+                    raise item
+
+                for product in item:
+                    if product.id in self._seen:
+                        continue
+
+                    if self.max_products is not None and self._received >= self.max_products:
+                        self._page_counter = self._expected_pages
+                        completed = True
+                        return
+
+                    self._seen.add(product.id)
+                    self._received += 1
+                    yield product
+
+            completed = True
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            # Chunks cannot be resumed individually, an abandoned iteration starts over
+            if not completed:
+                self.reset()
+
+    async def count(self, query_string=""):
+        """Returns the sum of the number of products matching each chunk, within the maximum number of products if any.
+
+        Parameters
+        ----------
+        query_string : str, optional
+            The query string to submit to the PDS API.
+
+        """
+        import asyncio
+
+        semaphore = asyncio.Semaphore(self._max_workers)
+
+        async def count_hits(chunk_query):
+            async with semaphore:
+                return await self._count_hits(chunk_query)
+
+        queries = _chunk_queries(query_string, self._chunk_clauses)
+        hits = await asyncio.gather(*(count_hits(q) for q in queries))
+        return self._expected_hits(sum(hits))
+
+    def reset(self):
+        """Resets internal pagination state to default, forgetting the products already yielded."""
+        super().reset()
+        self._seen = set()
@@ -1,8 +1,11 @@
 """PDS Registry Client related classes."""
 import logging
+import threading
+from typing import Optional
 
-from pds.api_client import ApiClient
-from pds.api_client import Configuration
+from .cache import PageCache
+from .instrumentation import Instrument
+from .retry import RetryPolicy
 
 
 logger = logging.getLogger(__name__)
@@ -10,18 +13,42 @@ logger = logging.getLogger(__name__)
 _DEFAULT_API_BASE_URL = "https://pds.nasa.gov/api/search/1"
 """Default URL used when querying PDS API"""
 
+_DEFAULT_RETRY_POLICY = RetryPolicy()
+"""Default policy retrying the page requests failing with a transient error"""
+
 
 class PDSRegistryClient:
     """Used to connect and interface with the PDS Registry.
 
     Attributes
     ----------
+    base_url : str
+        The base endpoint URL of the PDS Registry API
     api_client : pds.api_client.ApiClient
-        Object used to interact with the PDS Registry API
+        Object used to interact with the PDS Registry API, created on first
+        use, as importing the generated API client takes a while
+    cache : pds.peppi.cache.PageCache
+        Cache of the pages of results, None if pages are always requested
+        from the PDS Registry API
+    retry_policy : pds.peppi.retry.RetryPolicy
+        Policy retrying the page requests failing with a transient error, None
+        if failed requests are never retried
+    instrument : pds.peppi.instrumentation.Instrument
+        Receives the measurements of each page fetched, None if pages are
+        fetched without instrumentation
 
     """
 
-    def __init__(self, base_url=_DEFAULT_API_BASE_URL):
+    def __init__(
+        self,
+        base_url=_DEFAULT_API_BASE_URL,
+        cache: Optional[PageCache] = None,
+        pool_size: Optional[int] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = _DEFAULT_RETRY_POLICY,
+        instrument: Optional[Instrument] = None,
+    ):
         """Creates a new instance of PDSRegistryClient.
 
         Parameters
@@ -29,8 +56,160 @@ class PDSRegistryClient:
         base_url: str, optional
             The base endpoint URL of the PDS Registry API. The default value is
              the official production server, can be specified otherwise.
+        cache: pds.peppi.cache.PageCache, optional
+            Cache storing the pages of results on local disk, reused by any
+            later identical page request instead of querying the PDS Registry
+            API again. Defaults to no cache.
+        pool_size: int, optional
+            Maximum number of connections kept alive to the PDS Registry API,
+            to be raised when many queries run concurrently on this client.
+            Defaults to the one of the API client, five per CPU.
+        connect_timeout: float, optional
+            Maximum time to establish a connection, in seconds. Defaults to no timeout.
+        read_timeout: float, optional
+            Maximum time waiting for data from the PDS Registry API, in seconds.
+            Defaults to no timeout.
+        retry_policy: pds.peppi.retry.RetryPolicy, optional
+            Policy retrying the page requests failing with a network error or a
+            transient error status. Defaults to up to 5 retries with exponential
+            backoff, None to never retry.
+        instrument: pds.peppi.instrumentation.Instrument, optional
+            Instrument receiving the timings, size and hit count of each page
+            fetched, for example a pds.peppi.instrumentation.MetricsAggregator.
+            Defaults to no instrumentation, at no cost.
 
         """
+        self.base_url = base_url
+        self._pool_size = pool_size
+        self._api_client = None
+        self._api_client_lock = threading.Lock()
+        self.cache = cache
+        self.retry_policy = retry_policy
+        self.instrument = instrument
+        self.timeout = None if connect_timeout is None and read_timeout is None else (connect_timeout, read_timeout)
+        """The (connect, read) timeouts of the requests, None for no timeout."""
+
+    @property
+    def api_client(self):
+        """The API client used to interact with the PDS Registry API, created on first access."""
+        if self._api_client is None:
+            with self._api_client_lock:
+                if self._api_client is None:
+                    self._api_client = self._create_api_client()
+
+        return self._api_client
+
+    def _create_api_client(self):
+        """Returns a new API client configured for this client."""
+        from pds.api_client import ApiClient
+        from pds.api_client import Configuration
+
         configuration = Configuration()
-        configuration.host = base_url
-        self.api_client = ApiClient(configuration)
+        configuration.host = self.base_url
+
+        if self._pool_size is not None:
+            configuration.connection_pool_maxsize = self._pool_size
+
+        if self.retry_policy is not None:
+            # Failed requests are retried page by page, not within urllib3
+            configuration.retries = 0
+
+        return ApiClient(configuration)
+
+
+class AsyncPDSRegistryClient(PDSRegistryClient):
+    """Used to connect and interface with the PDS Registry from asyncio code.
+
+    Requests are sent through a single aiohttp session, whose connection pool
+    is shared by all the queries using this client. The session is opened on
+    the first request and should be closed with `close()`, or by using this
+    client as an asynchronous context manager.
+
+    Requires the optional ``aiohttp`` dependency (``pip install pds.peppi[async]``).
+
+    Attributes
+    ----------
+    api_client : pds.api_client.ApiClient
+        Object used to serialize requests to, and deserialize responses from,
+        the PDS Registry API
+
+    """
+
+    def __init__(
+        self,
+        base_url=_DEFAULT_API_BASE_URL,
+        cache: Optional[PageCache] = None,
+        max_connections: int = 100,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        retry_policy: Optional[RetryPolicy] = _DEFAULT_RETRY_POLICY,
+        instrument: Optional[Instrument] = None,
+    ):
+        """Creates a new instance of AsyncPDSRegistryClient.
+
+        Parameters
+        ----------
+        base_url: str, optional
+            The base endpoint URL of the PDS Registry API. The default value is
+             the official production server, can be specified otherwise.
+        cache: pds.peppi.cache.PageCache, optional
+            Cache storing the pages of results on local disk. Defaults to no cache.
+        max_connections: int, optional
+            Maximum number of simultaneous connections to the PDS Registry API.
+            Defaults to 100.
+        connect_timeout: float, optional
+            Maximum time to establish a connection, in seconds. Defaults to no timeout.
+        read_timeout: float, optional
+            Maximum time waiting for data from the PDS Registry API, in seconds.
+            Defaults to no timeout.
+        retry_policy: pds.peppi.retry.RetryPolicy, optional
+            Policy retrying the page requests failing with a network error or a
+            transient error status. Defaults to up to 5 retries with exponential
+            backoff, None to never retry.
+        instrument: pds.peppi.instrumentation.Instrument, optional
+            Instrument receiving the measurements of each page fetched.
+            Defaults to no instrumentation.
+
+        """
+        super().__init__(
+            base_url,
+            cache=cache,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            retry_policy=retry_policy,
+            instrument=instrument,
+        )
+        self._max_connections = max_connections
+        self._session = None
+
+    @property
+    def session(self):
+        """The aiohttp session used to send the requests, opened on first access."""
+        if self._session is None or self._session.closed:
+            try:
+                import aiohttp
+            except ImportError as err:
+                raise ImportError(
+                    "AsyncPDSRegistryClient requires aiohttp, install it with 'pip install pds.peppi[async]'"
+                ) from err
+
+            connector = aiohttp.TCPConnector(limit=self._max_connections)
+            connect_timeout, read_timeout = self.timeout or (None, None)
+            timeout = aiohttp.ClientTimeout(total=None, sock_connect=connect_timeout, sock_read=read_timeout)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+        return self._session
+
+    async def close(self):
+        """Closes the connections opened by this client."""
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self):
+        """Returns this client, to be closed when exiting the context."""
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        """Closes the connections opened by this client."""
+        await self.close()
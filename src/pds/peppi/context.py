@@ -0,0 +1,364 @@
+"""Index resolving the keywords of context products (targets, instruments, investigations...) into their LIDs."""
+import json
+import logging
+import os
+import tempfile
+import threading
+from typing import Optional
+
+from .client import PDSRegistryClient
+
+logger = logging.getLogger(__name__)
+
+TITLE_PROPERTY = "pds:Identification_Area.pds:title"
+"""Property holding the title of a context product"""
+
+ALTERNATE_TITLE_PROPERTY = "pds:Alias.pds:alternate_title"
+"""Property holding the alternate titles of a context product"""
+
+_FIELDS = ["lid", TITLE_PROPERTY, ALTERNATE_TITLE_PROPERTY]
+"""Fields of the context products needed to index them"""
+
+_BATCH_SIZE = 25
+"""Maximum number of keywords resolved by a single query"""
+
+_FORMAT_VERSION = 1
+"""Version of the format of the files the index is persisted to"""
+
+
+def context_type_of(lid: str) -> Optional[str]:
+    """Returns the type of a context product, for example ``target``, from its LID, None if not a context LID."""
+    parts = lid.split(":")
+
+    if len(parts) > 5 and parts[3] == "context":
+        return parts[4]
+
+    return None
+
+
+def keyword_clause(keyword: str) -> str:
+    """Returns the clause selecting the products whose title or alternate title matches a keyword.
+
+    The keyword is "cannonicalized" into several variations (as given, title
+    case, uppercase, lowercase) to cast a wider search across context names.
+
+    """
+    variations = dict.fromkeys((keyword, keyword.title(), keyword.upper(), keyword.lower()))
+
+    return " or ".join(
+        f'{property_name} eq "{variation}"'
+        for property_name in (TITLE_PROPERTY, ALTERNATE_TITLE_PROPERTY)
+        for variation in variations
+    )
+
+
+class ContextResolver:
+    """In-memory index of the context products, resolving their titles and alternate titles into LIDs.
+
+    Keywords missing from the index are looked up on the PDS Registry API, in
+    batches, and the context products found are added to the index, so that
+    each keyword is only requested once per process. The index may be filled
+    upfront with `preload()` and persisted across processes with `save()` and
+    `load()`.
+
+    The keywords are looked up with the client of the resolver, or the one
+    given to `resolve()`, `resolve_many()` and alike, so that the queries of a
+    resolver shared by several clients use the settings of the calling one.
+
+    """
+
+    _shared: dict = {}
+    """Indexes shared by all the queries of the process, as resolvers without client, by PDS Registry API base URL."""
+
+    _shared_lock = threading.Lock()
+
+    def __init__(self, client: Optional[PDSRegistryClient] = None, path: Optional[str] = None):
+        """Creates a new ContextResolver.
+
+        Parameters
+        ----------
+        client : PDSRegistryClient, optional
+            Client defining the connexion with the PDS Search API, used to look
+            up the keywords missing from the index. Defaults to none, the client
+            being then given to each method looking keywords up.
+        path : str, optional
+            JSON file the index is loaded from, if it exists, and saved to by `save()`.
+
+        """
+        self._client = client
+        self._path = path
+        self._lock = threading.RLock()
+        self._contexts: dict = {}
+        self._names: dict = {}
+        self._unknown: set = set()
+        self._complete: set = set()
+
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    @classmethod
+    def shared(cls, client: PDSRegistryClient) -> "ContextResolver":
+        """Returns the resolver shared by all the queries of the process sent to the same PDS Registry API as client.
+
+        The shared resolver has no client of its own, the client of the query
+        must be given to the methods looking keywords up.
+
+        """
+        with cls._shared_lock:
+            if client.base_url not in cls._shared:
+                cls._shared[client.base_url] = cls()
+
+            return cls._shared[client.base_url]
+
+    def _query_client(self, client: Optional[PDSRegistryClient]) -> PDSRegistryClient:
+        """Returns the client to look keywords up with, the given one or else the one of this resolver."""
+        client = client or self._client
+
+        if client is None:
+            raise ValueError("No client to look up the context keywords with")
+
+        return client
+
+    @staticmethod
+    def _key(keyword: str) -> str:
+        """Returns the form of a keyword used to look it up in the index."""
+        return " ".join(keyword.split()).casefold()
+
+    def _index(self, lid: str, title: Optional[str], alternate_titles: list):
+        """Adds a context product to the index."""
+        with self._lock:
+            self._contexts[lid] = {"title": title, "alternate_titles": list(alternate_titles)}
+
+            for name in [title, *alternate_titles]:
+                if name:
+                    self._names.setdefault(self._key(name), set()).add(lid)
+
+    def _index_products(self, products, keywords: list) -> dict:
+        """Adds the context products received for a batch of keywords to the index.
+
+        Returns the LIDs of the products matching each keyword, all of them if
+        the batch had a single keyword, as the PDS Registry API may match
+        titles more loosely than the index.
+
+        """
+        matches: dict = {self._key(k): set() for k in keywords}
+
+        for product in products:
+            properties = product.properties or {}
+            lid = properties["lid"][0]
+            title = (properties.get(TITLE_PROPERTY) or [None])[0]
+            alternate_titles = properties.get(ALTERNATE_TITLE_PROPERTY) or []
+            self._index(lid, title, alternate_titles)
+
+            if len(matches) == 1:
+                next(iter(matches.values())).add(lid)
+                continue
+
+            for name in [title, *alternate_titles]:
+                if name and self._key(name) in matches:
+                    matches[self._key(name)].add(lid)
+
+        with self._lock:
+            for key, lids in matches.items():
+                if lids:
+                    self._names.setdefault(key, set()).update(lids)
+                else:
+                    self._unknown.add(key)
+
+        return matches
+
+    def _lookup(self, keyword: str, context_type: Optional[str]) -> Optional[list]:
+        """Returns the LIDs indexed for a keyword, None if the keyword needs to be looked up on the PDS Registry API."""
+        if keyword.startswith("urn:"):
+            return [keyword]
+
+        key = self._key(keyword)
+
+        with self._lock:
+            lids = self._names.get(key)
+
+            if lids is None and (key in self._unknown or context_type in self._complete):
+                lids = set()
+
+        if lids is None:
+            return None
+
+        return sorted(lid for lid in lids if context_type is None or context_type_of(lid) == context_type)
+
+    def _batches(self, keywords: list):
+        """Returns the batches of distinct keywords to look up, with the query clause selecting each batch."""
+        distinct = list(dict.fromkeys(keywords))
+        batches = [distinct[i : i + _BATCH_SIZE] for i in range(0, len(distinct), _BATCH_SIZE)]
+
+        return [(batch, " or ".join(f"({keyword_clause(k)})" for k in batch)) for batch in batches]
+
+    def resolve(
+        self, keyword: str, context_type: Optional[str] = None, client: Optional[PDSRegistryClient] = None
+    ) -> list:
+        """Returns the LIDs of the context products whose title or alternate title matches a keyword.
+
+        Parameters
+        ----------
+        keyword : str
+            Title or alternate title, case insensitive, or LID returned as is.
+        context_type : str, optional
+            Type of context products to return, for example "target",
+            "instrument" or "investigation". Defaults to all types.
+        client : PDSRegistryClient, optional
+            Client to look the keyword up with if missing from the index.
+            Defaults to the client of this resolver.
+
+        Returns
+        -------
+        The sorted list of the LIDs found, empty if none.
+
+        """
+        return self.resolve_many([keyword], context_type, client)[keyword]
+
+    def resolve_many(
+        self, keywords: list, context_type: Optional[str] = None, client: Optional[PDSRegistryClient] = None
+    ) -> dict:
+        """Returns the LIDs of the context products matching each keyword, see `resolve()`.
+
+        The keywords missing from the index are looked up with one query per
+        batch of keywords, rather than one query per keyword.
+
+        """
+        from .query_builder import QueryBuilder
+
+        missing = [k for k in keywords if self._lookup(k, context_type) is None]
+
+        for batch, clause in self._batches(missing):
+            logger.info("Resolving %d context keyword(s): %s", len(batch), batch)
+            products = QueryBuilder(self._query_client(client)).contexts().filter(clause).fields(_FIELDS).raw()
+            self._index_products(products, batch)
+
+        return {keyword: self._lookup(keyword, context_type) or [] for keyword in keywords}
+
+    async def resolve_many_async(
+        self, keywords: list, context_type: Optional[str] = None, client: Optional[PDSRegistryClient] = None
+    ) -> dict:
+        """Returns the LIDs of the context products matching each keyword, from asyncio code, see `resolve_many()`.
+
+        The client the keywords are looked up with must be an AsyncPDSRegistryClient.
+
+        """
+        from .query_builder import AsyncQueryBuilder
+
+        missing = [k for k in keywords if self._lookup(k, context_type) is None]
+
+        for batch, clause in self._batches(missing):
+            logger.info("Resolving %d context keyword(s): %s", len(batch), batch)
+            products = AsyncQueryBuilder(self._query_client(client)).contexts().filter(clause).fields(_FIELDS).raw()
+            self._index_products([p async for p in products], batch)
+
+        return {keyword: self._lookup(keyword, context_type) or [] for keyword in keywords}
+
+    def preload(
+        self,
+        context_types: tuple = ("target", "instrument", "investigation"),
+        client: Optional[PDSRegistryClient] = None,
+    ):
+        """Fills the index with all the context products of the given types, with a single paged query.
+
+        Keywords of these types missing from the index are not looked up on
+        the PDS Registry API anymore.
+
+        Parameters
+        ----------
+        context_types : tuple of str, optional
+            Types of context products to index. Defaults to targets, instruments
+            and investigations.
+        client : PDSRegistryClient, optional
+            Client to query the context products with. Defaults to the client
+            of this resolver.
+
+        Returns
+        -------
+        This resolver.
+
+        """
+        from .query_builder import QueryBuilder
+
+        n = 0
+
+        for product in QueryBuilder(self._query_client(client)).contexts().fields(_FIELDS).raw():
+            properties = product.properties or {}
+            lid = properties["lid"][0]
+
+            if context_type_of(lid) in context_types:
+                title = (properties.get(TITLE_PROPERTY) or [None])[0]
+                self._index(lid, title, properties.get(ALTERNATE_TITLE_PROPERTY) or [])
+                n += 1
+
+        with self._lock:
+            self._complete.update(context_types)
+
+        logger.info("Preloaded %d context product(s) of types %s", n, context_types)
+        return self
+
+    def load(self, path: str):
+        """Adds the context products saved to a JSON file to the index, and uses that file for `save()`.
+
+        Parameters
+        ----------
+        path : str
+            Path of the JSON file written by `save()`.
+
+        Returns
+        -------
+        This resolver.
+
+        """
+        with open(path, encoding="utf-8") as f:
+            state = json.load(f)
+
+        if state.get("version") != _FORMAT_VERSION:
+            logger.warning("Ignoring context index %s of unsupported version %s", path, state.get("version"))
+            return self
+
+        with self._lock:
+            for lid, context in state["contexts"].items():
+                self._index(lid, context["title"], context["alternate_titles"])
+
+            self._complete.update(state.get("complete", []))
+            self._path = path
+
+        return self
+
+    def save(self, path: Optional[str] = None):
+        """Writes the index to a JSON file, atomically.
+
+        Parameters
+        ----------
+        path : str, optional
+            Path of the JSON file. Defaults to the path the resolver was created
+            with, or loaded from.
+
+        """
+        path = path or self._path
+
+        if path is None:
+            raise ValueError("No path to save the context index to")
+
+        with self._lock:
+            state = {"version": _FORMAT_VERSION, "complete": sorted(self._complete), "contexts": self._contexts}
+            directory = os.path.dirname(os.path.abspath(path))
+            os.makedirs(directory, exist_ok=True)
+
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(state, f, indent=2, sort_keys=True)
+                os.replace(tmp_path, path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+
+    def clear(self):
+        """Empties the index."""
+        with self._lock:
+            self._contexts.clear()
+            self._names.clear()
+            self._unknown.clear()
+            self._complete.clear()
@@ -0,0 +1,296 @@
+"""Assembly of pandas DataFrames from the products returned by the PDS Registry API."""
+import fnmatch
+import logging
+from typing import Literal
+from typing import Optional
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+MULTI_VALUED = Literal["list", "explode"]
+"""How columns holding several values for a product are represented in a DataFrame"""
+
+FIELD_TYPES = {
+    "*date_time": "datetime",
+    "*:modification_date": "datetime",
+    "*:start_date": "datetime",
+    "*:stop_date": "datetime",
+    "orex:Spatial.orex:*": "float",
+    "*:latitude": "float",
+    "*:longitude": "float",
+    "*:file_size": "int",
+    "*:records": "int",
+    "product_class": "category",
+    "vid": "category",
+    "ref_lid_*": "category",
+    "*:processing_level": "category",
+    "*:information_model_version": "category",
+    "*:purpose": "category",
+}
+"""Default types of the columns of typed DataFrames, by field name pattern, the first matching pattern applying.
+
+Types are "datetime" (UTC datetime64), "float", "int" (nullable integers),
+"category", and "object" to keep the values as returned by the PDS Registry
+API. String columns not matching any pattern are turned into categoricals if
+they have few distinct values.
+"""
+
+_CATEGORY_MAX_RATIO = 0.5
+"""Maximum ratio of distinct values to rows of the string columns automatically turned into categoricals"""
+
+
+def _column_type(name: str, types: dict) -> Optional[str]:
+    """Returns the type of a column from the first pattern of the field type map matching its name, None if none."""
+    for pattern, column_type in types.items():
+        if fnmatch.fnmatchcase(name, pattern):
+            return column_type
+
+    return None
+
+
+def _convert(series: "pd.Series", column_type: str, coerce: bool = False) -> Optional["pd.Series"]:
+    """Returns the values of a column converted to a type, None if some of them cannot be.
+
+    If coerce is True, the values which cannot be converted are turned into
+    missing values instead.
+
+    """
+    import pandas as pd
+
+    values = series.dropna()
+
+    if column_type == "datetime":
+        converted = pd.to_datetime(series, utc=True, format="ISO8601", errors="coerce")
+    elif column_type in ("float", "int"):
+        converted = pd.to_numeric(series, errors="coerce")
+    elif column_type == "category":
+        return series.astype("category")
+    else:
+        return series
+
+    # Values which could not be converted are turned into NaN or NaT
+    if not coerce and converted.notna().sum() != len(values):
+        return None
+
+    if column_type == "int":
+        integral = converted % 1 == 0
+
+        if not coerce and not integral[converted.notna()].all():
+            return None
+
+        return converted.where(integral).astype("Int64")
+
+    return converted.astype("float64") if column_type == "float" else converted
+
+
+def _explode(df: "pd.DataFrame", columns: list) -> "pd.DataFrame":
+    """Returns a DataFrame with one row per value of the multi-valued columns, their values paired by position.
+
+    The lists of values of a product shorter than its longest one are padded
+    with None, so that all the columns are exploded at once, instead of one
+    after the other, which would produce every combination of their values.
+
+    """
+    lists = {
+        name: [list(values) if isinstance(values, (list, tuple)) else [] for values in df[name]] for name in columns
+    }
+    lengths = [max(1, *map(len, row)) for row in zip(*lists.values())]
+
+    for name, column in lists.items():
+        df[name] = [values + [None] * (length - len(values)) for values, length in zip(column, lengths)]
+
+    return df.explode(columns)
+
+
+class DataFrameBuilder:
+    """Assembles the properties of products into DataFrame columns while they are streamed.
+
+    Every property of the PDS Registry API is a list of values. Columns whose
+    values never hold more than one element are unwrapped into scalars once,
+    when the DataFrame is built; the other ones, multi-valued, are kept as
+    lists or exploded into one row per value.
+
+    """
+
+    def __init__(
+        self, multi_valued: MULTI_VALUED = "list", columns: Optional[list] = None, types: Optional[dict] = None
+    ):
+        """Creates a new, empty, DataFrameBuilder.
+
+        Parameters
+        ----------
+        multi_valued : str, optional
+            Representation of the multi-valued columns: "list" (default) keeps
+            the lists of values, "explode" turns each value into its own row,
+            the other columns being repeated. The i-th values of the
+            multi-valued columns of a product share the i-th row of the
+            product, the shorter lists of values being padded with None.
+        columns : list of str, optional
+            Columns of the built DataFrames, in this order, whatever the
+            properties of the products. Defaults to all the properties, in the
+            order they were first seen.
+        types : dict, optional
+            Field type map typing the single-valued columns, see `FIELD_TYPES`,
+            None (default) to keep the values as returned by the PDS Registry
+            API. The type of each column is decided once, when it is first
+            built, so that successive DataFrames have the same types: values
+            of later DataFrames which cannot be converted to the type of
+            their column are turned into missing values.
+
+        """
+        if multi_valued not in ("list", "explode"):
+            raise ValueError(f'Invalid multi_valued "{multi_valued}", must be either "list" or "explode".')
+
+        self._multi_valued = multi_valued
+        self._fixed_columns = list(dict.fromkeys(columns)) if columns is not None else None
+        self._types = types
+        self._column_types: dict[str, str] = {}
+        self._columns: dict[str, list] = {}
+        self._multi_valued_columns: set[str] = set()
+        self._index: list[str] = []
+
+    def __len__(self):
+        """Returns the number of products appended so far."""
+        return len(self._index)
+
+    def append(self, lidvid: str, properties: Optional[dict]):
+        """Appends the properties of a product as a new row.
+
+        Parameters
+        ----------
+        lidvid : str
+            Identifier of the product, used as row index.
+        properties : dict
+            Properties of the product, each one being a list of values.
+
+        """
+        n = len(self._index)
+        columns = self._columns
+
+        for name, values in (properties or {}).items():
+            column = columns.get(name)
+
+            if column is None:
+                column = columns[name] = [None] * n
+            elif len(column) < n:
+                # Pad the rows of products which did not have this property
+                column.extend([None] * (n - len(column)))
+
+            column.append(values)
+
+            if values is not None and len(values) > 1:
+                self._multi_valued_columns.add(name)
+
+        self._index.append(lidvid)
+
+    def append_products(self, products):
+        """Appends all the products of an iterable, returns the number of products appended."""
+        n = len(self._index)
+
+        for product in products:
+            self.append(product.id, product.properties)
+
+        return len(self._index) - n
+
+    def build(self) -> Optional["pd.DataFrame"]:
+        """Returns the DataFrame of the products appended so far, None if there are none.
+
+        pandas is only imported by this method, so that it is not loaded
+        unless DataFrames are built.
+
+        """
+        import pandas as pd
+
+        n = len(self._index)
+
+        if n == 0:
+            return None
+
+        data = {}
+
+        for name, column in self._columns.items():
+            if len(column) < n:
+                column = column + [None] * (n - len(column))
+
+            if name in self._multi_valued_columns:
+                data[name] = column
+            else:
+                data[name] = [values[0] if values else None for values in column]
+
+        df = pd.DataFrame(data, index=self._index)
+
+        if self._fixed_columns is not None:
+            df = df.reindex(columns=self._fixed_columns)
+
+        if self._multi_valued == "explode":
+            # Properties requested only for the local checks of the query are not among the fixed columns
+            exploded = [name for name in df.columns if name in self._multi_valued_columns]
+
+            if exploded:
+                df = _explode(df, exploded)
+
+        if self._types is not None:
+            df = self._apply_types(df)
+
+        return df
+
+    def _apply_types(self, df: "pd.DataFrame") -> "pd.DataFrame":
+        """Converts the single-valued columns of a DataFrame to the types of the field type map."""
+        for name in df.columns:
+            if name in self._multi_valued_columns and self._multi_valued == "list":
+                continue
+
+            column_type = self._column_types.get(name)
+            decided = column_type is not None
+
+            if not decided:
+                column_type = _column_type(name, self._types)
+
+                if column_type is None:
+                    values = df[name].dropna()
+                    is_string = len(values) > 0 and values.map(type).eq(str).all()
+                    few_values = values.nunique() <= _CATEGORY_MAX_RATIO * len(df)
+                    column_type = "category" if is_string and few_values else "object"
+
+                self._column_types[name] = column_type
+
+            # The type of a column is kept once decided, so that all the DataFrames built have the same types
+            converted = _convert(df[name], column_type, coerce=decided)
+
+            if converted is None:
+                logger.warning('Values of column "%s" are not all of type %s, kept as is', name, column_type)
+                self._column_types[name] = "object"
+                continue
+
+            lost = df[name].notna().sum() - converted.notna().sum()
+
+            if lost:
+                logger.warning(
+                    '%d value(s) of column "%s" are not of type %s, turned into missing values', lost, name, column_type
+                )
+
+            df[name] = converted.array
+
+        return df
+
+    def clear(self):
+        """Removes all the products appended so far."""
+        self._columns = {}
+        self._multi_valued_columns = set()
+        self._column_types = {}
+        self._index = []
+
+    def clear_rows(self):
+        """Removes all the products appended so far, keeping their columns for the next DataFrames built.
+
+        The DataFrames built afterward have all the columns seen so far, even
+        if none of their products has the property, and the columns found to be
+        multi-valued keep their lists of values, so that successive DataFrames
+        have the same columns, represented the same way.
+
+        """
+        self._columns = {name: [] for name in self._columns}
+        self._index = []
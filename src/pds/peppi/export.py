@@ -0,0 +1,304 @@
+"""Streaming export of query results to files, with bounded memory."""
+import bz2
+import gzip
+import json
+import logging
+import lzma
+import os
+from typing import Iterable
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_NDJSON_COMPRESSIONS = {
+    None: (open, ""),
+    "gzip": (gzip.open, ".gz"),
+    "bz2": (bz2.open, ".bz2"),
+    "xz": (lzma.open, ".xz"),
+}
+"""Functions opening NDJSON files, and the suffix appended to their name, by compression"""
+
+
+class _RollingWriter:
+    """Writes rows to files in groups, starting a new file once the current one is full.
+
+    Only one group of rows is held in memory at a time. If no limit of rows or
+    bytes per file is set, a single file is written at the given path; otherwise
+    the files are numbered, ``results.ndjson`` becoming ``results-00000.ndjson``,
+    ``results-00001.ndjson``... The size of a file is checked after each group
+    is written, so a file may exceed its limit of bytes by up to one group.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        row_group_size: int,
+        max_rows_per_file: Optional[int] = None,
+        max_bytes_per_file: Optional[int] = None,
+    ):
+        if row_group_size < 1:
+            raise ValueError(f"row_group_size must be a positive number, got {row_group_size}")
+
+        self._path = path
+        self._row_group_size = row_group_size
+        self._max_rows_per_file = max_rows_per_file
+        self._max_bytes_per_file = max_bytes_per_file
+        self._numbered = max_rows_per_file is not None or max_bytes_per_file is not None
+        self._group = []
+        self._file_rows = 0
+        self._current_path = None
+        self.paths = []
+        """Paths of the files written so far."""
+
+    def _numbered_path(self, i):
+        """Returns the path of the i-th file."""
+        root, ext = os.path.splitext(self._path)
+        return f"{root}-{i:05d}{ext}"
+
+    def _next_path(self):
+        """Returns the path of the next file to write."""
+        if not self._numbered:
+            if not self.paths:
+                return self._path
+
+            # A second file is needed after all, number the first one too
+            os.replace(self._path, self._numbered_path(0))
+            self.paths[0] = self._numbered_path(0)
+            self._numbered = True
+
+        return self._numbered_path(len(self.paths))
+
+    def _open(self, path):
+        """Opens a new file for writing."""
+        raise NotImplementedError
+
+    def _write_group(self, rows):
+        """Writes a group of rows to the current file."""
+        raise NotImplementedError
+
+    def _close(self):
+        """Closes the current file."""
+        raise NotImplementedError
+
+    def _file_full(self):
+        """Returns True if the current file reached its limit of rows or bytes."""
+        if self._max_rows_per_file is not None and self._file_rows >= self._max_rows_per_file:
+            return True
+
+        if self._max_bytes_per_file is not None and os.path.getsize(self._current_path) >= self._max_bytes_per_file:
+            return True
+
+        return False
+
+    def write(self, product):
+        """Adds a product to the current group of rows, writing the group once it is complete."""
+        self._group.append(product)
+
+        group_limit = self._row_group_size
+        if self._max_rows_per_file is not None:
+            group_limit = min(group_limit, self._max_rows_per_file - self._file_rows)
+
+        if len(self._group) >= group_limit:
+            self.flush()
+
+    def flush(self):
+        """Writes the current group of rows."""
+        if not self._group:
+            return
+
+        if self._current_path is None:
+            self._current_path = self._next_path()
+            os.makedirs(os.path.dirname(os.path.abspath(self._current_path)), exist_ok=True)
+            self._open(self._current_path)
+            self.paths.append(self._current_path)
+
+        self._write_group(self._group)
+        self._file_rows += len(self._group)
+        self._group = []
+
+        if self._file_full():
+            self._roll()
+
+    def _roll(self):
+        """Closes the current file, the next group of rows being written to a new one."""
+        self._close()
+        logger.debug("Wrote %d products to %s", self._file_rows, self._current_path)
+        self._current_path = None
+        self._file_rows = 0
+
+    def close(self):
+        """Writes the last group of rows and closes the current file."""
+        self.flush()
+
+        if self._current_path is not None:
+            self._roll()
+
+
+class NdjsonWriter(_RollingWriter):
+    """Writes products as newline-delimited JSON, one ``{"id": ..., "properties": {...}}`` object per line."""
+
+    def __init__(
+        self,
+        path: str,
+        row_group_size: int = 10000,
+        max_rows_per_file: Optional[int] = None,
+        max_bytes_per_file: Optional[int] = None,
+        compression: Optional[str] = None,
+    ):
+        """Creates a new NdjsonWriter.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file, numbered if several files are written.
+        row_group_size : int, optional
+            Number of products written at once. Defaults to 10000.
+        max_rows_per_file : int, optional
+            Number of products after which a new file is started. Defaults to no limit.
+        max_bytes_per_file : int, optional
+            Size, in bytes, after which a new file is started. Defaults to no limit.
+        compression : str, optional
+            Compression of the files: None (default), "gzip", "bz2" or "xz". The
+            matching suffix is appended to the path if missing.
+
+        """
+        if compression not in _NDJSON_COMPRESSIONS:
+            raise ValueError(f'Invalid compression "{compression}", must be one of {list(_NDJSON_COMPRESSIONS)}')
+
+        opener, suffix = _NDJSON_COMPRESSIONS[compression]
+        if suffix and not path.endswith(suffix):
+            path += suffix
+
+        super().__init__(path, row_group_size, max_rows_per_file, max_bytes_per_file)
+        self._opener = opener
+        self._file = None
+
+    def _numbered_path(self, i):
+        """Returns the path of the i-th file, numbered before the extensions of the format and the compression."""
+        directory, name = os.path.split(self._path)
+        stem, dot, extensions = name.partition(".")
+        return os.path.join(directory, f"{stem}-{i:05d}{dot}{extensions}")
+
+    def _open(self, path):
+        self._file = self._opener(path, "wt", encoding="utf-8")
+
+    def _write_group(self, rows):
+        self._file.write("".join(json.dumps({"id": p.id, "properties": p.properties}) + "\n" for p in rows))
+        self._file.flush()
+
+    def _close(self):
+        self._file.close()
+        self._file = None
+
+
+class ParquetWriter(_RollingWriter):
+    """Writes products as Parquet row groups, with an ``id`` column and a list of strings column per property.
+
+    Property values are kept as the lists of strings returned by the PDS
+    Registry API, so that every row group of a file shares the same schema.
+    Properties missing from a product are null. The columns of a file are
+    the ones of its first row group; if a later group brings new properties,
+    a new file is started with the extended set of columns.
+
+    Requires the optional ``pyarrow`` dependency.
+
+    """
+
+    def __init__(
+        self,
+        path: str,
+        row_group_size: int = 10000,
+        max_rows_per_file: Optional[int] = None,
+        max_bytes_per_file: Optional[int] = None,
+        compression: Optional[str] = "snappy",
+    ):
+        """Creates a new ParquetWriter.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file, numbered if several files are written.
+        row_group_size : int, optional
+            Number of products per row group. Defaults to 10000.
+        max_rows_per_file : int, optional
+            Number of products after which a new file is started. Defaults to no limit.
+        max_bytes_per_file : int, optional
+            Size, in bytes, after which a new file is started. Defaults to no limit.
+        compression : str, optional
+            Compression codec of the files. Defaults to "snappy".
+
+        """
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as err:
+            raise ImportError(
+                "Parquet export requires pyarrow, install it with 'pip install pds.peppi[parquet]'"
+            ) from err
+
+        super().__init__(path, row_group_size, max_rows_per_file, max_bytes_per_file)
+        self._pa = pa
+        self._pq = pq
+        self._compression = compression or "none"
+        self._columns: list[str] = []
+        self._writer = None
+
+    def _open(self, path):
+        pa = self._pa
+        schema = pa.schema([("id", pa.string())] + [(name, pa.list_(pa.string())) for name in self._columns])
+        self._writer = self._pq.ParquetWriter(path, schema, compression=self._compression)
+
+    def _write_group(self, rows):
+        data = {"id": [p.id for p in rows]}
+
+        for name in self._columns:
+            data[name] = [(p.properties or {}).get(name) for p in rows]
+
+        self._writer.write_table(self._pa.Table.from_pydict(data, schema=self._writer.schema))
+
+    def _close(self):
+        self._writer.close()
+        self._writer = None
+
+    def flush(self):
+        """Writes the current group of rows, in a new file if it brings new properties."""
+        known = set(self._columns)
+        new_columns = []
+
+        for p in self._group:
+            for name in p.properties or {}:
+                if name not in known:
+                    known.add(name)
+                    new_columns.append(name)
+
+        if new_columns:
+            if self._current_path is not None:
+                self._roll()
+            self._columns.extend(new_columns)
+
+        super().flush()
+
+
+def export(products: Iterable, writer: _RollingWriter) -> list:
+    """Writes all the products of an iterable with the given writer.
+
+    Parameters
+    ----------
+    products : iterable of pds.api_client.models.pds_product.PDSProduct
+        Products to write.
+    writer : NdjsonWriter or ParquetWriter
+        Writer of the files.
+
+    Returns
+    -------
+    The paths of the written files.
+
+    """
+    try:
+        for product in products:
+            writer.write(product)
+    finally:
+        writer.close()
+
+    return writer.paths
@@ -0,0 +1,248 @@
+"""Breadth-first traversal of the investigation → bundle → collection → product hierarchy of an archive."""
+import heapq
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator
+from typing import NamedTuple
+from typing import Optional
+
+from .client import PDSRegistryClient
+from .context import context_type_of
+from .products import Products
+
+logger = logging.getLogger(__name__)
+
+LEVELS = ("investigation", "bundle", "collection", "product")
+"""Levels of the hierarchy of an archive, from top to bottom"""
+
+_LEVELS_BY_CLASS = {"Product_Bundle": "bundle", "Product_Collection": "collection"}
+"""Level of the products of each class which have children"""
+
+
+class HierarchyRecord(NamedTuple):
+    """Product found below another one while traversing the hierarchy of an archive."""
+
+    parent: str
+    """LIDVID of the parent product"""
+
+    child: object
+    """Child product, as a pds.api_client.models.pds_product.PDSProduct"""
+
+    level: str
+    """Level of the child product, one of `LEVELS`"""
+
+    depth: int
+    """Number of levels between the child product and the root of the traversal, 1 for its children"""
+
+
+class HierarchyWalker:
+    """Expands the hierarchy below a bundle, a collection or an investigation, querying many parents concurrently.
+
+    The children of each product are listed by a query of their own, paged
+    through by a bounded pool of worker threads. Products are expanded level
+    by level: a pending parent is only dispatched once all the pending parents
+    of the levels above it have been, so that a whole level is expanded before
+    the next one. The children are streamed as their pages are received,
+    whatever their parent.
+
+    Examples
+    --------
+    >>> walker = HierarchyWalker(client, max_workers=8)
+    >>> for record in walker.walk("urn:nasa:pds:orex.ocams::11.0", fields={"product": ["lid"]}):
+    ...     print(record.parent, record.child.id)
+
+    """
+
+    _QUEUE_DEPTH = 2
+    """Number of batches of children each worker may put ahead of the consumer."""
+
+    _BATCH_SIZE = 100
+    """Maximum number of children put at once on the queue of the records."""
+
+    _POLL_INTERVAL = 0.1
+    """Seconds between two checks of the cancellation flag while the queue of the records is full."""
+
+    _PARENT_DONE = object()
+    """Sentinel put on the queue once all the children of a parent have been listed."""
+
+    def __init__(self, client: PDSRegistryClient, max_workers: int = 4):
+        """Creates a new HierarchyWalker.
+
+        Parameters
+        ----------
+        client : PDSRegistryClient
+            Client defining the connexion with the PDS Search API.
+        max_workers : int, optional
+            Maximum number of parents whose children are listed concurrently.
+            Defaults to 4.
+
+        """
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be a positive number, got {max_workers}")
+
+        self._client = client
+        self._max_workers = max_workers
+
+    def _root(self, identifier: str) -> tuple:
+        """Returns the LIDVID and the level of the product to start the traversal from."""
+        query = Products(self._client).fields(["lid", "product_class"])
+
+        if "::" in identifier:
+            query.get(identifier)
+        else:
+            query.filter(f'lid eq "{identifier}"').latest_only()
+
+        root = next(iter(query.limit(1)), None)
+
+        if root is None:
+            raise ValueError(f"No product found with identifier {identifier}")
+
+        product_class = (root.properties.get("product_class") or [None])[0]
+        level = _LEVELS_BY_CLASS.get(product_class)
+
+        if product_class == "Product_Context" and context_type_of(root.id) == "investigation":
+            level = "investigation"
+
+        if level is None:
+            raise ValueError(f"Product {root.id} is not a bundle, a collection or an investigation")
+
+        return root.id, level
+
+    def _children(self, parent: str, level: str, fields: dict) -> Products:
+        """Returns the query of the children of a parent product of the given level."""
+        query = Products(self._client)
+
+        if level == "investigation":
+            query.has_investigation(parent.partition("::")[0]).bundles()
+        elif level == "bundle":
+            query.of_bundle(parent).collections()
+        else:
+            query.of_collection(parent)
+
+        child_level = LEVELS[LEVELS.index(level) + 1]
+
+        if fields.get(child_level):
+            query.fields(fields[child_level])
+
+        return query
+
+    def _put(self, out_queue, item, cancelled: threading.Event) -> bool:
+        """Puts an item on a queue, giving up if the traversal gets cancelled meanwhile."""
+        while not cancelled.is_set():
+            try:
+                out_queue.put(item, timeout=self._POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _expand(self, parent: str, level: str, depth: int, fields: dict, out_queue, cancelled: threading.Event):
+        """Lists the children of a parent product, putting them on the queue of the records in batches."""
+        child_level = LEVELS[LEVELS.index(level) + 1]
+        batch = []
+
+        try:
+            products = iter(self._children(parent, level, fields))
+
+            for product in products:
+                if cancelled.is_set():
+                    products.close()
+                    return
+
+                batch.append(HierarchyRecord(parent, product, child_level, depth + 1))
+
+                if len(batch) == self._BATCH_SIZE:
+                    if not self._put(out_queue, batch, cancelled):
+                        return
+
+                    batch = []
+
+            if batch and not self._put(out_queue, batch, cancelled):
+                return
+        except Exception as err:
+            self._put(out_queue, err, cancelled)
+            return
+
+        self._put(out_queue, self._PARENT_DONE, cancelled)
+
+    def walk(
+        self, identifier: str, fields: Optional[dict] = None, max_depth: Optional[int] = None
+    ) -> Iterator[HierarchyRecord]:
+        """Yields the products below the given one, with their parent, as they are found.
+
+        Parameters
+        ----------
+        identifier : str
+            LIDVID, or LID of the latest version, of the bundle, collection or
+            investigation to start the traversal from.
+        fields : dict, optional
+            Fields to request for the products of each level, by level name,
+            for example ``{"collection": ["lid", "pds:Collection.pds:collection_type"], "product": ["lid"]}``.
+            The products of the levels not given come with all their properties.
+        max_depth : int, optional
+            Number of levels to expand below the given product, 1 for its
+            children only. Defaults to all the levels down to the basic products.
+
+        Yields
+        ------
+        record : HierarchyRecord
+            The next product found, with the LIDVID of its parent, its level
+            and its depth below the given product.
+
+        Raises
+        ------
+        ValueError
+            If the given product is not found, or is not a bundle, a collection
+            or an investigation, or if the fields or depth are invalid. A
+            product of one of these classes without children yields nothing.
+
+        """
+        fields = dict(fields or {})
+        unknown_levels = set(fields).difference(LEVELS[1:])
+
+        if unknown_levels:
+            raise ValueError(f"Unknown level(s) {sorted(unknown_levels)}, expected any of {LEVELS[1:]}")
+
+        if max_depth is not None and max_depth < 1:
+            raise ValueError(f"max_depth must be a positive number, got {max_depth}")
+
+        root, level = self._root(identifier)
+        logger.info("Traversing the hierarchy below %s %s", level, root)
+
+        # Pending parents, shallowest first, then in the order they were found
+        pending = [(0, 0, root, level)]
+        sequence = itertools.count(1)
+        running = 0
+        cancelled = threading.Event()
+        out_queue: queue.Queue = queue.Queue(maxsize=self._QUEUE_DEPTH * self._max_workers)
+        executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="peppi-hierarchy")
+
+        try:
+            while pending or running:
+                while pending and running < self._max_workers:
+                    depth, _, parent, parent_level = heapq.heappop(pending)
+                    executor.submit(self._expand, parent, parent_level, depth, fields, out_queue, cancelled)
+                    running += 1
+
+                item = out_queue.get()
+
+                if item is self._PARENT_DONE:
+                    running -= 1
+                    continue
+
+                if isinstance(item, Exception):
+                    raise item
+
+                for record in item:
+                    if record.level != "product" and (max_depth is None or record.depth < max_depth):
+                        heapq.heappush(pending, (record.depth, next(sequence), record.child.id, record.level))
+
+                    yield record
+        finally:
+            # The traversal may have been abandoned early, the parents being expanded are not needed anymore
+            cancelled.set()
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,268 @@
+"""Instrumentation of the page requests sent to the PDS Registry API.
+
+An :class:`Instrument` given to a :class:`pds.peppi.client.PDSRegistryClient`
+receives a :class:`PageEvent` for each page fetched by the queries sent with
+this client, telling where the time went: waiting for the PDS Registry API,
+deserializing its response, or in the code consuming the products.
+
+The :class:`MetricsAggregator` instrument keeps the events in memory and
+summarizes them, by query, with percentiles. When the client has no
+instrument, pages are fetched without any timing nor bookkeeping.
+"""
+import collections
+import functools
+import math
+import threading
+from typing import NamedTuple
+from typing import Optional
+
+from .query import Clause
+
+
+class PageEvent(NamedTuple):
+    """Measurements of a single page of results fetched from the PDS Registry API, or from the page cache."""
+
+    query_hash: str
+    """Hash of the query the page was fetched for, see `pds.peppi.query_builder.QueryBuilder.query_hash()`.
+
+    The pages of the shards, chunks and version scans of a query, and the ones
+    filtered locally, all have the hash of the query, whatever the query string
+    of their request. Pages requested without a QueryBuilder have the hash of
+    their query string, see `pds.peppi.query.Expression.query_hash()`.
+    """
+
+    page: int
+    """Number of the page within the query, counted from 1, 0 for the requests counting the hits only."""
+
+    request_time: float
+    """Time spent requesting the page, retries included, or looking it up in the cache, in seconds."""
+
+    deserialization_time: float
+    """Time spent deserializing the body of the response, in seconds."""
+
+    consumer_gap: Optional[float]
+    """Time between the delivery of the previous page of the query and the request of this one, in seconds.
+
+    It is the time spent by the code consuming the products of the previous
+    page or, when pages are fetched in the background, waiting for it to catch
+    up. None for the first page of a query.
+    """
+
+    size: int
+    """Size of the body of the response, in bytes."""
+
+    hits: int
+    """Total number of products matching the query."""
+
+    products: int
+    """Number of products in the page."""
+
+    retries: int
+    """Number of times the page request was sent again after a transient error."""
+
+    cached: bool
+    """True if the page was read from the page cache of the client instead of the PDS Registry API."""
+
+
+class QuerySummary(NamedTuple):
+    """Totals of the pages fetched for a query, as summarized by `MetricsAggregator.summary()`."""
+
+    pages: int
+    """Number of pages fetched, hit counting requests included."""
+
+    products: int
+    """Number of products received."""
+
+    size: int
+    """Total size of the responses, in bytes."""
+
+    retries: int
+    """Total number of retried requests."""
+
+    cached_pages: int
+    """Number of pages read from the page cache."""
+
+    request_time: float
+    """Total time spent requesting pages, in seconds."""
+
+    deserialization_time: float
+    """Total time spent deserializing pages, in seconds."""
+
+    consumer_time: float
+    """Total time spent by the consumer between pages, in seconds."""
+
+
+@functools.lru_cache(maxsize=1024)
+def query_hash(q: Optional[str]) -> str:
+    """Returns the hash of the query string of a page request, identical to the hash of the query it was compiled from."""
+    return Clause(q or "").query_hash()
+
+
+class _AttemptCounter:
+    """Wraps a request function, or coroutine function, counting the times it gets called."""
+
+    def __init__(self, request):
+        """Wraps the given request function."""
+        self._request = request
+        self.attempts = 0
+
+    def __call__(self, *args):
+        """Calls the request function."""
+        self.attempts += 1
+        return self._request(*args)
+
+
+class _PageClock:
+    """Numbers the pages fetched by a result set, and times the gaps between them, per query string."""
+
+    def __init__(self):
+        """Creates a new clock, with no page fetched yet."""
+        self._lock = threading.Lock()
+        self._pages: dict = {}
+        self._deliveries: dict = {}
+
+    def start(self, kwargs: dict, now: float) -> tuple:
+        """Returns the number of a page about to be requested and the time since the previous one was delivered."""
+        if kwargs.get("limit") == 0:
+            return 0, None
+
+        q = kwargs.get("q")
+
+        with self._lock:
+            page = self._pages[q] = self._pages.get(q, 0) + 1
+            delivered = self._deliveries.get(q)
+
+        return page, None if delivered is None else now - delivered
+
+    def deliver(self, kwargs: dict, now: float):
+        """Records the time a page is delivered to the consumer."""
+        if kwargs.get("limit") != 0:
+            with self._lock:
+                self._deliveries[kwargs.get("q")] = now
+
+    def reset(self):
+        """Forgets the pages fetched so far."""
+        with self._lock:
+            self._pages.clear()
+            self._deliveries.clear()
+
+
+class Instrument:
+    """Receives the events of the pages fetched by a client.
+
+    Subclasses override `on_page()`. It is called from the thread fetching
+    the page, possibly a background one, so it should be fast and thread safe.
+
+    """
+
+    def on_page(self, event: PageEvent):
+        """Called once for each page fetched.
+
+        Parameters
+        ----------
+        event : PageEvent
+            Measurements of the page.
+
+        """
+
+
+class MetricsAggregator(Instrument):
+    """Instrument keeping the page events in memory, summarized by query and with percentiles.
+
+    Examples
+    --------
+    >>> metrics = MetricsAggregator()
+    >>> client = PDSRegistryClient(instrument=metrics)
+    >>> products = Products(client).has_target("Mars").observationals()
+    >>> df = products.as_dataframe()
+    >>> metrics.percentiles("request_time", query_hash=products.query_hash())
+    {50: 0.41, 90: 0.63, 99: 0.98}
+
+    """
+
+    _METRICS = ("request_time", "deserialization_time", "consumer_gap", "size", "hits", "products", "retries")
+    """Fields of the page events percentiles are computed for."""
+
+    def __init__(self, max_events: Optional[int] = 100000):
+        """Creates a new MetricsAggregator.
+
+        Parameters
+        ----------
+        max_events : int, optional
+            Maximum number of events kept, the oldest ones being discarded
+            first. Defaults to 100,000, None for no limit.
+
+        """
+        self._lock = threading.Lock()
+        self._events: collections.deque = collections.deque(maxlen=max_events)
+
+    def on_page(self, event: PageEvent):
+        """Keeps the event of a page."""
+        with self._lock:
+            self._events.append(event)
+
+    def events(self, query_hash: Optional[str] = None) -> list:
+        """Returns the events kept, oldest first, only the ones of a query if its hash is given."""
+        with self._lock:
+            events = list(self._events)
+
+        return [e for e in events if query_hash is None or e.query_hash == query_hash]
+
+    def percentiles(self, metric: str, percentiles: tuple = (50, 90, 99), query_hash: Optional[str] = None) -> dict:
+        """Returns percentiles of a metric of the page events.
+
+        Parameters
+        ----------
+        metric : str
+            Field of the page events, for example "request_time" or "size".
+        percentiles : tuple of float, optional
+            Percentiles to compute, between 0 and 100. Defaults to 50, 90 and 99.
+        query_hash : str, optional
+            Hash of the query to compute the percentiles for. Defaults to all
+            the pages kept.
+
+        Returns
+        -------
+        The value of each percentile, linearly interpolated between the
+        closest events, None if no event has a value for the metric.
+
+        """
+        if metric not in self._METRICS:
+            raise ValueError(f"Unknown metric {metric}, expected one of {', '.join(self._METRICS)}")
+
+        values = sorted(v for v in (getattr(e, metric) for e in self.events(query_hash)) if v is not None)
+
+        return {p: _percentile(values, p) for p in percentiles}
+
+    def summary(self) -> dict:
+        """Returns the QuerySummary of each query, by query hash."""
+        totals: dict = {}
+
+        for event in self.events():
+            total = totals.setdefault(event.query_hash, [0, 0, 0, 0, 0, 0.0, 0.0, 0.0])
+            total[0] += 1
+            total[1] += event.products
+            total[2] += event.size
+            total[3] += event.retries
+            total[4] += event.cached
+            total[5] += event.request_time
+            total[6] += event.deserialization_time
+            total[7] += event.consumer_gap or 0.0
+
+        return {h: QuerySummary(*total) for h, total in totals.items()}
+
+    def clear(self):
+        """Discards all the events kept."""
+        with self._lock:
+            self._events.clear()
+
+
+def _percentile(values: list, percentile: float) -> Optional[float]:
+    """Returns a percentile of sorted values, linearly interpolated, None if there is no value."""
+    if not values:
+        return None
+
+    rank = (len(values) - 1) * percentile / 100
+    low, high = math.floor(rank), math.ceil(rank)
+
+    return values[low] + (values[high] - values[low]) * (rank - low)
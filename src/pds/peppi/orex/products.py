@@ -6,13 +6,16 @@ from pds.peppi.orex.query_builder import OrexQueryBuilder
 class OrexProducts(OrexQueryBuilder):
     """Specialized Products class used to query specfically for Osiris Rex (OREX) products."""
 
-    def __init__(self, client: PDSRegistryClient):
+    def __init__(self, client: PDSRegistryClient, prefetch: int = 0):
         """Creates a new instance of OrexProducts.
 
         Parameters
         ----------
         client : PDSRegistryClient
             Client defining the connection with the PDS Search API.
+        prefetch : int, optional
+            Number of result pages to fetch ahead in the background while
+            iterating on the current one. Defaults to 0 (no prefetching).
 
         """
-        super().__init__(client)
+        super().__init__(client, prefetch=prefetch)
@@ -1,27 +1,41 @@
 """Module containing the Osiris Rex (OREX) tailored QueryBuilder class."""
+import logging
+import os
+from typing import Optional
+from typing import TYPE_CHECKING
+
 from pds.peppi.client import PDSRegistryClient
 from pds.peppi.query_builder import QueryBuilder
 
+if TYPE_CHECKING:
+    from pds.peppi.orex.spatial_index import OrexSpatialIndex
+
+logger = logging.getLogger(__name__)
+
 
 class OrexQueryBuilder(QueryBuilder):
     """Inherits the functionality of the QueryBuilder class, but adds implementations for unimplemented stubs."""
 
     orex_investigation_lidvid = "urn:nasa:pds:context:investigation:mission.orex"
 
-    def __init__(self, client: PDSRegistryClient):
+    def __init__(self, client: PDSRegistryClient, prefetch: int = 0):
         """Creates a new instance of OrexResultSet.
 
         Parameters
         ----------
         client : PDSRegistryClient
             Client defining the connection with the PDS Search API.
+        prefetch : int, optional
+            Number of result pages to fetch ahead in the background while
+            iterating on the current one. Defaults to 0 (no prefetching).
 
         """
-        super().__init__(client)
+        super().__init__(client, prefetch=prefetch)
+        self._spatial_index: Optional["OrexSpatialIndex"] = None
 
         # By default, all query results are filtered to just those applicable to
         # the Osiris Rex investigation
-        self._q_string = f'ref_lid_investigation eq "{self.orex_investigation_lidvid}"'
+        self._add_clause(f'ref_lid_investigation eq "{self.orex_investigation_lidvid}"')
 
     def has_investigation(self, identifier: str):
         """Adds a query clause selecting products having an instrument matching the provided identifier.
@@ -43,6 +57,63 @@ class OrexQueryBuilder(QueryBuilder):
         """
         raise NotImplementedError(f"Cannot specify an additional investigation on {self.__class__.__name__}")
 
+    def spatial_index(self, path: Optional[str] = None) -> "OrexSpatialIndex":
+        """Returns the local spatial index of the footprints of the products of the current query.
+
+        The latitude, longitude and target range of the products are fetched
+        once, the index answering `within_bbox()` and `within_range()` without
+        any request to the PDS Registry API, many boxes at once with
+        `pds.peppi.orex.spatial_index.OrexSpatialIndex.within_bboxes()`.
+
+        Parameters
+        ----------
+        path : str, optional
+            Path of the file caching the index. The index saved there is
+            returned if it was built for the same query, otherwise the index is
+            built and saved there. Defaults to no cache.
+
+        Returns
+        -------
+        The spatial index of the products of the query.
+
+        """
+        from pds.peppi.orex.spatial_index import OrexSpatialIndex
+
+        if path is not None and os.path.exists(path):
+            index = OrexSpatialIndex.load(path)
+
+            if index.query_hash == self.query_hash():
+                return index
+
+            logger.info("Spatial index %s is of another query, rebuilding it", path)
+
+        index = OrexSpatialIndex.build(self)
+
+        if path is not None:
+            index.save(path)
+
+        return index
+
+    def use_spatial_index(self, index: "OrexSpatialIndex"):
+        """Makes `within_bbox()` and `within_range()` select the products from a local spatial index.
+
+        The products found in the index are selected by LIDVID, in addition to
+        the other filters of this query, so that only the products matching
+        the spatial filters are fetched.
+
+        Parameters
+        ----------
+        index : pds.peppi.orex.spatial_index.OrexSpatialIndex
+            The index, see `spatial_index()`.
+
+        Returns
+        -------
+        This instance with the spatial index in use.
+
+        """
+        self._spatial_index = index
+        return self
+
     def within_range(self, range_in_km: float):
         """Adds a query clause selecting products within the provided range value.
 
@@ -56,6 +127,10 @@ class OrexQueryBuilder(QueryBuilder):
         This OrexResultSet instance with the "within range" filter applied.
 
         """
+        if self._spatial_index is not None:
+            self._add_list_filter("lidvid", self._spatial_index.within_range(range_in_km).tolist())
+            return self
+
         self._add_clause(f"orex:Spatial.orex:target_range le {range_in_km}")
 
         return self
@@ -79,6 +154,11 @@ class OrexQueryBuilder(QueryBuilder):
         This OrexResultSet instance with the "within bounding box" filter applied.
 
         """
+        if self._spatial_index is not None:
+            lidvids = self._spatial_index.within_bbox(lat_min, lat_max, lon_min, lon_max).tolist()
+            self._add_list_filter("lidvid", lidvids)
+            return self
+
         self._add_clause(f"orex:Spatial.orex:latitude ge {lat_min}")
         self._add_clause(f"orex:Spatial.orex:latitude le {lat_max}")
         self._add_clause(f"orex:Spatial.orex:longitude ge {lon_min}")
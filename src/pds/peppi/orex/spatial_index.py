@@ -0,0 +1,325 @@
+"""Local spatial index of the footprints of the OSIRIS-REx products.
+
+The latitude, longitude and target range of the products of a query are
+fetched once into arrays, which answer the bounding box and range queries of
+a coverage analysis locally, many boxes at once, instead of one query to the
+PDS Registry API per box. The index can be saved to a file and reused as
+long as the query is the same.
+"""
+import logging
+import math
+import os
+import tempfile
+from typing import Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LATITUDE = "orex:Spatial.orex:latitude"
+"""Property of the latitudes of the footprints of a product, in degrees"""
+
+LONGITUDE = "orex:Spatial.orex:longitude"
+"""Property of the longitudes of the footprints of a product, in degrees"""
+
+TARGET_RANGE = "orex:Spatial.orex:target_range"
+"""Property of the distances to the target of a product, in kilometers"""
+
+_FORMAT_VERSION = 1
+"""Version of the format of the index files"""
+
+_MAX_BANDS = 4096
+"""Maximum number of latitude bands of the grid of the footprints"""
+
+_MAX_CANDIDATES = 4_000_000
+"""Maximum number of footprints checked at once against the longitudes of a batch of boxes, bounding memory use"""
+
+
+def _floats(values) -> list:
+    """Returns the values of a property as floats, NaN for the invalid ones."""
+    floats = []
+
+    for value in values or ():
+        try:
+            floats.append(float(value))
+        except (TypeError, ValueError):
+            floats.append(math.nan)
+
+    return floats
+
+
+class OrexSpatialIndex:
+    """Footprints of a set of products, held in arrays forming a grid, and target ranges, held in a sorted array.
+
+    Each product has one footprint per latitude and longitude pair, a product
+    being selected by a box when any of its footprints is within the box, as
+    with the query clauses of `OrexQueryBuilder.within_bbox()`.
+
+    The footprints are split into latitude bands of equal heights, about the
+    square root of their number, and sorted by band then longitude. The
+    footprints of a box are found by binary search of its longitude bounds in
+    each band it overlaps, for all the boxes at once, then checked against
+    its exact bounds in vectorized batches.
+
+    """
+
+    def __init__(
+        self,
+        lidvids,
+        products,
+        latitudes,
+        longitudes,
+        ranges,
+        range_products,
+        query_hash: Optional[str] = None,
+    ):
+        """Creates a new index from its arrays, see `build()` and `load()`.
+
+        Parameters
+        ----------
+        lidvids : array-like of str
+            LIDVID of each product.
+        products : array-like of int
+            Index of the product of each footprint.
+        latitudes : array-like of float
+            Latitude of each footprint.
+        longitudes : array-like of float
+            Longitude of each footprint.
+        ranges : array-like of float
+            Target ranges of the products.
+        range_products : array-like of int
+            Index of the product of each target range.
+        query_hash : str, optional
+            Hash of the query the products were selected by.
+
+        """
+        self.lidvids = np.asarray(lidvids, dtype=str)
+        self.query_hash = query_hash
+
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        products = np.asarray(products, dtype=np.int64)
+
+        # Footprints with an invalid coordinate are not within any box
+        valid = ~(np.isnan(latitudes) | np.isnan(longitudes))
+        latitudes, longitudes, products = latitudes[valid], longitudes[valid], products[valid]
+
+        self._n_bands = int(min(max(np.sqrt(len(latitudes)), 1), _MAX_BANDS))
+        self._lat_origin = latitudes.min() if len(latitudes) else 0.0
+        self._band_height = ((latitudes.max() - self._lat_origin) if len(latitudes) else 0.0) / self._n_bands or 1.0
+        self._lon_origin = longitudes.min() if len(longitudes) else 0.0
+
+        # Longitudes are offset within [0, span - 1], so that the keys of a band precede the ones of the next band
+        self._lon_span = ((longitudes.max() - self._lon_origin) if len(longitudes) else 0.0) + 1.0
+
+        keys = self._bands(latitudes) * self._lon_span + (longitudes - self._lon_origin)
+        order = np.argsort(keys, kind="stable")
+        self._keys = keys[order]
+        self._latitudes = latitudes[order]
+        self._longitudes = longitudes[order]
+        self._products = products[order]
+
+        ranges = np.asarray(ranges, dtype=np.float64)
+        order = np.argsort(ranges, kind="stable")
+        self._ranges = ranges[order]
+        self._range_products = np.asarray(range_products, dtype=np.int64)[order]
+
+    @classmethod
+    def build(cls, query) -> "OrexSpatialIndex":
+        """Fetches the footprints of the products of a query into a new index.
+
+        Only the spatial properties of the products are requested, in raw mode.
+
+        Parameters
+        ----------
+        query : pds.peppi.orex.query_builder.OrexQueryBuilder
+            Query selecting the products to index, its fields being left unchanged.
+
+        Returns
+        -------
+        The index of the products of the query.
+
+        """
+        lidvids, products, latitudes, longitudes, ranges, range_products = [], [], [], [], [], []
+        fields = query._fields
+        query._fields = [LATITUDE, LONGITUDE, TARGET_RANGE]
+
+        try:
+            with query._raw_mode():
+                for i, product in enumerate(query):
+                    properties = product.properties
+                    lidvids.append(product.id)
+
+                    footprints = list(zip(_floats(properties.get(LATITUDE)), _floats(properties.get(LONGITUDE))))
+                    products.extend([i] * len(footprints))
+                    latitudes.extend(latitude for latitude, _ in footprints)
+                    longitudes.extend(longitude for _, longitude in footprints)
+
+                    target_ranges = _floats(properties.get(TARGET_RANGE))
+                    range_products.extend([i] * len(target_ranges))
+                    ranges.extend(target_ranges)
+        finally:
+            query._fields = fields
+
+        logger.info("Indexed %d footprint(s) of %d product(s)", len(latitudes), len(lidvids))
+        return cls(lidvids, products, latitudes, longitudes, ranges, range_products, query_hash=query.query_hash())
+
+    @classmethod
+    def load(cls, path: str) -> "OrexSpatialIndex":
+        """Loads an index saved to a file with `save()`.
+
+        Raises
+        ------
+        ValueError
+            If the file is of an unsupported version.
+
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            if int(arrays["version"]) != _FORMAT_VERSION:
+                raise ValueError(f"Spatial index {path} is of unsupported version {int(arrays['version'])}")
+
+            return cls(
+                arrays["lidvids"],
+                arrays["products"],
+                arrays["latitudes"],
+                arrays["longitudes"],
+                arrays["ranges"],
+                arrays["range_products"],
+                query_hash=str(arrays["query_hash"]) or None,
+            )
+
+    def save(self, path: str):
+        """Saves the index to a file, replaced atomically."""
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                np.savez(
+                    f,
+                    version=_FORMAT_VERSION,
+                    query_hash=self.query_hash or "",
+                    lidvids=self.lidvids,
+                    products=self._products,
+                    latitudes=self._latitudes,
+                    longitudes=self._longitudes,
+                    ranges=self._ranges,
+                    range_products=self._range_products,
+                )
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def __len__(self):
+        """Returns the number of products of the index."""
+        return len(self.lidvids)
+
+    def _bands(self, latitudes):
+        """Returns the index of the latitude band of each latitude, clipped to the bands of the grid."""
+        return np.clip(np.floor((latitudes - self._lat_origin) / self._band_height), 0, self._n_bands - 1)
+
+    @staticmethod
+    def _batches(starts, stops):
+        """Yields the bounds of consecutive batches of boxes, each with a bounded number of candidate footprints."""
+        cumulative = np.cumsum(stops - starts)
+        start = 0
+
+        while start < len(starts):
+            offset = cumulative[start - 1] if start else 0
+            stop = max(int(np.searchsorted(cumulative, offset + _MAX_CANDIDATES, side="right")), start + 1)
+            yield start, stop
+            start = stop
+
+    def _matches(self, boxes):
+        """Returns the sorted, distinct, (box, product) pairs of the products with a footprint within each box."""
+        # One (box, band) pair per band overlapped by each box
+        first_bands, last_bands = self._bands(boxes[:, 0]), self._bands(boxes[:, 1])
+        n_bands = np.maximum(last_bands - first_bands + 1, 0).astype(np.int64)
+        pair_boxes = np.repeat(np.arange(len(boxes)), n_bands)
+        pair_bands = np.repeat(first_bands, n_bands) + (
+            np.arange(n_bands.sum()) - np.repeat(np.cumsum(n_bands) - n_bands, n_bands)
+        )
+
+        # Longitude bounds beyond the ones of the footprints are clipped half-way to the next band
+        lon_bounds = np.clip(boxes[pair_boxes, 2:] - self._lon_origin, -0.5, self._lon_span - 0.5)
+        starts = np.searchsorted(self._keys, pair_bands * self._lon_span + lon_bounds[:, 0], side="left")
+        stops = np.maximum(
+            np.searchsorted(self._keys, pair_bands * self._lon_span + lon_bounds[:, 1], side="right"), starts
+        )
+        matched_boxes, matched_products = [], []
+
+        for first, last in self._batches(starts, stops):
+            lengths = stops[first:last] - starts[first:last]
+            box = np.repeat(pair_boxes[first:last], lengths)
+
+            # Footprints of each pair, one after the other
+            offsets = np.cumsum(lengths) - lengths
+            rows = np.arange(lengths.sum()) - np.repeat(offsets - starts[first:last], lengths)
+
+            latitudes, longitudes = self._latitudes[rows], self._longitudes[rows]
+            within = (
+                (latitudes >= boxes[box, 0])
+                & (latitudes <= boxes[box, 1])
+                & (longitudes >= boxes[box, 2])
+                & (longitudes <= boxes[box, 3])
+            )
+            matched_boxes.append(box[within])
+            matched_products.append(self._products[rows[within]])
+
+        if not matched_boxes:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        n_products = max(len(self.lidvids), 1)
+        keys = np.unique(np.concatenate(matched_boxes) * n_products + np.concatenate(matched_products))
+        return np.divmod(keys, n_products)
+
+    @staticmethod
+    def _boxes(boxes):
+        """Returns the boxes as an array of (lat_min, lat_max, lon_min, lon_max) rows."""
+        boxes = np.asarray(boxes, dtype=np.float64)
+
+        if boxes.ndim != 2 or boxes.shape[1] != 4:
+            raise ValueError(f"Expected boxes of 4 bounds (lat_min, lat_max, lon_min, lon_max), got {boxes.shape}")
+
+        return boxes
+
+    def within_bboxes(self, boxes) -> list:
+        """Returns the LIDVIDs of the products with a footprint within each box, bounds included.
+
+        Parameters
+        ----------
+        boxes : array-like of shape (n, 4)
+            Bounds of the boxes, as (lat_min, lat_max, lon_min, lon_max) rows.
+
+        Returns
+        -------
+        An array of the LIDVIDs of the matching products, per box, in the order
+        the products were indexed.
+
+        """
+        boxes = self._boxes(boxes)
+        box, product = self._matches(boxes)
+        return np.split(self.lidvids[product], np.searchsorted(box, np.arange(1, len(boxes))))
+
+    def count_within_bboxes(self, boxes):
+        """Returns the number of products with a footprint within each box, see `within_bboxes()`.
+
+        Returns
+        -------
+        An array of the number of matching products, per box.
+
+        """
+        boxes = self._boxes(boxes)
+        box, _ = self._matches(boxes)
+        return np.bincount(box, minlength=len(boxes))
+
+    def within_bbox(self, lat_min: float, lat_max: float, lon_min: float, lon_max: float):
+        """Returns the LIDVIDs of the products with a footprint within the box, bounds included, see `within_bboxes()`."""
+        return self.within_bboxes([(lat_min, lat_max, lon_min, lon_max)])[0]
+
+    def within_range(self, range_in_km: float):
+        """Returns the LIDVIDs of the products with a target range lower than or equal to the given one."""
+        stop = np.searchsorted(self._ranges, range_in_km, side="right")
+        return self.lidvids[np.unique(self._range_products[:stop])]
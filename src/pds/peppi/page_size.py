@@ -0,0 +1,116 @@
+"""Adaptive sizing of the pages requested from the PDS Registry API."""
+import logging
+import threading
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptivePageSize:
+    """Tunes the number of products requested per page from the observed responses.
+
+    After each page received from the PDS Registry API, the time and the size
+    of the response are used to estimate the cost of a single product. The
+    next pages then request as many products as fit in the target time per
+    page and under the maximum payload, within the minimum and maximum bounds.
+
+    Narrow projections of fields thus need fewer round-trips, while pages with
+    all the properties of products are kept small enough to be fetched, and
+    held in memory, comfortably. The size changes by at most a factor of two
+    from one page to the next, so that a single slow response does not make
+    it collapse. Pages of fewer than the minimum number of products, such as
+    the last page of a query, are too small to be representative and ignored.
+
+    The same instance may be shared by several threads paging concurrently.
+
+    """
+
+    _SMOOTHING = 0.5
+    """Weight of the latest response in the moving averages of the cost of a product."""
+
+    _MAX_STEP = 2.0
+    """Maximum factor between the sizes of two consecutive pages."""
+
+    def __init__(
+        self,
+        min_size: int = 10,
+        max_size: int = 1000,
+        target_time: float = 1.0,
+        max_bytes: Optional[int] = 8 * 1024**2,
+        initial_size: int = 100,
+    ):
+        """Creates a new AdaptivePageSize.
+
+        Parameters
+        ----------
+        min_size : int, optional
+            Minimum number of products per page. Defaults to 10.
+        max_size : int, optional
+            Maximum number of products per page. Defaults to 1000.
+        target_time : float, optional
+            Targeted time to receive a page, in seconds. Defaults to 1.
+        max_bytes : int, optional
+            Targeted maximum size of the body of a page, in bytes. Defaults to
+            8 MiB, None for no limit.
+        initial_size : int, optional
+            Number of products of the first page. Defaults to 100.
+
+        """
+        if not 0 < min_size <= max_size:
+            raise ValueError(f"Invalid page size bounds [{min_size}, {max_size}]")
+
+        if target_time <= 0:
+            raise ValueError(f"target_time must be a positive number of seconds, got {target_time}")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.target_time = target_time
+        self.max_bytes = max_bytes
+        self._size = min(max(initial_size, min_size), max_size)
+        self._time_per_product = None
+        self._bytes_per_product = None
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        """Number of products to request in the next page."""
+        return self._size
+
+    def _average(self, previous, latest):
+        """Returns the moving average of a cost updated with its latest observation."""
+        if previous is None:
+            return latest
+
+        return self._SMOOTHING * latest + (1 - self._SMOOTHING) * previous
+
+    def observe(self, products: int, elapsed: float, size: int):
+        """Updates the page size with a response received from the PDS Registry API.
+
+        Parameters
+        ----------
+        products : int
+            Number of products in the page.
+        elapsed : float
+            Time taken to receive the page, in seconds.
+        size : int
+            Size of the body of the response, in bytes.
+
+        """
+        if products < self.min_size:
+            return
+
+        with self._lock:
+            self._time_per_product = self._average(self._time_per_product, elapsed / products)
+            self._bytes_per_product = self._average(self._bytes_per_product, size / products)
+
+            ideal = self.target_time / max(self._time_per_product, 1e-9)
+
+            if self.max_bytes is not None:
+                ideal = min(ideal, self.max_bytes / max(self._bytes_per_product, 1.0))
+
+            ideal = min(max(ideal, self._size / self._MAX_STEP), self._size * self._MAX_STEP)
+            size = int(min(max(ideal, self.min_size), self.max_size))
+
+            if size != self._size:
+                logger.debug("Page size adjusted from %d to %d products", self._size, size)
+                self._size = size
@@ -0,0 +1,567 @@
+"""Predicates on the properties of the products, planned between the PDS Registry API and local checks.
+
+Some filters cannot be evaluated, or not exactly, by the PDS Registry API: the
+``like`` operator is unreliable when combined with other clauses, regular
+expressions are not supported, and a range on a multi-valued property may be
+matched by two different values. A predicate is therefore planned in two
+parts: the narrowest clause of the query language selecting a superset of the
+matching products, sent to the API, and the residual predicate checked locally
+on each product received, when the clause is not exact.
+
+Predicates are built from the properties they apply to, and combined with the
+``&``, ``|`` and ``~`` operators::
+
+    >>> lid = prop("lid")
+    >>> predicate = lid.startswith("urn:nasa:pds:orex.ocams:data_") & ~lid.matches(r"_calibrated$")
+
+As the query language, a predicate on a multi-valued property is satisfied by
+a product if any of its values is.
+"""
+import re
+from datetime import datetime
+from datetime import timezone
+from typing import Callable
+from typing import NamedTuple
+from typing import Optional
+
+from .chunked_result_set import or_clauses
+from .query import And
+from .query import Clause
+from .query import Expression
+from .query import Or
+from .result_set import parse_harvest_time
+
+_REGEX_LITERAL = re.compile(r"[^\\.^$*+?{}\[\]|()]")
+"""Characters of a regular expression matching themselves"""
+
+_REGEX_OPTIONAL = "*?{"
+"""Quantifiers making the character before them optional"""
+
+
+class Pushdown(NamedTuple):
+    """Part of a predicate evaluated by the PDS Registry API."""
+
+    expression: Optional[Expression]
+    """Expression selecting a superset of the products matching the predicate, None if all products must be fetched."""
+
+    exact: bool
+    """True if the expression selects exactly the products matching the predicate, none needing a local check."""
+
+
+def _literal(value) -> str:
+    """Returns the literal of a value in the query language of the PDS Registry API."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return str(value)
+
+    if isinstance(value, datetime):
+        value = _utc(value).isoformat().replace("+00:00", "Z")
+
+    escaped = str(value).replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _utc(dt: datetime) -> datetime:
+    """Returns the datetime in UTC, naive datetimes being considered in UTC already."""
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt.astimezone(timezone.utc)
+
+
+def _coercion(bound) -> Callable:
+    """Returns the function converting the property values to the type of a bound, to compare them with it."""
+    if isinstance(bound, (int, float)) and not isinstance(bound, bool):
+        return float
+
+    if isinstance(bound, datetime):
+        return parse_harvest_time
+
+    return str
+
+
+def _successor(prefix: str) -> Optional[str]:
+    """Returns the first string greater than all the strings starting with the prefix, None if there is none."""
+    while prefix and ord(prefix[-1]) == 0x10FFFF:
+        prefix = prefix[:-1]
+
+    if not prefix:
+        return None
+
+    return prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+def _regex_prefix(pattern: str) -> str:
+    """Returns the literal prefix of the values matching a regular expression anchored at their start, if any."""
+    if not pattern.startswith("^") or "|" in pattern:
+        return ""
+
+    prefix = []
+    i = 1
+
+    while i < len(pattern):
+        char = pattern[i]
+
+        # Escaped punctuation matches itself, other escapes are character classes
+        if char == "\\" and i + 1 < len(pattern) and not pattern[i + 1].isalnum():
+            char = pattern[i + 1]
+            i += 1
+        elif not _REGEX_LITERAL.fullmatch(char):
+            break
+
+        # A quantifier applies to the last literal character, which is not part of the prefix then
+        if i + 1 < len(pattern) and pattern[i + 1] in _REGEX_OPTIONAL:
+            break
+
+        prefix.append(char)
+        i += 1
+
+    return "".join(prefix)
+
+
+class Predicate:
+    """Condition a product must satisfy, see `plan()`."""
+
+    __slots__ = ()
+
+    def properties(self) -> frozenset:
+        """Returns the names of the properties the predicate applies to, needed to check it locally."""
+        raise NotImplementedError
+
+    def pushdown(self) -> Pushdown:
+        """Returns the part of the predicate evaluated by the PDS Registry API."""
+        return Pushdown(None, False)
+
+    def residual(self) -> Optional["Predicate"]:
+        """Returns the part of the predicate to check locally on the products selected by the pushdown, if any."""
+        return None if self.pushdown().exact else self
+
+    def compile(self) -> Callable:
+        """Returns a function telling if a product satisfies the predicate, created once to check many products."""
+        raise NotImplementedError
+
+    def __and__(self, other: "Predicate") -> "Predicate":
+        """Returns the predicate satisfied by the products satisfying both predicates."""
+        return AllOf((self, other))
+
+    def __or__(self, other: "Predicate") -> "Predicate":
+        """Returns the predicate satisfied by the products satisfying any of the predicates."""
+        return AnyOf((self, other))
+
+    def __invert__(self) -> "Predicate":
+        """Returns the predicate satisfied by the products not satisfying this one."""
+        return Not(self)
+
+    def __eq__(self, other):
+        """Returns True if the other predicate is of the same kind and has the same description."""
+        return type(self) is type(other) and str(self) == str(other)
+
+    def __hash__(self):
+        """Returns the hash of the kind and the description of this predicate."""
+        return hash((type(self).__name__, str(self)))
+
+    def __repr__(self):
+        """Returns the representation of this predicate."""
+        return f"{type(self).__name__}({str(self)!r})"
+
+
+class _PropertyPredicate(Predicate):
+    """Predicate satisfied by the products having any value of a property satisfying a test."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        """Creates a new predicate on the given property."""
+        self.name = name
+
+    def properties(self) -> frozenset:
+        """Returns the name of the property of this predicate."""
+        return frozenset((self.name,))
+
+    def _value_test(self) -> Callable:
+        """Returns the function testing a single value of the property."""
+        raise NotImplementedError
+
+    def compile(self) -> Callable:
+        """Returns a function telling if any value of the property of a product passes the test."""
+        name = self.name
+        test = self._value_test()
+
+        def check(product) -> bool:
+            values = (product.properties or {}).get(name)
+
+            if values is None:
+                return False
+
+            if not isinstance(values, list):
+                values = [values]
+
+            return any(test(value) for value in values)
+
+        return check
+
+
+class Equals(_PropertyPredicate):
+    """Predicate satisfied by the products with a property equal to a value."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, name: str, value):
+        """Creates a new predicate selecting the products whose property equals the value."""
+        super().__init__(name)
+        self.value = value
+
+    def pushdown(self) -> Pushdown:
+        """Returns the eq clause of the property, exact."""
+        return Pushdown(Clause(f"{self.name} eq {_literal(self.value)}"), True)
+
+    def _value_test(self) -> Callable:
+        """Returns the function comparing a value to the one of this predicate."""
+        coerce, value = _coercion(self.value), self.value
+
+        if isinstance(value, datetime):
+            value = _utc(value)
+
+        def test(v) -> bool:
+            try:
+                return coerce(v) == value
+            except (TypeError, ValueError):
+                return False
+
+        return test
+
+    def __str__(self):
+        """Returns the description of this predicate."""
+        return f"{self.name} eq {_literal(self.value)}"
+
+
+class In(_PropertyPredicate):
+    """Predicate satisfied by the products with a property equal to any of a set of values."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, name: str, values):
+        """Creates a new predicate selecting the products whose property equals any of the values."""
+        super().__init__(name)
+        self.values = tuple(sorted({str(value) for value in values}))
+
+    def pushdown(self) -> Pushdown:
+        """Returns the OR clause of the values, exact, unless the values are too many for a single clause."""
+        if len(or_clauses(self.name, self.values)) > 1:
+            return Pushdown(None, False)
+
+        return Pushdown(Or(Clause(f"{self.name} eq {_literal(value)}") for value in self.values), True)
+
+    def _value_test(self) -> Callable:
+        """Returns the function testing the membership of a value."""
+        values = frozenset(self.values)
+        return lambda v: str(v) in values
+
+    def __str__(self):
+        """Returns the description of this predicate."""
+        return f"{self.name} in ({', '.join(_literal(value) for value in self.values)})"
+
+
+class Prefix(_PropertyPredicate):
+    """Predicate satisfied by the products with a property starting with a prefix."""
+
+    __slots__ = ("prefix",)
+
+    def __init__(self, name: str, prefix: str):
+        """Creates a new predicate selecting the products whose property starts with the prefix."""
+        super().__init__(name)
+        self.prefix = prefix
+
+    def pushdown(self) -> Pushdown:
+        """Returns the range of strings starting with the prefix, checked locally as ranges apply to any value."""
+        if not self.prefix:
+            return Pushdown(None, False)
+
+        lower = Clause(f"{self.name} ge {_literal(self.prefix)}")
+        successor = _successor(self.prefix)
+
+        if successor is None:
+            return Pushdown(lower, False)
+
+        return Pushdown(And((lower, Clause(f"{self.name} lt {_literal(successor)}"))), False)
+
+    def _value_test(self) -> Callable:
+        """Returns the function testing the prefix of a value."""
+        prefix = self.prefix
+        return lambda v: str(v).startswith(prefix)
+
+    def __str__(self):
+        """Returns the description of this predicate."""
+        return f"{self.name} startswith {_literal(self.prefix)}"
+
+
+class Regex(_PropertyPredicate):
+    """Predicate satisfied by the products with a property matching a regular expression."""
+
+    __slots__ = ("pattern",)
+
+    def __init__(self, name: str, pattern: str):
+        """Creates a new predicate selecting the products whose property matches the pattern, searched with re."""
+        super().__init__(name)
+        re.compile(pattern)
+        self.pattern = pattern
+
+    def pushdown(self) -> Pushdown:
+        """Returns the range of strings starting with the literal prefix of an anchored pattern, if any."""
+        return Prefix(self.name, _regex_prefix(self.pattern)).pushdown()
+
+    def _value_test(self) -> Callable:
+        """Returns the function searching the pattern in a value."""
+        search = re.compile(self.pattern).search
+        return lambda v: search(str(v)) is not None
+
+    def __str__(self):
+        """Returns the description of this predicate."""
+        return f"{self.name} matches {_literal(self.pattern)}"
+
+
+class Between(_PropertyPredicate):
+    """Predicate satisfied by the products with a property within a range, bounds included."""
+
+    __slots__ = ("low", "high")
+
+    def __init__(self, name: str, low=None, high=None):
+        """Creates a new predicate selecting the products whose property is within [low, high], None for no bound.
+
+        Values are compared as numbers to numeric bounds, as dates to datetime
+        bounds and as strings otherwise.
+
+        """
+        if low is None and high is None:
+            raise ValueError(f"The range of {name} must have at least one bound")
+
+        super().__init__(name)
+        self.low = low
+        self.high = high
+
+    def pushdown(self) -> Pushdown:
+        """Returns the clauses of the bounds, only exact for a single bound as two bounds may match two values."""
+        clauses = []
+
+        if self.low is not None:
+            clauses.append(Clause(f"{self.name} ge {_literal(self.low)}"))
+
+        if self.high is not None:
+            clauses.append(Clause(f"{self.name} le {_literal(self.high)}"))
+
+        return Pushdown(And(clauses), len(clauses) == 1)
+
+    def _value_test(self) -> Callable:
+        """Returns the function testing that a value is within the range."""
+        coerce = _coercion(self.low if self.low is not None else self.high)
+        low, high = (_utc(b) if isinstance(b, datetime) else b for b in (self.low, self.high))
+
+        def test(v) -> bool:
+            try:
+                v = coerce(v)
+                return (low is None or v >= low) and (high is None or v <= high)
+            except (TypeError, ValueError):
+                return False
+
+        return test
+
+    def __str__(self):
+        """Returns the description of this predicate."""
+        low = "" if self.low is None else _literal(self.low)
+        high = "" if self.high is None else _literal(self.high)
+        return f"{self.name} between [{low}, {high}]"
+
+
+class _Combination(Predicate):
+    """Logical combination of several predicates."""
+
+    __slots__ = ("operands",)
+
+    operator = ""
+    """Logical operator joining the operands in the description of the predicate."""
+
+    def __init__(self, operands):
+        """Creates a new combination of the given predicates, nested ones of the same kind being flattened."""
+        flattened = []
+
+        for operand in operands:
+            flattened.extend(operand.operands if type(operand) is type(self) else (operand,))
+
+        self.operands = tuple(flattened)
+
+    def properties(self) -> frozenset:
+        """Returns the names of the properties of all the operands."""
+        return frozenset().union(*(operand.properties() for operand in self.operands))
+
+    def __str__(self):
+        """Returns the description of this predicate, its operands being sorted."""
+        return f" {self.operator} ".join(sorted(f"({operand})" for operand in self.operands))
+
+
+class AllOf(_Combination):
+    """Predicate satisfied by the products satisfying all its operands."""
+
+    __slots__ = ()
+
+    operator = "and"
+
+    def pushdown(self) -> Pushdown:
+        """Returns the conjunction of the pushdowns of the operands, exact if they all are."""
+        pushdowns = [operand.pushdown() for operand in self.operands]
+        expressions = [p.expression for p in pushdowns if p.expression is not None]
+        return Pushdown(And(expressions) if expressions else None, all(p.exact for p in pushdowns))
+
+    def residual(self) -> Optional[Predicate]:
+        """Returns the conjunction of the residuals of the operands, the exact ones being left to the API."""
+        residuals = [r for r in (operand.residual() for operand in self.operands) if r is not None]
+
+        if len(residuals) <= 1:
+            return residuals[0] if residuals else None
+
+        return AllOf(residuals)
+
+    def compile(self) -> Callable:
+        """Returns a function telling if a product satisfies all the operands."""
+        checks = [operand.compile() for operand in self.operands]
+        return lambda product: all(check(product) for check in checks)
+
+
+class AnyOf(_Combination):
+    """Predicate satisfied by the products satisfying any of its operands."""
+
+    __slots__ = ()
+
+    operator = "or"
+
+    def pushdown(self) -> Pushdown:
+        """Returns the disjunction of the pushdowns of the operands, none if an operand cannot be pushed down."""
+        pushdowns = [operand.pushdown() for operand in self.operands]
+
+        if any(p.expression is None for p in pushdowns):
+            return Pushdown(None, False)
+
+        return Pushdown(Or(p.expression for p in pushdowns), all(p.exact for p in pushdowns))
+
+    def compile(self) -> Callable:
+        """Returns a function telling if a product satisfies any of the operands."""
+        checks = [operand.compile() for operand in self.operands]
+        return lambda product: any(check(product) for check in checks)
+
+
+class Not(Predicate):
+    """Predicate satisfied by the products not satisfying its operand."""
+
+    __slots__ = ("operand",)
+
+    def __init__(self, operand: Predicate):
+        """Creates the negation of the given predicate."""
+        self.operand = operand
+
+    def properties(self) -> frozenset:
+        """Returns the names of the properties of the operand."""
+        return self.operand.properties()
+
+    def pushdown(self) -> Pushdown:
+        """Returns the negation of the pushdown of the operand if exact, the negation of a superset being none."""
+        pushdown = self.operand.pushdown()
+
+        if not pushdown.exact or pushdown.expression is None:
+            return Pushdown(None, False)
+
+        return Pushdown(Clause(f"not ({pushdown.expression.query_string()})"), True)
+
+    def compile(self) -> Callable:
+        """Returns a function telling if a product does not satisfy the operand."""
+        check = self.operand.compile()
+        return lambda product: not check(product)
+
+    def __invert__(self) -> Predicate:
+        """Returns the operand of this negation."""
+        return self.operand
+
+    def __str__(self):
+        """Returns the description of this predicate."""
+        return f"not ({self.operand})"
+
+
+class Property:
+    """Property of the products, building the predicates on its values, see `prop()`."""
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        """Creates a new Property of the given name, for example ``lid``."""
+        self.name = name
+
+    def eq(self, value) -> Predicate:
+        """Returns the predicate satisfied by the products whose property equals the value."""
+        return Equals(self.name, value)
+
+    def isin(self, values) -> Predicate:
+        """Returns the predicate satisfied by the products whose property equals any of the values."""
+        return In(self.name, values)
+
+    def startswith(self, prefix: str) -> Predicate:
+        """Returns the predicate satisfied by the products whose property starts with the prefix."""
+        return Prefix(self.name, prefix)
+
+    def matches(self, pattern: str) -> Predicate:
+        r"""Returns the predicate satisfied by the products whose property matches the regular expression.
+
+        The pattern is searched anywhere in the values, as with `re.search()`.
+        Only anchored patterns starting with literal characters, for example
+        ``^urn:nasa:pds:orex\.ocams:data_.*_l2$``, narrow down the products
+        requested from the PDS Registry API.
+
+        """
+        return Regex(self.name, pattern)
+
+    def between(self, low=None, high=None) -> Predicate:
+        """Returns the predicate satisfied by the products whose property is within [low, high], bounds included."""
+        return Between(self.name, low, high)
+
+    def ge(self, value) -> Predicate:
+        """Returns the predicate satisfied by the products whose property is greater than or equal to the value."""
+        return Between(self.name, low=value)
+
+    def le(self, value) -> Predicate:
+        """Returns the predicate satisfied by the products whose property is lower than or equal to the value."""
+        return Between(self.name, high=value)
+
+
+def prop(name: str) -> Property:
+    """Returns the property of the given name, to build predicates on it.
+
+    Parameters
+    ----------
+    name : str
+        Name of the property, for example ``lid`` or ``pds:Identification_Area.pds:title``.
+
+    Returns
+    -------
+    The Property, whose methods return predicates on its values.
+
+    """
+    return Property(name)
+
+
+class QueryPlan(NamedTuple):
+    """Split of a predicate between the PDS Registry API and local checks, see `plan()`."""
+
+    server: Optional[Expression]
+    """Expression evaluated by the PDS Registry API, None if all products must be fetched."""
+
+    residual: Optional[Predicate]
+    """Predicate checked locally on the products returned by the API, None if the server expression is exact."""
+
+
+def plan(predicate: Predicate) -> QueryPlan:
+    """Splits a predicate into the narrowest expression evaluated by the API and the residual checked locally.
+
+    Parameters
+    ----------
+    predicate : Predicate
+        The predicate to plan.
+
+    Returns
+    -------
+    The plan of the predicate.
+
+    """
+    return QueryPlan(predicate.pushdown().expression, predicate.residual())
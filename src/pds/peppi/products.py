@@ -1,5 +1,7 @@
 """Main class of the library in this module."""
+from .client import AsyncPDSRegistryClient
 from .client import PDSRegistryClient
+from .query_builder import AsyncQueryBuilder
 from .query_builder import QueryBuilder
 
 
@@ -11,12 +13,35 @@ class Products(QueryBuilder):
     converted to a pandas DataFrame.
     """
 
-    def __init__(self, client: PDSRegistryClient):
+    def __init__(self, client: PDSRegistryClient, prefetch: int = 0):
         """Constructor of the products.
 
         Attributes
         ----------
         client : PDSRegistryClient
             Client defining the connexion with the PDS Search API
+        prefetch : int, optional
+            Number of result pages to fetch ahead in the background while
+            iterating on the current one. Defaults to 0 (no prefetching).
+        """
+        super().__init__(client, prefetch=prefetch)
+
+
+class AsyncProducts(AsyncQueryBuilder):
+    """Use to access any class of planetary products via the PDS Registry API from asyncio code.
+
+    This class is an inheritor of :class:`.query_builder.AsyncQueryBuilder`, which
+    carries the same methods to subset the products as :class:`Products`, and
+    which can be iterated on with ``async for`` or converted to a pandas DataFrame
+    with ``await products.as_dataframe()``.
+    """
+
+    def __init__(self, client: AsyncPDSRegistryClient):
+        """Constructor of the products.
+
+        Attributes
+        ----------
+        client : AsyncPDSRegistryClient
+            Client defining the connexion with the PDS Search API
         """
         super().__init__(client)
@@ -0,0 +1,176 @@
+"""Expression tree of the queries elaborated by a QueryBuilder.
+
+Each filter method of a QueryBuilder adds a node to the tree, which is only
+compiled into the query string sent to the PDS Registry API when the query is
+executed. Compilation goes through the canonical form of the tree: nested
+operations of the same kind are flattened, repeated operands are removed and
+the remaining ones are sorted, so that logically identical queries compile to
+the same query string, and share the same hash.
+"""
+import hashlib
+import re
+
+from .cache import _enclosed
+
+_QUOTED = re.compile(r'("(?:[^"\\]|\\.)*")')
+"""Quoted strings of a clause, whose whitespaces are significant"""
+
+_WHITESPACES = re.compile(r"\s+")
+"""Runs of whitespaces, collapsed into a single space outside quoted strings"""
+
+
+def _normalize_clause(text: str) -> str:
+    """Returns the clause with its whitespaces collapsed, except in quoted strings, and enclosing parentheses removed."""
+    parts = _QUOTED.split(text)
+    normalized = "".join(part if i % 2 else _WHITESPACES.sub(" ", part) for i, part in enumerate(parts)).strip()
+
+    while _enclosed(normalized):
+        normalized = normalized[1:-1].strip()
+
+    return normalized
+
+
+class Expression:
+    """Node of the expression tree of a query.
+
+    Two expressions are equal if they are of the same kind and compile to the
+    same query string.
+
+    """
+
+    __slots__ = ()
+
+    def compile(self) -> str:
+        """Returns the query string of this expression, as is."""
+        raise NotImplementedError
+
+    def canonical(self) -> "Expression":
+        """Returns the canonical form of this expression."""
+        return self
+
+    def query_string(self) -> str:
+        """Returns the query string of the canonical form of this expression, empty if there is no clause."""
+        return self.canonical().compile()
+
+    def query_hash(self) -> str:
+        """Returns the hexadecimal SHA-256 digest of the canonical query string of this expression.
+
+        The hash is stable across processes and versions of Python, it can be
+        used to identify the results of a query.
+
+        """
+        return hashlib.sha256(self.query_string().encode("utf-8")).hexdigest()
+
+    def __bool__(self):
+        """Returns False if this expression holds no clause."""
+        return True
+
+    def __eq__(self, other):
+        """Returns True if the other expression is of the same kind and compiles to the same query string."""
+        return type(self) is type(other) and self.compile() == other.compile()
+
+    def __hash__(self):
+        """Returns the hash of the kind and the query string of this expression."""
+        return hash((type(self).__name__, self.compile()))
+
+    def __str__(self):
+        """Returns the query string of this expression."""
+        return self.compile()
+
+
+class Clause(Expression):
+    """Single clause of a query, in the domain language of the PDS Registry API.
+
+    The clause is kept as an opaque string, with its whitespaces normalized.
+
+    """
+
+    __slots__ = ("text",)
+
+    def __init__(self, text: str):
+        """Creates a new Clause.
+
+        Parameters
+        ----------
+        text : str
+            Clause, for example ``lidvid eq "urn:nasa:pds:bundle::1.0"``.
+
+        """
+        self.text = _normalize_clause(text)
+
+    def compile(self) -> str:
+        """Returns the text of this clause."""
+        return self.text
+
+    def __bool__(self):
+        """Returns False if the clause is empty."""
+        return bool(self.text)
+
+    def __repr__(self):
+        """Returns the representation of this clause."""
+        return f"Clause({self.text!r})"
+
+
+class _Operation(Expression):
+    """Logical operation between several expressions."""
+
+    __slots__ = ("operands",)
+
+    operator = ""
+    """Logical operator joining the operands."""
+
+    def __init__(self, operands=()):
+        """Creates a new operation between the given expressions."""
+        self.operands = tuple(operands)
+
+    def canonical(self) -> Expression:
+        """Returns the canonical form of this operation.
+
+        Operands are turned into their canonical forms, the ones of the same
+        operation are flattened into this one, the empty and repeated ones are
+        removed, and the others sorted by query string. An operation left with
+        a single operand is replaced by it.
+
+        """
+        operands = set()
+
+        for operand in self.operands:
+            operand = operand.canonical()
+
+            if type(operand) is type(self):
+                operands.update(operand.operands)
+            elif operand:
+                operands.add(operand)
+
+        if len(operands) == 1:
+            return operands.pop()
+
+        return type(self)(sorted(operands, key=lambda o: (o.compile(), type(o).__name__)))
+
+    def compile(self) -> str:
+        """Returns the query string of the operation, each operand being enclosed in parentheses."""
+        return f" {self.operator} ".join(f"({operand.compile()})" for operand in self.operands if operand)
+
+    def __bool__(self):
+        """Returns False if none of the operands holds a clause."""
+        return any(self.operands)
+
+    def __repr__(self):
+        """Returns the representation of this operation."""
+        return f"{type(self).__name__}({list(self.operands)!r})"
+
+
+class And(_Operation):
+    """Expression selecting the products matching all its operands."""
+
+    __slots__ = ()
+
+    operator = "and"
+
+
+class Or(_Operation):
+    """Expression selecting the products matching any of its operands."""
+
+    __slots__ = ()
+
+    operator = "or"
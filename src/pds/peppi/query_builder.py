@@ -2,38 +2,144 @@
 
 Contains all the methods use to elaborate the PDS4 Information Model queries through the PDS Search API.
 """
+import hashlib
 import logging
+import os
+from contextlib import contextmanager
 from datetime import datetime
-from functools import cache
+from datetime import timezone
 from typing import Literal
 from typing import Optional
+from typing import TYPE_CHECKING
 from typing import Union
 
-import pandas as pd
-
+from .cache import normalize_query
+from .checkpoint import Checkpointer
+from .checkpoint import IterationCheckpoint
+from .chunked_result_set import AsyncChunkedResultSet
+from .chunked_result_set import ChunkedResultSet
+from .chunked_result_set import or_clauses
+from .client import AsyncPDSRegistryClient
 from .client import PDSRegistryClient
+from .context import ContextResolver
+from .context import keyword_clause
+from .dataframe import DataFrameBuilder
+from .dataframe import FIELD_TYPES
+from .dataframe import MULTI_VALUED
+from .export import export
+from .export import NdjsonWriter
+from .export import ParquetWriter
+from .page_size import AdaptivePageSize
+from .predicates import AllOf
+from .predicates import In
+from .predicates import plan
+from .predicates import Predicate
+from .query import And
+from .query import Clause
+from .query import Expression
+from .query import Or
+from .result_set import AsyncResultSet
+from .result_set import format_harvest_time
+from .result_set import parse_harvest_time
 from .result_set import ResultSet
+from .sharded_result_set import ShardedResultSet
+from .sync import SyncCheckpoint
+from .sync import SyncState
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 logger = logging.getLogger(__name__)
 
 PROCESSING_LEVELS = Literal["telemetry", "raw", "partially-processed", "calibrated", "derived"]
 """Processing level values that can be used with has_processing_level()"""
 
+SUPERSEDED_BY = "ops:Provenance.ops:superseded_by"
+"""Property set by the PDS Registry on the products superseded by a newer version, to the LIDVID of that version"""
+
+_SINGLE_VALUED_PROPERTIES = frozenset(("lid", "lidvid"))
+"""Properties with a single value per product, the chunks of a list of their values selecting distinct products"""
+
+
+def _version_key(vid: str) -> tuple:
+    """Returns the sort key of a VID, its dot-separated parts being compared as numbers, "1.10" being after "1.9"."""
+    try:
+        return 1, tuple(int(part) for part in vid.split("."))
+    except ValueError:
+        return 0, (vid,)
+
+
+def _latest_check(latest: dict):
+    """Returns a function telling if a product is of the latest version of its LID, given the latest version keys."""
+
+    def check(product) -> bool:
+        lid, _, vid = product.id.partition("::")
+        return latest.get(lid) == _version_key(vid)
+
+    return check
+
 
 class QueryBuilder:
     """QueryBuilder provides method to elaborate complex PDS queries."""
 
-    def __init__(self, client: PDSRegistryClient):
-        """Creates a new instance of the QueryBuilder class."""
+    _CHUNKED_RESULT_SET = ChunkedResultSet
+    """Class of the result set paging the chunk queries of long lists of values."""
+
+    def __init__(self, client: PDSRegistryClient, prefetch: int = 0):
+        """Creates a new instance of the QueryBuilder class.
+
+        Parameters
+        ----------
+        client : PDSRegistryClient
+            Client defining the connexion with the PDS Search API.
+        prefetch : int, optional
+            Number of result pages to fetch ahead in the background while
+            iterating on the current one. Defaults to 0 (no prefetching).
+
+        """
         self._client = client
-        self._q_string = ""
+        self._query: Expression = And()
         self._fields: list[str] = []
-        self._result_set = ResultSet(self._client)
+        self._list_filter: Optional[In] = None
+        self._chunked_result_set = None
+        self._checkpointer: Optional[Checkpointer] = None
+        self._residual: Optional[Predicate] = None
+        self._latest_only = False
+        self._scanned_hash: Optional[str] = None
+        self._result_set = ResultSet(self._client, prefetch=prefetch)
 
     def __str__(self):
         """Returns a formatted string representation of the current query."""
         return "\n  and".join(self._q_string.split("and"))
 
+    @property
+    def _q_string(self) -> str:
+        """Query string compiled from the canonical form of the expression tree of the query."""
+        return self._query.query_string()
+
+    def query_hash(self) -> str:
+        """Returns a stable hash of the current query, identical for all the queries selecting the same products.
+
+        Repeated clauses, the order of the clauses joined by the same
+        logical operator, and the spacing of the clauses do not change the hash.
+        The filters applied locally, see `where()` and `latest_only()`, are
+        part of the hash.
+
+        """
+        local_filters = [str(self._residual)] if self._residual is not None else []
+
+        if self._latest_only:
+            local_filters.append("latest only")
+
+        if not local_filters:
+            return self._query.query_hash()
+
+        return hashlib.sha256("\n".join([self._q_string, *local_filters]).encode("utf-8")).hexdigest()
+
+    def _filters_locally(self) -> bool:
+        """Returns True if the products are filtered locally, by residual predicates or by version."""
+        return self._residual is not None or self._latest_only
+
     def __iter__(self):
         """Iterates over all products returned by the current query filter applied to this Products instance.
 
@@ -46,24 +152,182 @@ class QueryBuilder:
         ------
         product : pds.api_client.models.pds_product.PDSProduct
             The next product within the current page fetched from the PDS Registry
-            API.
+            API, as a pds.peppi.raw.RawProduct record if `raw()` was called.
 
         """
-        while True:
+        if self._checkpointer is not None and self._resume_checkpoint():
+            return
+
+        yield from self._iterate(self._q_string, self._checkpointer)
+
+    def _iterate(self, query_string, checkpointer: Optional[Checkpointer] = None):
+        """Iterates over all products returned by the given query string, see `__iter__()`.
+
+        If a checkpointer is given, the position of the iteration is saved with
+        it once the products of a page have all been consumed.
+
+        The products are checked against the residual predicate of the query,
+        if any, and their version, in latest only mode, the limit of the query
+        applying to the products passing these checks.
+
+        """
+        if not self._filters_locally():
+            yield from self._iterate_pages(query_string, checkpointer)
+            return
+
+        latest = self._latest_versions(query_string) if self._latest_only else None
+
+        with self._local_scope(latest) as (check, limit):
+            products = self._iterate_pages(query_string, checkpointer)
+            matched = 0
+
             try:
-                for product in self._result_set.init_new_page(query_string=self._q_string, fields=self._fields):
+                for product in filter(check, products):
                     yield product
-            except RuntimeError as err:
-                # Make sure we got the StopIteration that was converted to a RuntimeError,
-                # otherwise we need to re-raise
-                if "StopIteration" not in str(err):
-                    raise err
+                    matched += 1
+
+                    if matched == limit:
+                        break
+            finally:
+                products.close()
+
+            if matched == limit:
+                # The pages left may hold more products satisfying the residual predicate
+                if checkpointer is not None:
+                    checkpointer.save(self._iteration_checkpoint(complete=True))
+
+                self._active_result_set().reset()
+
+    @contextmanager
+    def _local_scope(self, latest: Optional[dict] = None):
+        """Prepares the query for the local checks of its products within the context.
+
+        The properties needed by the residual predicate are requested along with
+        the fields of the query, and the limit of the query is lifted, as it
+        applies to the products passing the checks. The function checking the
+        residual predicate and the version of the products, if the latest
+        versions are given, is yielded with the limit.
+
+        """
+        max_products, fields = self._result_set.max_products, self._fields
+        self._result_set.max_products = None
+        checks = []
+
+        if latest is not None:
+            checks.append(_latest_check(latest))
+
+        if self._residual is not None:
+            checks.append(self._residual.compile())
+
+            if fields:
+                self._fields = [*fields, *sorted(self._residual.properties().difference(fields))]
+
+        def check_all(product) -> bool:
+            return all(check(product) for check in checks)
 
-                self._result_set.reset()
-                break
+        try:
+            yield checks[0] if len(checks) == 1 else check_all, max_products
+        finally:
+            self._result_set.max_products, self._fields = max_products, fields
+
+    def _version_scan(self, builder_class):
+        """Returns a query of the given class paging through the products of this query, with only their LID.
+
+        The pages of the scan are reported to the instrument of the client as
+        pages of this query.
+
+        """
+        scan = builder_class(self._client)
+        scan._query, scan._list_filter = self._query, self._list_filter
+        scan._fields = ["lid"]
+        scan._scanned_hash = self.query_hash()
+        scan._result_set.inherit_settings(self._result_set)
+        scan._result_set.raw, scan._result_set.max_products = True, None
+        return scan
+
+    def _latest_versions(self, query_string) -> dict:
+        """Returns the key of the latest version of each LID among the products of the query string.
+
+        The products are paged through in raw mode, with only their "lid"
+        property requested, their VID being read from their LIDVID, and a
+        single version key per LID being kept.
+
+        """
+        latest: dict = {}
+
+        for product in self._version_scan(QueryBuilder)._iterate_pages(query_string):
+            lid, _, vid = product.id.partition("::")
+            key = _version_key(vid)
+
+            if lid not in latest or key > latest[lid]:
+                latest[lid] = key
+
+        return latest
+
+    def _iterate_pages(self, query_string, checkpointer: Optional[Checkpointer] = None):
+        """Iterates over all products returned by the PDS Registry API for the given query string, see `_iterate()`."""
+        result_set = self._active_result_set()
+
+        try:
+            while True:
+                try:
+                    for product in result_set.init_new_page(query_string=query_string, fields=self._fields):
+                        yield product
+                except RuntimeError as err:
+                    # Make sure we got the StopIteration that was converted to a RuntimeError,
+                    # otherwise we need to re-raise
+                    if "StopIteration" not in str(err):
+                        raise err
+
+                    if checkpointer is not None:
+                        checkpointer.save(self._iteration_checkpoint(complete=True))
+
+                    result_set.reset()
+                    break
+
+                # The consumer asked for the product following the last one of
+                # the page, all the products of the page have been consumed
+                if checkpointer is not None and checkpointer.page_consumed():
+                    checkpointer.save(self._iteration_checkpoint())
+        finally:
+            # Iteration may have been abandoned early (break, max_rows...),
+            # pages fetched ahead are not needed anymore
+            result_set.stop_prefetch()
+
+    def _active_result_set(self):
+        """Returns the result set paging the query, one sending a query per chunk if a list filter was split.
+
+        The chunked result set takes the settings of the result set of this
+        instance (page size, raw mode, limit) each time it is returned. The
+        pages of both are reported to the instrument of the client with the
+        hash of this query, see `query_hash()`, whatever the query strings sent.
+
+        """
+        self._result_set.query_hash = self._scanned_hash or self.query_hash()
+
+        if self._list_filter is None:
+            return self._result_set
+
+        if self._chunked_result_set is None:
+            clauses = or_clauses(self._list_filter.name, self._list_filter.values)
+            self._chunked_result_set = self._CHUNKED_RESULT_SET(self._client, clauses)
+
+        self._chunked_result_set.inherit_settings(self._result_set)
+        return self._chunked_result_set
+
+    def _check_not_paginating(self):
+        """Raises a RuntimeError if there are still results to be iterated over from a previous query."""
+        # TODO have something more agnostic of what the iterator is
+        #      since the iterator is not managed by this present object
+        if any(getattr(r, "_page_counter", None) for r in (self._result_set, self._chunked_result_set)):
+            raise RuntimeError(
+                "Cannot modify query while paginating over previous query results.\n"
+                "Use the reset() method on this Products instance or exhaust all returned "
+                "results before assigning new query clauses."
+            )
 
     def _add_clause(self, clause, logical_join="and"):
-        """Adds the provided clause to the query string to use on the next fetch of products from the Registry API.
+        """Adds the provided clause to the query to use on the next fetch of products from the Registry API.
 
         Repeated calls to this method results in a joining with any previously
         added clauses via Logical AND.
@@ -97,30 +361,67 @@ class QueryBuilder:
             over from a previous query.
 
         """
-        # TODO transition off usage of this function to build a query string
-        #      in response to each user method call.
-        #      rather, have each user call track state about what was requested,
-        #      and then only assemble the final query string when __iter__ is called.
-        #      this should allow us flexibility to assemble individual sub-clauses
-        #      with logical OR, then join all sub-clauses together with logical AND.
+        self._add_expression(Clause(clause), logical_join=logical_join)
+
+    def _add_expression(self, expression: Expression, logical_join="and"):
+        """Adds the provided expression to the expression tree of the query, see `_add_clause()`.
+
+        Joining with a logical OR applies to all the clauses added so far, so
+        that get().get().observationals() selects the observational products
+        among the two requested ones.
+
+        """
         if logical_join.lower() not in ("and", "or"):
             raise ValueError(f'Invalid logical join operator "{logical_join}", must be either "and" or "or".')
 
-        # TODO have something more agnostic of what the iterator is
-        #      since the iterator is not managed by this present object
-        if hasattr(self._result_set, "_page_counter") and self._result_set._page_counter:
-            raise RuntimeError(
-                "Cannot modify query while paginating over previous query results.\n"
-                "Use the reset() method on this Products instance or exhaust all returned "
-                "results before assigning new query clauses."
-            )
-
-        clause = f"({clause})"
+        self._check_not_paginating()
 
-        if self._q_string:
-            self._q_string += f" {logical_join.lower()} {clause}"
+        if not self._query:
+            self._query = And((expression,))
+        elif logical_join.lower() == "or":
+            self._query = Or((self._query, expression))
         else:
-            self._q_string = clause
+            self._query = And((self._query, expression))
+
+    def _add_list_filter(self, property_name: str, values: list):
+        """Adds a filter selecting the products whose property equals any of the values, apply OR operator between them.
+
+        Short lists are added as a single clause of the query string. Longer
+        ones are split into OR clauses of bounded sizes, each one sent as its
+        own query, see `pds.peppi.chunked_result_set.ChunkedResultSet`. Only
+        the longest of these lists is split, the products of its queries being
+        checked locally against the other ones, as residual predicates.
+
+        Parameters
+        ----------
+        property_name : str
+            Name of the property, for example ``lidvid``.
+        values : list of str
+            Values to select.
+
+        """
+        clauses = or_clauses(property_name, values)
+
+        if len(clauses) == 1:
+            self._add_expression(Or(Clause(f'{property_name} eq "{value}"') for value in values))
+            return
+
+        self._check_not_paginating()
+        chunked, residual = In(property_name, values), self._list_filter
+
+        # Splitting several lists would send a query per combination of their chunks
+        if residual is not None and len(residual.values) > len(chunked.values):
+            chunked, residual = residual, chunked
+
+        if residual is not None:
+            self._residual = residual if self._residual is None else self._residual & residual
+
+        self._list_filter = chunked
+        self._chunked_result_set = None
+
+    def _chunks_overlap(self) -> bool:
+        """Returns True if a product may match several chunk queries of the list filter, and be counted by each."""
+        return self._list_filter is not None and self._list_filter.name not in _SINGLE_VALUED_PROPERTIES
 
     def _has_target(self, identifiers: Union[list, str]):
         """Adds a query clause from 1 or n, target lids, apply OR operator between lids."""
@@ -128,16 +429,49 @@ class QueryBuilder:
             identifiers = [identifiers]
 
         if len(identifiers) > 0:
-            clause = "or ".join([f'ref_lid_target eq "{identifier}"' for identifier in identifiers])
-            # add parenthesis to force the precendence on the 'or' operator
-            clause = f"({clause})"
-            self._add_clause(clause)
+            self._add_list_filter("ref_lid_target", identifiers)
         else:
             logger.warning("No target filter defined, ignore")
 
         return self
 
-    def has_target(self, target: str):
+    def _has_context(self, property_name: str, context_type: str, keywords: list):
+        """Adds a query clause selecting products referencing any of the context products matching the keywords.
+
+        Keywords are resolved into LIDs by the context resolver shared by the
+        process, looked up with the client of this query if needed, LIDs are
+        used as is.
+
+        """
+        lids_by_keyword = ContextResolver.shared(self._client).resolve_many(keywords, context_type, self._client)
+        return self._add_context_lids(property_name, context_type, lids_by_keyword)
+
+    def _add_context_lids(self, property_name: str, context_type: str, lids_by_keyword: dict):
+        """Adds a query clause selecting products referencing any of the resolved context LIDs.
+
+        A keyword resolved into no LID is kept as is in the clause, so that it
+        matches no product rather than dropping the filter.
+
+        """
+        for keyword, lids in lids_by_keyword.items():
+            if not keyword.startswith("urn:"):
+                logger.info(
+                    'Found %d product(s) matching %s "%s", lids are: %s', len(lids), context_type, keyword, lids
+                )
+
+            if not lids:
+                logger.warning('No %s matching "%s", no product will be selected for it', context_type, keyword)
+
+        lids = sorted({lid for keyword, lids in lids_by_keyword.items() for lid in lids or [keyword]})
+
+        if lids:
+            self._add_list_filter(property_name, lids)
+        else:
+            logger.warning("No %s filter defined, ignore", context_type)
+
+        return self
+
+    def has_target(self, target: Union[str, list]):
         """Adds a query clause selecting products having a given target as a lid or a keyword.
 
         Adds a query clause selecting products having a given target as a lid
@@ -145,31 +479,21 @@ class QueryBuilder:
 
         Parameters
         ----------
-        target : str
+        target : str or list of str
             Identifier (LID) of the target or a keyword matching the title of the target.
             The provided keyword is "cannonicalized" into several variations
-        (uppercase, lowercase, etc.) to cast a wider search across target names.
-
+            (uppercase, lowercase, etc.) to cast a wider search across target names.
+            Products having any of the targets of a list are selected, the keywords
+            of the list being resolved together.
 
         Returns
         -------
         This instance with the "has target" query filter applied.
 
         """
-        if target.startswith("urn:"):
-            logger.info('Finding products with target lid "%s"', target)
-            lids = [target]
-        else:
-
-            @cache
-            def _get_lids_from_title(k):
-                return list({p.properties["lid"][0] for p in QueryBuilder(self._client).contexts(k)})
-
-            logger.info('Finding products with target "%s"', target)
-            lids = _get_lids_from_title(target)
-            logger.info('Found %d product(s) matching target "%s", lids are: %s', len(lids), target, lids)
-
-        return self._has_target(lids)
+        targets = [target] if isinstance(target, str) else list(target)
+        logger.info("Finding products with target(s) %s", targets)
+        return self._has_context("ref_lid_target", "target", targets)
 
     def has_investigation(self, identifier: str):
         """Adds a query clause selecting products having a given investigation identifier.
@@ -177,16 +501,14 @@ class QueryBuilder:
         Parameters
         ----------
         identifier : str
-            Identifier (LIDVID) of the target.
+            Identifier (LIDVID) of the investigation, or a keyword matching its title.
 
         Returns
         -------
         This instance with the "has investigation" query filter applied.
 
         """
-        clause = f'ref_lid_investigation eq "{identifier}"'
-        self._add_clause(clause)
-        return self
+        return self._has_context("ref_lid_investigation", "investigation", [identifier])
 
     def before(self, dt: datetime):
         """Adds a query clause selecting products with a start date before the given datetime.
@@ -241,6 +563,23 @@ class QueryBuilder:
         self._add_clause(clause)
         return self
 
+    def of_bundle(self, identifier: str):
+        """Adds a query clause selecting products belonging to the given Parent Bundle identifier.
+
+        Parameters
+        ----------
+        identifier : str
+            Identifier (LIDVID) of the Bundle.
+
+        Returns
+        -------
+        This instance with the "Parent Bundle" filter applied.
+
+        """
+        clause = f'ops:Provenance.ops:parent_bundle_identifier eq "{identifier}"'
+        self._add_clause(clause)
+        return self
+
     def observationals(self):
         """Adds a query clause selecting only "Product Observational" type products on the current filter.
 
@@ -306,20 +645,7 @@ class QueryBuilder:
         self._add_clause(clause)
 
         if keyword:
-
-            def _canonicalize_string(string: str):
-                return string.title(), string.upper(), string.lower()
-
-            def eq_cannonical_string_clause(property_name: str, value: str):
-                return " or ".join(f'{property_name} eq "{s}"' for s in _canonicalize_string(value))
-
-            q_string = eq_cannonical_string_clause("pds:Identification_Area.pds:title", keyword)
-            q_string += f"or {eq_cannonical_string_clause('pds:Alias.pds:alternate_title', keyword)}"
-
-            # add parenthesis to enforce the expected precedence on the or operator.
-            q_string = f"({q_string})"
-
-            self._add_clause(q_string)
+            self._add_clause(keyword_clause(keyword))
 
         return self
 
@@ -329,16 +655,14 @@ class QueryBuilder:
         Parameters
         ----------
         identifier : str
-            Identifier (LIDVID) of the instrument.
+            Identifier (LIDVID) of the instrument, or a keyword matching its title.
 
         Returns
         -------
         This instance with the "has instrument" filter applied.
 
         """
-        clause = f'ref_lid_instrument eq "{identifier}"'
-        self._add_clause(clause)
-        return self
+        return self._has_context("ref_lid_instrument", "instrument", [identifier])
 
     def has_instrument_host(self, identifier: str):
         """Adds a query clause selecting products having an instrument host matching the provided identifier.
@@ -438,11 +762,399 @@ class QueryBuilder:
         self._add_clause(f'lidvid eq "{identifier}"', logical_join="or")
         return self
 
+    def latest_only(self, server_side: bool = True):
+        """Selects the latest version of each product, skipping the LIDVIDs superseded by a newer version.
+
+        Parameters
+        ----------
+        server_side : bool, optional
+            If True (default), the PDS Registry API excludes the products it has
+            marked as superseded, with their `SUPERSEDED_BY` property, so that
+            they are not downloaded at all. Otherwise, versions are compared
+            locally: the LIDVIDs of the products of the query are paged through
+            first, with only their "lid" property, keeping the highest VID of each
+            LID, then the products are streamed, the ones of a lower VID being
+            skipped as they are received. Only the highest version key of each
+            LID is held in memory. Use it for products registered without
+            their provenance, or to keep the latest version among the products
+            of the query rather than among all the versions registered.
+
+        Returns
+        -------
+        This instance with the latest version filter applied.
+
+        """
+        self._check_not_paginating()
+
+        if server_side:
+            self._add_clause(f"not ({SUPERSEDED_BY} exists)")
+        else:
+            self._latest_only = True
+
+        return self
+
+    def get_many(self, lidvids: list):
+        """Adds a query filter selecting the products with any of the provided LIDVIDs.
+
+        Long lists are split into several queries of bounded lengths, which
+        are sent concurrently. Each product is returned once, even if its
+        LIDVID is listed several times.
+
+        Parameters
+        ----------
+        lidvids : list of str
+            LIDVIDs of the products to filter for.
+
+        Returns
+        -------
+        This instance with the "LIDVID identifiers" filter applied.
+
+        """
+        if len(lidvids) > 0:
+            self._add_list_filter("lidvid", lidvids)
+        else:
+            logger.warning("No LIDVID filter defined, ignore")
+
+        return self
+
+    def checkpoint(self, path: str, every_pages: int = 10, every_seconds: Optional[float] = None):
+        """Saves the position of the iteration over the results to a file, to resume it after an interruption.
+
+        The checkpoint is saved once all the products of a page have been
+        consumed, every given number of pages or seconds, and once the last
+        product has been consumed. When the query is iterated on again, in this
+        process or another one, while the checkpoint file exists, iteration
+        resumes right after the last product consumed at the time of the
+        checkpoint: no product before it is yielded again, none after it is
+        skipped. The products consumed after the latest checkpoint, before an
+        interruption, are yielded again. Once the iteration has completed,
+        iterating again yields nothing, until the checkpoint file is removed.
+
+        Checkpoints are not available for parallel queries, for queries on
+        lists of identifiers too long to be sent as a single query, nor for
+        queries whose products are filtered locally, by the residual predicates
+        of `where()` or by `latest_only(server_side=False)`, as the position
+        saved is the one of the products received from the PDS Registry API.
+
+        Parameters
+        ----------
+        path : str
+            Path of the JSON checkpoint file, resumed from if it exists.
+        every_pages : int, optional
+            Number of pages consumed between two checkpoints. Defaults to 10.
+        every_seconds : float, optional
+            Maximum time between two checkpoints, in seconds. Defaults to no
+            time limit.
+
+        Returns
+        -------
+        This instance with checkpointing enabled.
+
+        Raises
+        ------
+        ValueError
+            If the query is parallel or filtered locally, or, when iterating, if
+            the checkpoint file holds the position of another query.
+
+        """
+        self._check_not_paginating()
+
+        if isinstance(self._result_set, ShardedResultSet):
+            raise ValueError("Checkpoints are not available for parallel queries")
+
+        if self._filters_locally():
+            raise ValueError("Checkpoints are not available for queries filtered locally")
+
+        self._checkpointer = Checkpointer(path, every_pages=every_pages, every_seconds=every_seconds)
+        return self
+
+    @classmethod
+    def from_checkpoint(cls, client: PDSRegistryClient, path: str, every_pages: int = 10, every_seconds=None):
+        """Creates a QueryBuilder resuming the iteration saved to a checkpoint file, see `checkpoint()`.
+
+        The query, the fields and the limit of the resumed query are the ones
+        saved to the checkpoint, its filters are not needed.
+
+        Parameters
+        ----------
+        client : PDSRegistryClient
+            Client defining the connexion with the PDS Search API.
+        path : str
+            Path of the JSON checkpoint file.
+        every_pages : int, optional
+            Number of pages consumed between two checkpoints. Defaults to 10.
+        every_seconds : float, optional
+            Maximum time between two checkpoints, in seconds. Defaults to no
+            time limit.
+
+        Returns
+        -------
+        A new instance whose iteration resumes from the checkpoint.
+
+        Raises
+        ------
+        FileNotFoundError
+            If the checkpoint file does not exist.
+
+        """
+        checkpointer = Checkpointer(path, every_pages=every_pages, every_seconds=every_seconds)
+        checkpoint = checkpointer.load()
+
+        if checkpoint is None:
+            raise FileNotFoundError(f"No checkpoint found at {path}")
+
+        builder = cls(client)
+        builder._query = And((Clause(checkpoint.query),))
+        builder._fields = list(checkpoint.fields)
+        builder._result_set.max_products = checkpoint.max_products
+        builder._checkpointer = checkpointer
+        return builder
+
+    def _resume_checkpoint(self) -> bool:
+        """Moves the pagination to the position saved by the checkpointer, unless already paginating.
+
+        Returns True if the iteration saved was complete, nothing being left to iterate on.
+
+        """
+        if self._list_filter is not None:
+            raise ValueError("Checkpoints are not available for queries split into chunks of identifiers")
+
+        if self._filters_locally():
+            raise ValueError("Checkpoints are not available for queries filtered locally")
+
+        result_set = self._result_set
+        checkpoint = self._checkpointer.load()
+
+        if checkpoint is None or result_set._page_counter is not None or result_set._received:
+            return False
+
+        if checkpoint.query_hash != self.query_hash():
+            raise ValueError(
+                f'Checkpoint {self._checkpointer.path} is of query "{checkpoint.query}", not "{self._q_string}"'
+            )
+
+        if checkpoint.complete:
+            logger.info("Iteration saved to checkpoint %s is complete", self._checkpointer.path)
+            return True
+
+        logger.info("Resuming iteration after %d product(s) from %s", checkpoint.received, self._checkpointer.path)
+        result_set.seek(checkpoint.harvest_time, checkpoint.received)
+        return False
+
+    def _iteration_checkpoint(self, complete: bool = False) -> IterationCheckpoint:
+        """Returns the checkpoint of the current position of the iteration."""
+        result_set = self._result_set
+
+        return IterationCheckpoint(
+            query=self._q_string,
+            query_hash=self.query_hash(),
+            fields=list(self._fields),
+            max_products=result_set.max_products,
+            harvest_time=result_set._latest_harvest_time,
+            received=result_set._received,
+            hits=result_set._hits,
+            complete=complete,
+        )
+
     def fields(self, fields: list):
         """Reduce the list of fields returned, for improved efficiency."""
         self._fields = fields
         return self
 
+    def parallel(self, shards: int = 4, ordered: bool = True, max_workers: Optional[int] = None):
+        """Pages through the results of the query over several concurrent connections.
+
+        The harvest time range of the query is split into disjoint shards of
+        similar hit counts, which are paged at the same time on a thread pool.
+        Their products are merged into the single stream iterated on.
+
+        Parameters
+        ----------
+        shards : int, optional
+            Number of harvest time ranges to page concurrently. Defaults to 4.
+        ordered : bool, optional
+            If True (default), products are yielded in ascending harvest time, as
+            without parallelism. Otherwise, products are yielded as soon as they
+            are received, which keeps all the connections busy.
+        max_workers : int, optional
+            Maximum number of concurrent requests. Defaults to one per shard.
+
+        Returns
+        -------
+        This instance with the parallel pagination enabled.
+
+        """
+        self._check_not_paginating()
+
+        if self._checkpointer is not None:
+            raise ValueError("Checkpoints are not available for parallel queries")
+
+        self._result_set.reset()
+        previous = self._result_set
+        self._result_set = ShardedResultSet(self._client, shards=shards, ordered=ordered, max_workers=max_workers)
+        self._result_set.inherit_settings(previous)
+        return self
+
+    def limit(self, n: int):
+        """Restricts the results of the query to its first n products.
+
+        The number of products requested from the PDS Registry API is limited
+        accordingly, the last page requested holding just the products needed.
+
+        Parameters
+        ----------
+        n : int
+            Maximum number of products returned.
+
+        Returns
+        -------
+        This instance with the limit applied.
+
+        """
+        if n < 1:
+            raise ValueError(f"The limit must be a positive number of products, got {n}")
+
+        self._check_not_paginating()
+        self._result_set.max_products = n
+        return self
+
+    def head(self, n: int = 5):
+        """Restricts the results of the query to its first n products, see `limit()`."""
+        return self.limit(n)
+
+    def count(self) -> int:
+        """Returns the number of products matching the query, without fetching any of them.
+
+        Only the summary of the results is requested from the PDS Registry API,
+        which makes it cheap to size a query before iterating on it. The count
+        does not exceed the limit set with `limit()`, if any.
+
+        A query with residual predicates, see `where()`, has its products
+        fetched to be checked, with just the properties these predicates need.
+        A query in local latest only mode, see `latest_only()`, has the LIDVIDs
+        of its products fetched. So does a query split into chunks of values of
+        a multi-valued property, see `has_target()`, whose products may match
+        several chunks but are counted once.
+
+        """
+        if self._filters_locally() or self._chunks_overlap():
+            return self._count_local()
+
+        return self._active_result_set().count(self._q_string)
+
+    def _count_latest(self, latest: dict) -> int:
+        """Returns the number of LIDs of the latest versions, within the limit of the query if any."""
+        max_products = self._result_set.max_products
+        return len(latest) if max_products is None else min(len(latest), max_products)
+
+    def _count_local(self) -> int:
+        """Returns the number of products passing the local checks, fetching just the properties they need."""
+        if self._residual is None and self._latest_only:
+            return self._count_latest(self._latest_versions(self._q_string))
+
+        fields = self._fields
+        # The LIDVIDs of the products are enough to count them once
+        self._fields = sorted(self._residual.properties()) if self._residual is not None else ["lid"]
+
+        try:
+            with self._raw_mode():
+                return sum(1 for _ in self._iterate(self._q_string))
+        finally:
+            self._fields = fields
+
+    def exists(self) -> bool:
+        """Returns True if at least one product matches the query, without fetching any of them.
+
+        Products of a query with residual predicates are fetched until one satisfies them.
+
+        """
+        if self._residual is not None:
+            with self._limited(1):
+                return self._count_local() > 0
+
+        # The latest version of a LID is among the products if any of its versions is
+        return self._active_result_set().count(self._q_string) > 0
+
+    @contextmanager
+    def _limited(self, max_rows: Optional[int]):
+        """Limits the number of products of the query to max_rows within the context, unless already lower."""
+        max_products = self._result_set.max_products
+
+        if max_rows and (max_products is None or max_rows < max_products):
+            self._result_set.max_products = max_rows
+
+        try:
+            yield
+        finally:
+            self._result_set.max_products = max_products
+
+    def raw(self):
+        """Yields the products as lightweight records decoded straight from the JSON responses.
+
+        The products are pds.peppi.raw.RawProduct records with the same ``id``
+        and ``properties`` attributes as the API client models, skipping their
+        costly validation. This is the mode used by `as_dataframe()` and the
+        exports of this QueryBuilder.
+
+        Returns
+        -------
+        This instance with the raw mode enabled.
+
+        """
+        self._check_not_paginating()
+        self._result_set.raw = True
+        return self
+
+    @contextmanager
+    def _raw_mode(self):
+        """Makes the products be yielded as raw records within the context."""
+        raw = self._result_set.raw
+        self._result_set.raw = True
+
+        try:
+            yield
+        finally:
+            self._result_set.raw = raw
+
+    def adaptive_page_size(
+        self,
+        min_size: int = 10,
+        max_size: int = 1000,
+        target_time: float = 1.0,
+        max_bytes: Optional[int] = 8 * 1024**2,
+    ):
+        """Tunes the number of products requested per page from the time and size of the responses.
+
+        Queries restricted to a few `fields()` then need fewer round-trips to
+        the PDS Registry API, while pages of products with all their properties
+        are kept reasonably small.
+
+        Parameters
+        ----------
+        min_size : int, optional
+            Minimum number of products per page. Defaults to 10.
+        max_size : int, optional
+            Maximum number of products per page. Defaults to 1000.
+        target_time : float, optional
+            Targeted time to receive a page, in seconds. Defaults to 1.
+        max_bytes : int, optional
+            Targeted maximum size of a page, in bytes. Defaults to 8 MiB, None for no limit.
+
+        Returns
+        -------
+        This instance with the adaptive page size enabled.
+
+        """
+        self._check_not_paginating()
+        self._result_set.page_sizer = AdaptivePageSize(
+            min_size=min_size,
+            max_size=max_size,
+            target_time=target_time,
+            max_bytes=max_bytes,
+            initial_size=ResultSet._PAGE_SIZE,
+        )
+        return self
+
     def filter(self, clause: str):
         """Selects products that match the provided query clause.
 
@@ -458,48 +1170,439 @@ class QueryBuilder:
         self._add_clause(clause)
         return self
 
-    def as_dataframe(self, max_rows: Optional[int] = None):
+    def where(self, *predicates: Predicate):
+        """Selects the products satisfying all the predicates, evaluated by the PDS Registry API where possible.
+
+        Each predicate is planned into the narrowest clause of the query
+        language selecting a superset of the products satisfying it, added to
+        the query, and a residual predicate, checked locally on each product
+        received when the clause is not exact. For example, a prefix is sent
+        as a range of strings, and a regular expression as the range of its
+        literal prefix, if anchored. Sets of values too large for a single
+        clause are sent as several queries, see `get_many()`, the largest one
+        only if there are several.
+
+        The limit of the query applies to the products satisfying the residual
+        predicates. The properties these predicates apply to are requested
+        along with the `fields()`, if any. The residual predicates apply to all
+        the products of the query, including the ones added by `get()`.
+
+        Parameters
+        ----------
+        predicates : pds.peppi.predicates.Predicate
+            Predicates built with `pds.peppi.predicates.prop()`, for example
+            ``prop("lid").startswith("urn:nasa:pds:orex.ocams:data_")``.
+
+        Returns
+        -------
+        This instance with the predicates applied.
+
+        """
+        self._check_not_paginating()
+
+        for predicate in predicates:
+            for conjunct in predicate.operands if isinstance(predicate, AllOf) else (predicate,):
+                if isinstance(conjunct, In) and conjunct.pushdown().expression is None:
+                    self._add_list_filter(conjunct.name, list(conjunct.values))
+                    continue
+
+                server, residual = plan(conjunct)
+
+                if server is not None:
+                    self._add_expression(server)
+
+                if residual is not None:
+                    self._residual = residual if self._residual is None else self._residual & residual
+
+        return self
+
+    def as_dataframe(
+        self, max_rows: Optional[int] = None, multi_valued: MULTI_VALUED = "list", typed: Union[bool, dict] = False
+    ):
         """Returns the found products as a pandas DataFrame.
 
         Loops on the products found and returns a pandas DataFrame with the product properties as columns
         and their identifier as index.
 
+        The columns are assembled while the products are streamed. Columns with
+        at most one value per product are unwrapped into scalar values.
+
         Parameters
         ----------
         max_rows : int
             Optional limit in the number of products returned in the dataframe. Convenient for test while developing.
             Default is no limit (None)
+        multi_valued : str, optional
+            Representation of the columns with several values for some products:
+            "list" (default) keeps them as lists, "explode" turns each value into
+            its own row.
+        typed : bool or dict, optional
+            If True, converts the single-valued columns to compact types:
+            datetime64 for the dates, numbers for the numeric fields and
+            categoricals for the fields with few distinct values, following
+            `pds.peppi.dataframe.FIELD_TYPES`. A dict of field name patterns
+            and types overrides these defaults. Defaults to False, the values
+            being kept as returned by the PDS Registry API.
 
         Returns
         -------
         The products as a pandas dataframe.
         """
-        result_as_dict_list = []
-        lidvid_index = []
-        n = 0
+        builder = DataFrameBuilder(multi_valued=multi_valued, types=self._field_types(typed))
+
+        with self._raw_mode(), self._limited(max_rows):
+            for p in self:
+                builder.append(p.id, p.properties)
+
+        self.reset()
+
+        return self._build_dataframe(builder)
+
+    @staticmethod
+    def _field_types(typed: Union[bool, dict]) -> Optional[dict]:
+        """Returns the field type map of typed DataFrames, the defaults overridden by the given map, None if untyped."""
+        if typed is False:
+            return None
+
+        if typed is True:
+            return dict(FIELD_TYPES)
+
+        return {**typed, **{k: v for k, v in FIELD_TYPES.items() if k not in typed}}
+
+    def _dataframe_columns(self) -> Optional[list]:
+        """Returns the columns of the DataFrames of the products, the fields requested, None if all are requested."""
+        if not self._fields:
+            return None
+
+        return [*self._fields, ResultSet._SORT_PROPERTY]
+
+    def iter_dataframes(
+        self, chunk_size: int = 10000, multi_valued: MULTI_VALUED = "list", typed: Union[bool, dict] = False
+    ):
+        """Iterates over the found products as a sequence of pandas DataFrames of at most chunk_size products.
+
+        The products are paged through once, as for the iteration on this
+        QueryBuilder, each DataFrame being yielded as soon as its products have
+        been received, so that results larger than memory can be processed
+        chunk by chunk. As with `as_dataframe()`, the DataFrames are indexed by
+        LIDVID.
+
+        All the DataFrames have the same columns, represented the same way, so
+        that they can be concatenated or written out one by one: the fields
+        requested with `fields()`, in the same order, if any. Otherwise, the
+        columns seen in the previous DataFrames are kept in the following ones,
+        new columns being appended, and a column found to hold several values
+        for a product keeps lists of values in the following DataFrames.
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Maximum number of products per DataFrame. Defaults to 10,000.
+        multi_valued : str, optional
+            Representation of the columns with several values for some products:
+            "list" (default) keeps them as lists, "explode" turns each value into
+            its own row, in which case DataFrames may hold more than chunk_size rows.
+        typed : bool or dict, optional
+            If True, converts the single-valued columns to compact types:
+            datetime64 for the dates, numbers for the numeric fields and
+            categoricals for the fields with few distinct values, following
+            `pds.peppi.dataframe.FIELD_TYPES`. The type of each column is
+            decided once, so that all the DataFrames have the same dtypes,
+            though categoricals may have different categories: the values of
+            later DataFrames which cannot be converted become missing values.
+            A dict of field name patterns and types overrides the defaults.
+            Defaults to False.
+
+        Yields
+        ------
+        The DataFrames of the successive chunks of products.
+
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be a positive number of products, got {chunk_size}")
+
+        builder = DataFrameBuilder(
+            multi_valued=multi_valued, columns=self._dataframe_columns(), types=self._field_types(typed)
+        )
 
-        for p in self:
-            result_as_dict_list.append(p.properties)
-            lidvid_index.append(p.id)
-            n += 1
+        with self._raw_mode():
+            for p in self:
+                builder.append(p.id, p.properties)
 
-            if max_rows and n >= max_rows:
-                break
+                if len(builder) >= chunk_size:
+                    yield builder.build()
+                    builder.clear_rows()
+
+        if len(builder) > 0:
+            yield builder.build()
 
         self.reset()
 
-        if n > 0:
-            df = pd.DataFrame.from_records(result_as_dict_list, index=lidvid_index)
+    def _build_dataframe(self, builder: DataFrameBuilder):
+        """Returns the DataFrame assembled by the builder, warning if the query did not return any product."""
+        df = builder.build()
 
-            # reduce useless arrays in dataframe columns
-            for column in df.columns:
-                only_1_element = df.apply(lambda x: len(x[column]) <= 1, axis=1)  # noqa
-                if only_1_element.all():
-                    df[column] = df.apply(lambda x: x[column][0], axis=1)  # noqa
-            return df
-        else:
+        if df is None:
             logger.warning("Query with clause %s did not return any products.", self._q_string)  # noqa
-            return None
+
+        return df
+
+    def to_ndjson(
+        self,
+        path: str,
+        row_group_size: int = 10000,
+        max_rows_per_file: Optional[int] = None,
+        max_bytes_per_file: Optional[int] = None,
+        compression: Optional[str] = None,
+    ):
+        """Writes the found products into newline-delimited JSON files, while they are streamed.
+
+        Each line is a ``{"id": ..., "properties": {...}}`` object. At most one
+        group of rows is held in memory, whatever the number of products found.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file. When a limit of rows or bytes per file is set, the
+            files are numbered, ``results.ndjson`` becoming ``results-00000.ndjson``,
+            ``results-00001.ndjson``...
+        row_group_size : int, optional
+            Number of products written at once. Defaults to 10000.
+        max_rows_per_file : int, optional
+            Number of products after which a new file is started. Defaults to no limit.
+        max_bytes_per_file : int, optional
+            Size, in bytes, after which a new file is started. Defaults to no limit.
+        compression : str, optional
+            Compression of the files: None (default), "gzip", "bz2" or "xz". The
+            matching suffix is appended to the path if missing.
+
+        Returns
+        -------
+        The paths of the written files.
+
+        """
+        writer = NdjsonWriter(path, row_group_size, max_rows_per_file, max_bytes_per_file, compression=compression)
+
+        with self._raw_mode():
+            paths = export(self, writer)
+            self.reset()
+
+        return paths
+
+    def to_parquet(
+        self,
+        path: str,
+        row_group_size: int = 10000,
+        max_rows_per_file: Optional[int] = None,
+        max_bytes_per_file: Optional[int] = None,
+        compression: Optional[str] = "snappy",
+    ):
+        """Writes the found products into Parquet files, one row group at a time, while they are streamed.
+
+        The files have an ``id`` column, holding the LIDVID of the products, and
+        a list of strings column per property. At most one row group is held in
+        memory, whatever the number of products found. Requires the optional
+        ``pyarrow`` dependency.
+
+        Parameters
+        ----------
+        path : str
+            Path of the file. When a limit of rows or bytes per file is set, or
+            when products bring new properties after the first row group, the
+            files are numbered, ``results.parquet`` becoming ``results-00000.parquet``,
+            ``results-00001.parquet``...
+        row_group_size : int, optional
+            Number of products per row group. Defaults to 10000.
+        max_rows_per_file : int, optional
+            Number of products after which a new file is started. Defaults to no limit.
+        max_bytes_per_file : int, optional
+            Size, in bytes, after which a new file is started. Defaults to no limit.
+        compression : str, optional
+            Compression codec of the files. Defaults to "snappy".
+
+        Returns
+        -------
+        The paths of the written files.
+
+        """
+        writer = ParquetWriter(path, row_group_size, max_rows_per_file, max_bytes_per_file, compression=compression)
+
+        with self._raw_mode():
+            paths = export(self, writer)
+            self.reset()
+
+        return paths
+
+    def _iterate_since(self, checkpoint: Optional[SyncCheckpoint]):
+        """Iterates over the products harvested since the checkpoint, if any.
+
+        Products harvested exactly at the checkpoint harvest time are skipped if
+        their LIDVID is part of the checkpoint. The checkpoint reached once all
+        the products have been yielded is returned.
+
+        """
+        query_string = self._q_string
+        checkpoint_time = harvest_time = None
+        checkpoint_lidvids = lidvids = set()
+
+        if checkpoint is not None:
+            if normalize_query(checkpoint.query) != normalize_query(self._q_string):
+                logger.warning(
+                    'Query "%s" differs from the one of the previous synchronization "%s"',
+                    self._q_string,
+                    checkpoint.query,
+                )
+
+            checkpoint_time = harvest_time = parse_harvest_time(checkpoint.harvest_time)
+            checkpoint_lidvids = set(checkpoint.lidvids)
+            lidvids = set(checkpoint_lidvids)
+            clause = f'({ResultSet._SORT_PROPERTY} ge "{checkpoint.harvest_time}")'
+            query_string = f"({query_string}) and {clause}" if query_string else clause
+
+        for product in self._iterate(query_string):
+            product_harvest_time = parse_harvest_time(product.properties[ResultSet._SORT_PROPERTY][0])
+
+            # Products harvested at the checkpoint time may have been received already
+            if checkpoint_time is not None and (
+                product_harvest_time < checkpoint_time
+                or (product_harvest_time == checkpoint_time and product.id in checkpoint_lidvids)
+            ):
+                continue
+
+            if harvest_time is None or product_harvest_time > harvest_time:
+                harvest_time = product_harvest_time
+                lidvids = {product.id}
+            elif product_harvest_time == harvest_time:
+                lidvids.add(product.id)
+
+            yield product
+
+        if harvest_time is None:
+            return checkpoint
+
+        return SyncCheckpoint(format_harvest_time(harvest_time), sorted(lidvids), self._q_string)
+
+    def sync(self, name: str, state: SyncState):
+        """Iterates over the products harvested since the latest synchronization of this query.
+
+        The first synchronization of a query yields all its products. Once all
+        the new products have been yielded, the highest harvest time reached is
+        recorded in the state under the given name, so that the next
+        synchronization of the query only yields the products harvested, or
+        updated, since. Nothing is recorded if the iteration is abandoned.
+
+        Parameters
+        ----------
+        name : str
+            Name identifying the query in the synchronization state.
+        state : pds.peppi.sync.SyncState
+            Synchronization state, storing the high-water mark of each named query.
+
+        Yields
+        ------
+        product : pds.api_client.models.pds_product.PDSProduct
+            The next product harvested since the latest synchronization.
+
+        """
+        checkpoint = yield from self._iterate_since(state.get(name))
+
+        if checkpoint is not None:
+            state.update(name, checkpoint)
+
+    def _sync_records(self, name: str, state: SyncState):
+        """Returns a builder holding the products to synchronize, and the checkpoint reached."""
+        builder = DataFrameBuilder()
+
+        with self._raw_mode():
+            iterator = self._iterate_since(state.get(name))
+
+            while True:
+                try:
+                    p = next(iterator)
+                except StopIteration as stop:
+                    return builder, stop.value
+
+                builder.append(p.id, p.properties)
+
+    def sync_dataframe(self, name: str, state: SyncState, df: Optional["pd.DataFrame"] = None):
+        """Appends the products harvested since the latest synchronization of this query to a DataFrame.
+
+        Products already present in the DataFrame, by LIDVID, are replaced by
+        their updated version. The synchronization state is only updated once
+        the new DataFrame has been built.
+
+        Parameters
+        ----------
+        name : str
+            Name identifying the query in the synchronization state.
+        state : pds.peppi.sync.SyncState
+            Synchronization state, storing the high-water mark of each named query.
+        df : pandas.DataFrame, optional
+            DataFrame of the previously synchronized products, as returned by
+            `as_dataframe()` or a previous call of this method.
+
+        Returns
+        -------
+        The DataFrame of all the synchronized products, None if there are none.
+
+        """
+        builder, checkpoint = self._sync_records(name, state)
+        new_df = builder.build()
+
+        if new_df is not None and df is not None:
+            import pandas as pd
+
+            df = pd.concat([df, new_df])
+            df = df[~df.index.duplicated(keep="last")]
+        elif new_df is not None:
+            df = new_df
+
+        if checkpoint is not None:
+            state.update(name, checkpoint)
+
+        return df
+
+    def sync_parquet(self, name: str, state: SyncState, path: str, compression: Optional[str] = "snappy"):
+        """Writes the products harvested since the latest synchronization of this query into a Parquet dataset.
+
+        Each synchronization adds a new file to the dataset directory. A product
+        updated since a previous synchronization appears in several files, the
+        most recent file holding its latest version. The synchronization state
+        is only updated once the file has been written.
+
+        Requires the optional ``pyarrow`` dependency.
+
+        Parameters
+        ----------
+        name : str
+            Name identifying the query in the synchronization state.
+        state : pds.peppi.sync.SyncState
+            Synchronization state, storing the high-water mark of each named query.
+        path : str
+            Directory of the Parquet dataset, created if needed.
+        compression : str, optional
+            Compression codec of the Parquet file. Defaults to "snappy".
+
+        Returns
+        -------
+        The path of the written file, None if there was no new product.
+
+        """
+        builder, checkpoint = self._sync_records(name, state)
+        file_path = None
+
+        if len(builder) > 0:
+            os.makedirs(path, exist_ok=True)
+            timestamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+            file_path = os.path.join(path, f"part-{timestamp}.parquet")
+            df = builder.build()
+            df.index.name = "lidvid"
+            df.to_parquet(file_path, compression=compression)
+
+        if checkpoint is not None:
+            state.update(name, checkpoint)
+
+        return file_path
 
     def reset(self):
         """Resets internal pagination state to default.
@@ -510,4 +1613,276 @@ class QueryBuilder:
 
         """
         self._result_set.reset()
-        self._q_string = ""
+        self._result_set.max_products = None
+        self._query = And()
+
+        if self._chunked_result_set is not None:
+            self._chunked_result_set.reset()
+
+        self._chunked_result_set = None
+        self._list_filter = None
+        self._checkpointer = None
+        self._residual = None
+        self._latest_only = False
+
+
+class AsyncQueryBuilder(QueryBuilder):
+    """QueryBuilder whose queries are executed from asyncio code.
+
+    The same filter methods as the QueryBuilder are available, the results
+    are iterated on with ``async for`` and `as_dataframe()` is a coroutine.
+    Many queries may run concurrently on the same event loop, sharing the
+    connection pool of their AsyncPDSRegistryClient.
+    """
+
+    _CHUNKED_RESULT_SET = AsyncChunkedResultSet
+
+    def __init__(self, client: AsyncPDSRegistryClient):
+        """Creates a new instance of the AsyncQueryBuilder class.
+
+        Parameters
+        ----------
+        client : AsyncPDSRegistryClient
+            Client defining the connexion with the PDS Search API.
+
+        """
+        super().__init__(client)
+        self._result_set = AsyncResultSet(client)
+        self._pending_contexts: list[tuple] = []
+
+    def __iter__(self):
+        """Not supported, the results of an AsyncQueryBuilder must be iterated on with ``async for``.
+
+        Raises
+        ------
+        TypeError
+
+        """
+        raise TypeError(f"{self.__class__.__name__} must be iterated on with 'async for'")
+
+    async def __aiter__(self):
+        """Iterates over all products returned by the current query filter applied to this instance.
+
+        Pagination is handled as for the synchronous iteration, the pages being
+        fetched without blocking the event loop.
+
+        Yields
+        ------
+        product : pds.api_client.models.pds_product.PDSProduct
+            The next product within the current page fetched from the PDS Registry
+            API.
+
+        """
+        await self._resolve_pending_contexts()
+
+        if self._checkpointer is not None and self._resume_checkpoint():
+            return
+
+        async for product in self._aiterate(self._checkpointer):
+            yield product
+
+    async def _aiterate(self, checkpointer: Optional[Checkpointer] = None):
+        """Iterates over all products returned by the query, checked locally if needed, see `_iterate()`."""
+        if not self._filters_locally():
+            async for product in self._aiterate_pages(checkpointer):
+                yield product
+            return
+
+        latest = await self._alatest_versions() if self._latest_only else None
+
+        with self._local_scope(latest) as (check, limit):
+            products = self._aiterate_pages(checkpointer)
+            matched = 0
+
+            try:
+                async for product in products:
+                    if not check(product):
+                        continue
+
+                    yield product
+                    matched += 1
+
+                    if matched == limit:
+                        break
+            finally:
+                await products.aclose()
+
+            if matched == limit:
+                if checkpointer is not None:
+                    checkpointer.save(self._iteration_checkpoint(complete=True))
+
+                self._active_result_set().reset()
+
+    async def _alatest_versions(self) -> dict:
+        """Returns the key of the latest version of each LID among the products of the query, see `_latest_versions()`."""
+        latest: dict = {}
+
+        async for product in self._version_scan(AsyncQueryBuilder)._aiterate_pages():
+            lid, _, vid = product.id.partition("::")
+            key = _version_key(vid)
+
+            if lid not in latest or key > latest[lid]:
+                latest[lid] = key
+
+        return latest
+
+    async def _aiterate_pages(self, checkpointer: Optional[Checkpointer] = None):
+        """Iterates over all products returned by the PDS Registry API for the query, see `__aiter__()`."""
+        result_set = self._active_result_set()
+
+        while not result_set._exhausted():
+            async for product in result_set.init_new_page(query_string=self._q_string, fields=self._fields):
+                yield product
+
+            if checkpointer is not None and not result_set._exhausted() and checkpointer.page_consumed():
+                checkpointer.save(self._iteration_checkpoint())
+
+        if checkpointer is not None:
+            checkpointer.save(self._iteration_checkpoint(complete=True))
+
+        result_set.reset()
+
+    async def _resolve_pending_contexts(self):
+        """Adds the clauses of the context keywords given to has_target() and alike, which require a query to resolve."""
+        resolver = ContextResolver.shared(self._client)
+
+        while self._pending_contexts:
+            property_name, context_type, keywords = self._pending_contexts.pop(0)
+            lids_by_keyword = await resolver.resolve_many_async(keywords, context_type, self._client)
+            self._add_context_lids(property_name, context_type, lids_by_keyword)
+
+    def _has_context(self, property_name: str, context_type: str, keywords: list):
+        """Adds a query clause selecting products referencing any of the context products matching the keywords.
+
+        Keywords are resolved into LIDs when the query is iterated on.
+
+        """
+        if all(keyword.startswith("urn:") for keyword in keywords):
+            return self._add_context_lids(property_name, context_type, {k: [k] for k in keywords})
+
+        self._check_not_paginating()
+        self._pending_contexts.append((property_name, context_type, keywords))
+        return self
+
+    async def as_dataframe(
+        self, max_rows: Optional[int] = None, multi_valued: MULTI_VALUED = "list", typed: Union[bool, dict] = False
+    ):
+        """Returns the found products as a pandas DataFrame.
+
+        Parameters
+        ----------
+        max_rows : int
+            Optional limit in the number of products returned in the dataframe.
+            Default is no limit (None)
+        multi_valued : str, optional
+            Representation of the columns with several values for some products:
+            "list" (default) keeps them as lists, "explode" turns each value into
+            its own row.
+        typed : bool or dict, optional
+            If True, converts the single-valued columns to compact types:
+            datetime64 for the dates, numbers for the numeric fields and
+            categoricals for the fields with few distinct values, following
+            `pds.peppi.dataframe.FIELD_TYPES`. A dict of field name patterns
+            and types overrides these defaults. Defaults to False, the values
+            being kept as returned by the PDS Registry API.
+
+        Returns
+        -------
+        The products as a pandas dataframe.
+        """
+        builder = DataFrameBuilder(multi_valued=multi_valued, types=self._field_types(typed))
+
+        with self._raw_mode(), self._limited(max_rows):
+            async for p in self:
+                builder.append(p.id, p.properties)
+
+        self.reset()
+
+        return self._build_dataframe(builder)
+
+    async def iter_dataframes(
+        self, chunk_size: int = 10000, multi_valued: MULTI_VALUED = "list", typed: Union[bool, dict] = False
+    ):
+        """Iterates over the found products as a sequence of pandas DataFrames, with ``async for``.
+
+        See `QueryBuilder.iter_dataframes()`.
+
+        """
+        if chunk_size < 1:
+            raise ValueError(f"chunk_size must be a positive number of products, got {chunk_size}")
+
+        builder = DataFrameBuilder(
+            multi_valued=multi_valued, columns=self._dataframe_columns(), types=self._field_types(typed)
+        )
+
+        with self._raw_mode():
+            async for p in self:
+                builder.append(p.id, p.properties)
+
+                if len(builder) >= chunk_size:
+                    yield builder.build()
+                    builder.clear_rows()
+
+        if len(builder) > 0:
+            yield builder.build()
+
+        self.reset()
+
+    async def count(self) -> int:
+        """Returns the number of products matching the query, without fetching any of them.
+
+        Only the summary of the results is requested from the PDS Registry API.
+        The count does not exceed the limit set with `limit()`, if any. Products
+        of a query filtered locally are fetched, see `QueryBuilder.count()`.
+
+        """
+        await self._resolve_pending_contexts()
+
+        if self._filters_locally() or self._chunks_overlap():
+            return await self._count_local()
+
+        return await self._active_result_set().count(self._q_string)
+
+    async def _count_local(self) -> int:
+        """Returns the number of products passing the local checks, fetching just the properties they need."""
+        if self._residual is None and self._latest_only:
+            return self._count_latest(await self._alatest_versions())
+
+        fields = self._fields
+        self._fields = sorted(self._residual.properties()) if self._residual is not None else ["lid"]
+
+        try:
+            with self._raw_mode():
+                return len([p async for p in self._aiterate()])
+        finally:
+            self._fields = fields
+
+    async def exists(self) -> bool:
+        """Returns True if at least one product matches the query, without fetching any of them.
+
+        Products of a query with residual predicates are fetched until one satisfies them.
+
+        """
+        if self._residual is not None:
+            await self._resolve_pending_contexts()
+
+            with self._limited(1):
+                return await self._count_local() > 0
+
+        await self._resolve_pending_contexts()
+        return await self._active_result_set().count(self._q_string) > 0
+
+    def parallel(self, shards: int = 4, ordered: bool = True, max_workers: Optional[int] = None):
+        """Not supported, concurrency is achieved by running several queries on the event loop.
+
+        Raises
+        ------
+        NotImplementedError
+
+        """
+        raise NotImplementedError(f"parallel is not available for {self.__class__.__name__}")
+
+    def reset(self):
+        """Resets internal pagination state to default, dropping any unresolved context keyword."""
+        super().reset()
+        self._pending_contexts = []
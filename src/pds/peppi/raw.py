@@ -0,0 +1,73 @@
+"""Lightweight records of the products, decoded straight from the JSON responses of the PDS Registry API."""
+import logging
+from typing import NamedTuple
+from typing import Optional
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+
+class RawProduct:
+    """Identifier and properties of a product, without the model validation of the API client.
+
+    Exposes the same ``id`` and ``properties`` attributes as
+    ``pds.api_client.models.pds_product.PDSProduct``, for a fraction of the
+    time and memory needed to build the model.
+
+    """
+
+    __slots__ = ("id", "properties")
+
+    def __init__(self, id: str, properties: Optional[dict]):
+        """Creates a new RawProduct.
+
+        Parameters
+        ----------
+        id : str
+            LIDVID of the product.
+        properties : dict
+            Properties of the product, each one being a list of values.
+
+        """
+        self.id = id
+        self.properties = properties
+
+    def __repr__(self):
+        """Returns the representation of this product."""
+        return f"RawProduct(id={self.id!r})"
+
+    def to_dict(self) -> dict:
+        """Returns the product as a dictionary with its ``id`` and ``properties``."""
+        return {"id": self.id, "properties": self.properties}
+
+
+class RawSummary(NamedTuple):
+    """Summary of a page of raw results."""
+
+    hits: int
+    """Number of products matching the query."""
+
+
+class RawPage(NamedTuple):
+    """Page of raw results, with the same ``data`` and ``summary`` attributes as the API client model."""
+
+    data: list
+    """Products of the page, as RawProduct records."""
+
+    summary: RawSummary
+    """Summary of the query results."""
+
+
+def parse_page(body: bytes) -> RawPage:
+    """Decodes the body of a response to a page request into raw records.
+
+    The body is decoded with orjson, several times faster than the decoder of
+    the standard library on large pages.
+
+    """
+    page = orjson.loads(body)
+    data = [RawProduct(product.get("id"), product.get("properties")) for product in page.get("data") or ()]
+    summary = page.get("summary") or {}
+
+    return RawPage(data, RawSummary(summary.get("hits") or 0))
@@ -1,15 +1,171 @@
 """Module of the ResultSet."""
 import logging
+import queue
+import re
+import threading
+import time
+from datetime import datetime
+from datetime import timezone
+from typing import Optional
 
-from pds.api_client.api.all_products_api import AllProductsApi
-
+from .client import AsyncPDSRegistryClient
 from .client import PDSRegistryClient
+from .instrumentation import _AttemptCounter
+from .instrumentation import _PageClock
+from .instrumentation import PageEvent
+from .instrumentation import query_hash
+from .page_size import AdaptivePageSize
+from .raw import parse_page
+from .retry import async_retry_call
+from .retry import retry_call
 
 logger = logging.getLogger(__name__)
 
 
+def parse_harvest_time(value: str) -> datetime:
+    """Parses an ISO-8601 harvest time, whatever the number of digits of its fraction of seconds."""
+    match = re.match(r"(\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2})(?:\.(\d+))?", value)
+    if match is None:
+        raise ValueError(f'Unexpected harvest time format "{value}"')
+
+    dt = datetime.strptime(match.group(1), "%Y-%m-%dT%H:%M:%S").replace(tzinfo=timezone.utc)
+    fraction = match.group(2) or ""
+
+    return dt.replace(microsecond=int((fraction + "000000")[:6]))
+
+
+def format_harvest_time(dt: datetime) -> str:
+    """Formats a datetime the way harvest times are expressed in query clauses."""
+    return dt.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+class _PagePrefetcher:
+    """Background fetcher keeping the next pages of a query in flight.
+
+    Pages are requested one after the other on a daemon thread, chaining the
+    ``search_after`` cursor from the last product of each received page, and
+    are stored in a bounded queue until the consumer asks for them.
+
+    """
+
+    _POLL_INTERVAL = 0.1
+    """Seconds between two checks of the cancellation flag while the queue is full."""
+
+    _END = object()
+    """Sentinel put on the queue once the last page has been fetched."""
+
+    def __init__(self, result_set, kwargs: dict, depth: int):
+        """Starts fetching pages in the background.
+
+        Parameters
+        ----------
+        result_set : ResultSet
+            The result set used to send the page requests.
+        kwargs : dict
+            Request arguments of the first page to fetch.
+        depth : int
+            Maximum number of fetched pages waiting to be consumed.
+
+        """
+        self._result_set = result_set
+        self._kwargs = kwargs
+        self._queue: queue.Queue = queue.Queue(maxsize=depth)
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="peppi-prefetch", daemon=True)
+        self._thread.start()
+
+    def _put(self, item):
+        """Puts an item on the queue, giving up if the prefetcher gets cancelled meanwhile."""
+        while not self._cancelled.is_set():
+            try:
+                self._queue.put(item, timeout=self._POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _run(self):
+        """Fetches pages until the query is exhausted or the prefetcher is cancelled."""
+        result_set = self._result_set
+        fetched_pages = 0
+        fetched_products = result_set._received
+
+        try:
+            while not self._cancelled.is_set():
+                results = result_set._fetch_page(self._kwargs)
+
+                if not self._put(results):
+                    return
+
+                fetched_pages += 1
+                fetched_products += len(results.data)
+                expected_pages = result_set._estimate_pages(fetched_pages, results.summary.hits, fetched_products)
+
+                if fetched_pages >= expected_pages or not results.data:
+                    break
+
+                self._kwargs["limit"] = result_set._page_size(fetched_products)
+                self._kwargs["search_after"] = [results.data[-1].properties[result_set._SORT_PROPERTY][0]]
+        except Exception as err:
+            self._put(err)
+            return
+
+        self._put(self._END)
+
+    def get(self):
+        """Returns the next fetched page, or None once all pages have been fetched.
+
+        Raises
+        ------
+        Exception
+            Any error raised while fetching the page in the background.
+
+        """
+        item = self._queue.get()
+
+        if item is self._END:
+            return None
+
+        if isinstance(item, Exception):
+            raise item
+
+        return item
+
+    def cancel(self):
+        """Stops fetching pages and discards the ones not consumed yet."""
+        self._cancelled.set()
+
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+
+
 class ResultSet:
-    """ResultSet of products on which a query has been applied."""
+    """ResultSet of products on which a query has been applied.
+
+    Attributes
+    ----------
+    page_sizer : pds.peppi.page_size.AdaptivePageSize
+        Tunes the number of products requested per page, None to always
+        request pages of the default size.
+    raw : bool
+        If True, products are yielded as pds.peppi.raw.RawProduct records
+        decoded straight from the JSON responses, instead of API client models.
+    max_products : int
+        Maximum number of products yielded, None for all the products of the
+        query. The pages requested never hold more products than needed.
+    instrument : pds.peppi.instrumentation.Instrument
+        Receives the measurements of each page fetched, None for no
+        instrumentation. Defaults to the instrument of the client.
+    query_hash : str
+        Hash the page events are reported with, set by the QueryBuilder to the
+        hash of its query, see `pds.peppi.query_builder.QueryBuilder.query_hash()`.
+        None for the hash of the query string of each page request.
+
+    """
 
     _SORT_PROPERTY = "ops:Harvest_Info.ops:harvest_date_time"
     """Default property to sort results of a query by."""
@@ -17,12 +173,295 @@ class ResultSet:
     _PAGE_SIZE = 100
     """Default number of results returned in each page fetch from the PDS API."""
 
-    def __init__(self, client: PDSRegistryClient):
-        """Constructor of the ResultSet."""
-        self._products = AllProductsApi(client.api_client)
+    _RESPONSE_TYPES = {
+        "200": "PdsProducts",
+        "400": "ErrorMessage",
+        "404": "ErrorMessage",
+        "500": "ErrorMessage",
+        "501": "ErrorMessage",
+    }
+    """Models of the bodies of the responses to page requests, by status code."""
+
+    def __init__(self, client: PDSRegistryClient, prefetch: int = 0):
+        """Constructor of the ResultSet.
+
+        Parameters
+        ----------
+        client : PDSRegistryClient
+            Client defining the connexion with the PDS Search API.
+        prefetch : int, optional
+            Number of pages to fetch ahead in a background thread while the
+            current page is being consumed. Defaults to 0, which fetches each
+            page only once the previous one has been exhausted.
+
+        """
+        if prefetch < 0:
+            raise ValueError(f"prefetch must be a positive number of pages, got {prefetch}")
+
+        self._client = client
+        self._cache = client.cache
+        self._retry_policy = client.retry_policy
+        self._timeout = client.timeout
+        self._products_api = None
+        self._prefetch = prefetch
+        self._prefetcher = None
         self._latest_harvest_time = None
         self._page_counter = None
         self._expected_pages = None
+        self._hits = None
+        self._received = 0
+        self.page_sizer: Optional[AdaptivePageSize] = None
+        self.raw = False
+        self.max_products: Optional[int] = None
+        self.instrument = client.instrument
+        self.query_hash: Optional[str] = None
+        self._page_clock = _PageClock()
+
+    @property
+    def _api_client(self):
+        """The API client of the client, which imports the generated models on first access."""
+        return self._client.api_client
+
+    @property
+    def _products(self):
+        """The API of the products end-points of the PDS Registry API, created on first access."""
+        if self._products_api is None:
+            from pds.api_client.api.all_products_api import AllProductsApi
+
+            self._products_api = AllProductsApi(self._api_client)
+
+        return self._products_api
+
+    def inherit_settings(self, other):
+        """Applies the page sizer, raw mode, maximum number of products and query hash of another result set."""
+        self.page_sizer = other.page_sizer
+        self.raw = other.raw
+        self.max_products = other.max_products
+        self.query_hash = other.query_hash
+
+    def _page_size(self, received=0):
+        """Returns the number of products to request in the next page, once the given number has been received."""
+        size = self._PAGE_SIZE if self.page_sizer is None else self.page_sizer.size
+
+        if self.max_products is not None:
+            size = min(size, self.max_products - received)
+
+        return size
+
+    def _expected_hits(self, hits):
+        """Returns the number of products yielded out of the given number of hits, within the maximum if any."""
+        return hits if self.max_products is None else min(hits, self.max_products)
+
+    def _estimate_pages(self, pages, hits, received):
+        """Returns the total number of pages expected once the given pages and products have been received."""
+        remaining = max(self._expected_hits(hits) - received, 0)
+
+        if remaining == 0:
+            return pages
+
+        return pages - (-remaining // self._page_size(received))
+
+    def _count_hits(self, query_string):
+        """Returns the number of products matching the query string, without fetching any of them."""
+        kwargs = {"limit": 0}
+
+        if query_string:
+            kwargs["q"] = f"({query_string})"
+
+        return self._fetch_page(kwargs).summary.hits
+
+    def count(self, query_string=""):
+        """Returns the number of products matching the query string, within the maximum number of products if any.
+
+        Only the summary of the results is requested, no product is fetched.
+
+        Parameters
+        ----------
+        query_string : str, optional
+            The query string to submit to the PDS API.
+
+        """
+        return self._expected_hits(self._count_hits(query_string))
+
+    def _build_page_kwargs(self, query_string="", fields=None):
+        """Returns the request arguments fetching the page following the latest product yielded."""
+        kwargs = {"sort": [self._SORT_PROPERTY], "limit": self._page_size(self._received)}
+
+        if self._latest_harvest_time is not None:
+            kwargs["search_after"] = [self._latest_harvest_time]
+
+        if len(query_string) > 0:
+            kwargs["q"] = f"({query_string})"
+
+        if fields and len(fields) > 0:
+            fields = list(fields)
+
+            # The sort property is used for pagination
+            if self._SORT_PROPERTY not in fields:
+                fields.append(self._SORT_PROPERTY)
+
+            kwargs["fields"] = fields
+
+        return kwargs
+
+    def _request_page(self, kwargs):
+        """Sends a single page request to the PDS API, returns the body of the response.
+
+        The request is sent again, with the same arguments hence the same
+        ``search_after`` cursor, while it fails with an error the retry policy
+        of the client deems transient.
+
+        Raises
+        ------
+        pds.api_client.exceptions.ApiException
+            If the PDS Registry API responded with an error status.
+
+        """
+        return retry_call(self._retry_policy, self._send_page_request, kwargs)
+
+    def _send_page_request(self, kwargs):
+        """Sends a single page request to the PDS API once, returns the body of the response."""
+        response = self._products.product_list_without_preload_content(**kwargs, _request_timeout=self._timeout)
+        # The body of the urllib3 response is consumed by read(), its data attribute is empty afterwards
+        body = response.read()
+
+        if not 200 <= response.status <= 299:
+            from pds.api_client.exceptions import ApiException
+
+            # Let the API client raise the exception matching the error status
+            ApiException.from_response(http_resp=response, body=body.decode("utf-8", errors="replace"), data=None)
+
+        return body
+
+    def _fetch_page(self, kwargs):
+        """Returns a single page of results, from the cache of the client if available, from the PDS API otherwise.
+
+        Parameters
+        ----------
+        kwargs : dict
+            Arguments of the request, as returned by `_build_page_kwargs()`.
+
+        Returns
+        -------
+        results : pds.api_client.models.pds_products.PdsProducts
+            The page of results returned by the PDS Registry API.
+
+        """
+        if self.instrument is not None:
+            return self._fetch_instrumented_page(kwargs)
+
+        key, body = self._cache_lookup(kwargs)
+
+        if body is None:
+            start = time.perf_counter()
+            body = self._request_page(kwargs)
+            elapsed = time.perf_counter() - start
+            self._cache_store(key, kwargs, body)
+            results = self._deserialize_page(body)
+            self._observe_page(results, elapsed, body)
+            return results
+
+        return self._deserialize_page(body)
+
+    def _fetch_instrumented_page(self, kwargs):
+        """Returns a single page of results, as `_fetch_page()` does, and reports its measurements to the instrument."""
+        start = time.perf_counter()
+        page, gap = self._page_clock.start(kwargs, start)
+        key, body = self._cache_lookup(kwargs)
+        cached = body is not None
+        request = _AttemptCounter(self._send_page_request)
+
+        if not cached:
+            body = retry_call(self._retry_policy, request, kwargs)
+            self._cache_store(key, kwargs, body)
+
+        received = time.perf_counter()
+        results = self._deserialize_page(body)
+        self._report_page(kwargs, results, body, page, gap, start, received, request.attempts, cached)
+        return results
+
+    def _report_page(self, kwargs, results, body, page, gap, start, received, attempts, cached):
+        """Reports the measurements of a fetched page to the instrument, and feeds the page sizer with them."""
+        deserialized = time.perf_counter()
+
+        if not cached:
+            self._observe_page(results, received - start, body)
+
+        event = PageEvent(
+            query_hash=self.query_hash or query_hash(kwargs.get("q")),
+            page=page,
+            request_time=received - start,
+            deserialization_time=deserialized - received,
+            consumer_gap=gap,
+            size=len(body),
+            hits=results.summary.hits,
+            products=len(results.data or ()),
+            retries=max(attempts - 1, 0),
+            cached=cached,
+        )
+        self.instrument.on_page(event)
+        self._page_clock.deliver(kwargs, time.perf_counter())
+
+    def _cache_lookup(self, kwargs):
+        """Returns the cache key of a page request, and the cached body of the page if available, None otherwise."""
+        if self._cache is None:
+            return None, None
+
+        key = self._cache.key(self._client.base_url, kwargs)
+        return key, self._cache.get(key)
+
+    def _cache_store(self, key, kwargs, body):
+        """Stores the body of a page in the cache of the client, if any."""
+        if self._cache is not None:
+            self._cache.put(key, kwargs.get("q"), body)
+
+    def _observe_page(self, results, elapsed, body):
+        """Feeds the time and size of a page received from the PDS API to the page sizer, if any."""
+        if self.page_sizer is not None and results.data is not None:
+            self.page_sizer.observe(len(results.data), elapsed, len(body))
+
+    def _deserialize_page(self, body):
+        """Deserializes the body of a response to a page request into the API client model, or raw records."""
+        if self.raw:
+            return parse_page(body)
+
+        return self._api_client.deserialize(body.decode("utf-8"), self._RESPONSE_TYPES["200"])
+
+    def _next_page(self, query_string, fields):
+        """Returns the next page of results, or None if the prefetcher found no more pages."""
+        kwargs = self._build_page_kwargs(query_string, fields)
+
+        if not self._prefetch:
+            return self._fetch_page(kwargs)
+
+        if self._prefetcher is None:
+            self._prefetcher = _PagePrefetcher(self, kwargs, self._prefetch)
+
+        return self._prefetcher.get()
+
+    def _exhausted(self):
+        """Returns True once all the expected pages of the current query have been consumed."""
+        # Check if we've hit the expected number of pages (or exceeded in cases
+        # where no results were returned from the query)
+        return bool(self._page_counter) and self._page_counter >= self._expected_pages
+
+    def _start_page(self, results):
+        """Updates the pagination state with a newly received page of results."""
+        # If this is the first page fetch, calculate total number of expected pages
+        # based on hit count
+        if self._expected_pages is None:
+            self._hits = results.summary.hits
+            self._expected_pages = self._estimate_pages(0, self._hits, self._received)
+            self._page_counter = 0
+
+    def _end_page(self, results):
+        """Updates the pagination state once all the products of a page have been consumed."""
+        self._page_counter += 1
+
+        # The size of the next pages may differ from the ones received so far,
+        # estimate the number of pages still expected from the products left
+        if results.data:
+            self._expected_pages = self._estimate_pages(self._page_counter, self._hits, self._received)
 
     def init_new_page(self, query_string="", fields=None):
         """Queries the PDS API for the next page of results.
@@ -32,6 +471,9 @@ class ResultSet:
         If there are results remaining from the previously acquired page,
         they are yieled on each subsequent call to this method.
 
+        When prefetching is enabled, the page is taken from the ones already
+        fetched in the background, if available.
+
         Parameters
         ----------
         query_string : str, optional
@@ -51,48 +493,251 @@ class ResultSet:
             Once all available pages of query results have been exhausted.
 
         """
-        # Check if we've hit the expected number of pages (or exceeded in cases
-        # where no results were returned from the query)
-        if self._page_counter and self._page_counter >= self._expected_pages:
+        if self._exhausted():
             raise StopIteration
 
-        kwargs = {"sort": [self._SORT_PROPERTY], "limit": self._PAGE_SIZE}
+        results = self._next_page(query_string, fields)
 
-        if self._latest_harvest_time is not None:
-            kwargs["search_after"] = [self._latest_harvest_time]
+        if results is None:
+            raise StopIteration
 
-        if len(query_string) > 0:
-            kwargs["q"] = f"({query_string})"
+        self._start_page(results)
 
-        if fields and len(fields) > 0:
-            # The sort property is used for pagination
-            if self._SORT_PROPERTY not in fields:
-                fields.append(self._SORT_PROPERTY)
+        for product in results.data:
+            # Move the cursor before yielding so that an iteration abandoned on
+            # this product resumes right after it
+            self._latest_harvest_time = product.properties[self._SORT_PROPERTY][0]
+            self._received += 1
+            yield product
 
-            kwargs["fields"] = fields
+        # If here, current page has been exhausted
+        self._end_page(results)
 
-        results = self._products.product_list(**kwargs)
+    def take_page(self, query_string="", fields=None):
+        """Fetches the next page of results and moves the pagination past all its products at once.
 
-        # If this is the first page fetch, calculate total number of expected pages
-        # based on hit count
-        if self._expected_pages is None:
-            hits = results.summary.hits
+        Unlike `init_new_page()`, the products are not yielded one by one: the
+        whole page is handed over to the caller, for example to be buffered.
+
+        Parameters
+        ----------
+        query_string : str, optional
+            The query string to submit to the PDS API.
+        fields : iterable, optional
+            Additional fields to include with the query parameters.
 
-            self._expected_pages = hits // self._PAGE_SIZE
-            if hits % self._PAGE_SIZE:
-                self._expected_pages += 1
+        Returns
+        -------
+        results : pds.api_client.models.pds_products.PdsProducts
+            The next page of results, None once all the pages have been fetched.
 
-            self._page_counter = 0
+        """
+        if self._exhausted():
+            return None
 
-        for product in results.data:
-            yield product
-            self._latest_harvest_time = product.properties[self._SORT_PROPERTY][0]
+        results = self._fetch_page(self._build_page_kwargs(query_string, fields))
+        self._start_page(results)
 
-        # If here, current page has been exhausted
-        self._page_counter += 1
+        if results.data:
+            self._latest_harvest_time = results.data[-1].properties[self._SORT_PROPERTY][0]
+            self._received += len(results.data)
+
+        self._end_page(results)
+        return results
+
+    def stop_prefetch(self):
+        """Cancels the pages being fetched in the background, if any.
+
+        Iteration may resume afterward: fetching restarts from the latest
+        product yielded.
+
+        """
+        if self._prefetcher is not None:
+            self._prefetcher.cancel()
+            self._prefetcher = None
+
+    def seek(self, harvest_time: Optional[str], received: int = 0):
+        """Moves the pagination right after the product harvested at the given time, to resume an iteration.
+
+        Parameters
+        ----------
+        harvest_time : str
+            Harvest time of the last product already received, None to start
+            from the first product of the query.
+        received : int, optional
+            Number of products already received, counted against the maximum
+            number of products.
+
+        """
+        self.reset()
+        self._latest_harvest_time = harvest_time
+        self._received = received
 
     def reset(self):
         """Resets internal pagination state to default."""
+        self.stop_prefetch()
+        self._page_clock.reset()
         self._expected_pages = None
         self._page_counter = None
         self._latest_harvest_time = None
+        self._hits = None
+        self._received = 0
+
+
+class AsyncResultSet(ResultSet):
+    """ResultSet fetching its pages with non-blocking requests, for use from asyncio code."""
+
+    def __init__(self, client: AsyncPDSRegistryClient):
+        """Constructor of the AsyncResultSet.
+
+        Parameters
+        ----------
+        client : AsyncPDSRegistryClient
+            Client defining the connexion with the PDS Search API.
+
+        """
+        super().__init__(client)
+
+    async def _count_hits(self, query_string):
+        """Returns the number of products matching the query string, without fetching any of them."""
+        kwargs = {"limit": 0}
+
+        if query_string:
+            kwargs["q"] = f"({query_string})"
+
+        return (await self._fetch_page(kwargs)).summary.hits
+
+    async def count(self, query_string=""):
+        """Returns the number of products matching the query string, within the maximum number of products if any.
+
+        Only the summary of the results is requested, no product is fetched.
+
+        Parameters
+        ----------
+        query_string : str, optional
+            The query string to submit to the PDS API.
+
+        """
+        return self._expected_hits(await self._count_hits(query_string))
+
+    async def _fetch_page(self, kwargs):
+        """Returns a single page of results, from the cache of the client if available, from the PDS API otherwise.
+
+        The request is serialized and the response deserialized by the
+        generated API client, as for synchronous requests, but sent without
+        blocking the event loop.
+
+        Parameters
+        ----------
+        kwargs : dict
+            Arguments of the request, as returned by `_build_page_kwargs()`.
+
+        Returns
+        -------
+        results : pds.api_client.models.pds_products.PdsProducts
+            The page of results returned by the PDS Registry API.
+
+        Raises
+        ------
+        pds.api_client.exceptions.ApiException
+            If the PDS Registry API responded with an error status.
+
+        """
+        if self.instrument is not None:
+            return await self._fetch_instrumented_page(kwargs)
+
+        key, body = self._cache_lookup(kwargs)
+
+        if body is None:
+            start = time.perf_counter()
+            body = await self._request_page(kwargs)
+            elapsed = time.perf_counter() - start
+            self._cache_store(key, kwargs, body)
+            results = self._deserialize_page(body)
+            self._observe_page(results, elapsed, body)
+            return results
+
+        return self._deserialize_page(body)
+
+    async def _fetch_instrumented_page(self, kwargs):
+        """Returns a single page of results, as `_fetch_page()` does, and reports its measurements to the instrument."""
+        start = time.perf_counter()
+        page, gap = self._page_clock.start(kwargs, start)
+        key, body = self._cache_lookup(kwargs)
+        cached = body is not None
+        request = _AttemptCounter(self._send_page_request)
+
+        if not cached:
+            body = await async_retry_call(self._retry_policy, request, kwargs)
+            self._cache_store(key, kwargs, body)
+
+        received = time.perf_counter()
+        results = self._deserialize_page(body)
+        self._report_page(kwargs, results, body, page, gap, start, received, request.attempts, cached)
+        return results
+
+    async def _request_page(self, kwargs):
+        """Sends a single page request to the PDS API without blocking the event loop, returns the response body.
+
+        The request is sent again, with the same arguments, while it fails with
+        an error the retry policy of the client deems transient.
+
+        Raises
+        ------
+        pds.api_client.exceptions.ApiException
+            If the PDS Registry API responded with an error status.
+
+        """
+        return await async_retry_call(self._retry_policy, self._send_page_request, kwargs)
+
+    async def _send_page_request(self, kwargs):
+        """Sends a single page request to the PDS API once, returns the body of the response."""
+        request_kwargs = dict.fromkeys(("fields", "keywords", "limit", "q", "sort", "search_after"))
+        request_kwargs.update(kwargs)
+        method, url, headers, _, _ = self._products._product_list_serialize(
+            **request_kwargs, _request_auth=None, _content_type=None, _headers=None, _host_index=0
+        )
+
+        async with self._client.session.request(method, url, headers=headers) as response:
+            body = await response.read()
+
+            if not 200 <= response.status <= 299:
+                from pds.api_client.exceptions import ApiException
+
+                error = ApiException(status=response.status, reason=response.reason, body=body.decode("utf-8"))
+                error.headers = dict(response.headers)
+                raise error
+
+        return body
+
+    async def init_new_page(self, query_string="", fields=None):
+        """Queries the PDS API for the next page of results.
+
+        Nothing is yielded once all the pages of the query have been consumed.
+
+        Parameters
+        ----------
+        query_string : str, optional
+            The query string to submit to the PDS API.
+        fields : iterable, optional
+            Additional fields to include with the query parameters.
+
+        Yields
+        ------
+        product : pds.api_client.models.pds_product.PDSProduct
+            The next product within the current page fetched from the PDS Registry
+            API.
+
+        """
+        if self._exhausted():
+            return
+
+        results = await self._fetch_page(self._build_page_kwargs(query_string, fields))
+        self._start_page(results)
+
+        for product in results.data:
+            self._latest_harvest_time = product.properties[self._SORT_PROPERTY][0]
+            self._received += 1
+            yield product
+
+        self._end_page(results)
@@ -0,0 +1,199 @@
+"""Retry policy of the page requests sent to the PDS Registry API."""
+import logging
+import random
+import sys
+import time
+from datetime import datetime
+from datetime import timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Returns the delay requested by the Retry-After header of an error response, in seconds, None if absent."""
+    headers = getattr(error, "headers", None) or {}
+    value = next((v for k, v in headers.items() if k.lower() == "retry-after"), None)
+
+    if value is None:
+        return None
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def _transient_error_types() -> tuple:
+    """Returns the types of the network errors worth retrying a request on."""
+    error_types = [ConnectionError, TimeoutError]
+
+    # The errors of urllib3, used by the API client, and of aiohttp, used by
+    # the asynchronous client, can only be raised once they have been imported
+    urllib3 = sys.modules.get("urllib3")
+    if urllib3 is not None:
+        error_types.append(urllib3.exceptions.HTTPError)
+
+    aiohttp = sys.modules.get("aiohttp")
+    if aiohttp is not None:
+        error_types.extend([aiohttp.ClientConnectionError, aiohttp.ClientPayloadError])
+
+    return tuple(error_types)
+
+
+class RetryPolicy:
+    """Decides whether, and when, a failed page request is sent again.
+
+    Page requests are idempotent: a page is requested again with exactly the
+    same arguments, including its ``search_after`` cursor, so that no product
+    is skipped nor yielded twice when a request eventually succeeds.
+
+    Requests failing with a network error, a timeout or one of the retryable
+    status codes are retried after an exponential backoff with full jitter,
+    unless the server asks for a longer delay with a Retry-After header. The
+    retries of a request stop after a maximum number of attempts or once the
+    next one would exceed the maximum total retry time.
+
+    """
+
+    def __init__(
+        self,
+        max_retries: int = 5,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 30.0,
+        max_retry_time: float = 120.0,
+        statuses: frozenset = frozenset({429, 500, 502, 503, 504}),
+    ):
+        """Creates a new RetryPolicy.
+
+        Parameters
+        ----------
+        max_retries : int, optional
+            Maximum number of times a request is sent again. Defaults to 5.
+        backoff_factor : float, optional
+            Base delay before the first retry, in seconds, doubled on each
+            following retry. Defaults to 0.5.
+        max_backoff : float, optional
+            Maximum delay between two attempts, in seconds, unless the server
+            asks for longer with a Retry-After header. Defaults to 30.
+        max_retry_time : float, optional
+            Maximum time spent retrying a request, in seconds. Defaults to 120.
+        statuses : frozenset, optional
+            HTTP status codes of the responses worth retrying. Defaults to 429,
+            500, 502, 503 and 504.
+
+        """
+        if max_retries < 0:
+            raise ValueError(f"max_retries must be a positive number, got {max_retries}")
+
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.max_retry_time = max_retry_time
+        self.statuses = frozenset(statuses)
+
+    def is_retryable(self, error: Exception) -> bool:
+        """Returns True if a request failing with the given error may succeed when sent again."""
+        from pds.api_client.exceptions import ApiException
+
+        if isinstance(error, ApiException):
+            return error.status in self.statuses
+
+        return isinstance(error, _transient_error_types())
+
+    def backoff(self, attempt: int) -> float:
+        """Returns a random delay before the given retry attempt, counted from 0, in seconds."""
+        return random.uniform(0, min(self.max_backoff, self.backoff_factor * 2**attempt))
+
+    def next_delay(self, error: Exception, attempt: int, elapsed: float) -> Optional[float]:
+        """Returns the delay before sending a failed request again, None if it should not be retried.
+
+        Parameters
+        ----------
+        error : Exception
+            The error the request failed with.
+        attempt : int
+            Number of retries of the request so far.
+        elapsed : float
+            Time elapsed since the request was first sent, in seconds.
+
+        Returns
+        -------
+        The delay in seconds, or None if the error is not transient, or if the
+        maximum number of retries or the maximum retry time has been reached.
+
+        """
+        if attempt >= self.max_retries or not self.is_retryable(error):
+            return None
+
+        delay = self.backoff(attempt)
+        retry_after = _retry_after(error)
+
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+
+        if elapsed + delay > self.max_retry_time:
+            return None
+
+        return delay
+
+
+def _log_retry(error: Exception, attempt: int, delay: float):
+    """Logs a page request about to be retried."""
+    logger.warning("Page request failed (%s), retry %d in %.2f s", error, attempt + 1, delay)
+
+
+def retry_call(policy: Optional[RetryPolicy], request, *args):
+    """Calls a request function, retrying it according to the policy, None meaning no retry."""
+    start = time.monotonic()
+    attempt = 0
+
+    while True:
+        try:
+            return request(*args)
+        except Exception as err:
+            delay = policy.next_delay(err, attempt, time.monotonic() - start) if policy else None
+
+            if delay is None:
+                raise
+
+            _log_retry(err, attempt, delay)
+            time.sleep(delay)
+            attempt += 1
+
+
+async def _async_sleep(delay: float):
+    """Waits for the given delay without blocking the event loop."""
+    import asyncio
+
+    await asyncio.sleep(delay)
+
+
+async def async_retry_call(policy: Optional[RetryPolicy], request, *args):
+    """Awaits a request coroutine function, retrying it according to the policy, None meaning no retry."""
+    start = time.monotonic()
+    attempt = 0
+
+    while True:
+        try:
+            return await request(*args)
+        except Exception as err:
+            delay = policy.next_delay(err, attempt, time.monotonic() - start) if policy else None
+
+            if delay is None:
+                raise
+
+            _log_retry(err, attempt, delay)
+            await _async_sleep(delay)
+            attempt += 1
@@ -0,0 +1,356 @@
+"""Scheduler sharing a bounded pool of page requests between many queries, by priority."""
+import heapq
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import CancelledError
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from .result_set import AsyncResultSet
+from .result_set import ResultSet
+from .sharded_result_set import ShardedResultSet
+
+logger = logging.getLogger(__name__)
+
+PRIORITIES = {"high": 16.0, "normal": 4.0, "low": 1.0}
+"""Default priority classes of the scheduled queries, with the share of the page requests each one gets"""
+
+
+class ScheduledQuery:
+    """Handle of a query submitted to a QueryScheduler, streaming its products as its pages are fetched.
+
+    Iterating on the handle yields the products of the query in the order a
+    serial iteration would, blocking until their page has been fetched.
+    `result()` waits for all of them instead.
+
+    """
+
+    _END = object()
+    """Sentinel put on the buffer once the last page has been fetched."""
+
+    def __init__(
+        self,
+        scheduler,
+        result_set: ResultSet,
+        query_string: str,
+        fields: list,
+        priority: str,
+        weight: float,
+        max_buffered_pages: Optional[int],
+    ):
+        """Creates the handle of a submitted query, see `QueryScheduler.submit()`."""
+        self.priority = priority
+        self._scheduler = scheduler
+        self._result_set = result_set
+        self._query_string = query_string
+        self._fields = fields
+        self._weight = weight
+        self._max_buffered_pages = max_buffered_pages
+        self._buffer: queue.Queue = queue.Queue()
+        self._buffered_pages = 0
+        self._start_tag = 0.0
+        self._waiting = False
+        self._done = threading.Event()
+        self._cancelled = False
+        self._error: Optional[BaseException] = None
+
+    def _has_room(self) -> bool:
+        """Returns True if another page may be buffered."""
+        return self._max_buffered_pages is None or self._buffered_pages < self._max_buffered_pages
+
+    def _fetch(self):
+        """Fetches the next page of the query, returns True if the query has more pages."""
+        results = self._result_set.take_page(self._query_string, self._fields)
+
+        if results is None or not results.data:
+            return False
+
+        self._buffer.put(results.data)
+        return not self._result_set._exhausted()
+
+    def _finish(self, error: Optional[BaseException] = None):
+        """Marks the query as done, with the error it failed with if any."""
+        self._error = error
+        self._buffer.put(self._END)
+        self._done.set()
+
+    def __iter__(self):
+        """Iterates over the products of the query, as their pages are fetched.
+
+        Raises
+        ------
+        concurrent.futures.CancelledError
+            If the query has been cancelled.
+        Exception
+            Any error the query failed with.
+
+        """
+        while True:
+            if self._cancelled:
+                raise CancelledError()
+
+            page = self._buffer.get()
+
+            if page is self._END:
+                # Leave the sentinel for any other consumer
+                self._buffer.put(self._END)
+
+                if self._cancelled:
+                    raise CancelledError()
+
+                if self._error is not None:
+                    raise self._error
+
+                return
+
+            self._scheduler._page_consumed(self)
+            yield from page
+
+    def result(self, timeout: Optional[float] = None) -> list:
+        """Returns all the products of the query, once its last page has been fetched.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait for the last page, in seconds, only applicable
+            to queries submitted without a limit of buffered pages. Defaults
+            to no limit.
+
+        Raises
+        ------
+        TimeoutError
+            If the query is not done within the timeout.
+
+        """
+        if self._max_buffered_pages is None and not self._done.wait(timeout):
+            raise TimeoutError(f"Query not done within {timeout} s")
+
+        return list(self)
+
+    def done(self) -> bool:
+        """Returns True once all the pages of the query have been fetched, or the query failed or was cancelled."""
+        return self._done.is_set()
+
+    def cancel(self):
+        """Stops fetching the pages of the query, and discards the ones not consumed yet."""
+        self._scheduler._cancel(self)
+
+
+class QueryScheduler:
+    """Dispatches the page requests of many queries onto a bounded pool of workers, by priority.
+
+    Each query belongs to a priority class, which gets a share of the page
+    requests proportional to its weight. Pages are dispatched by start-time
+    fair queuing: each page request of a query advances the virtual time of
+    that query by the inverse of its weight, and the next page dispatched is
+    the one of the ready query lagging the most. A query submitted while
+    others are running starts at the current virtual time, so that a short
+    high priority query gets its pages ahead of a long running low priority
+    one, which keeps progressing at its share meanwhile.
+
+    A query has a single page request in flight at a time, as each page
+    request depends on the last product of the previous page. A query whose
+    buffer of fetched pages is full is not dispatched until its consumer
+    catches up.
+
+    Examples
+    --------
+    >>> with QueryScheduler(max_workers=4) as scheduler:
+    ...     export = scheduler.submit(Products(client).observationals(), priority="low")
+    ...     lookup = scheduler.submit(Products(client).has_target("Bennu").bundles(), priority="high")
+    ...     bundles = lookup.result()
+    ...     for product in export:
+    ...         ...
+
+    """
+
+    def __init__(self, max_workers: int = 4, priorities: Optional[dict] = None):
+        """Creates a new QueryScheduler.
+
+        Parameters
+        ----------
+        max_workers : int, optional
+            Maximum number of page requests sent concurrently. Defaults to 4.
+        priorities : dict, optional
+            Weight of each priority class, by name. Defaults to `PRIORITIES`,
+            "high" getting four times the share of "normal", which gets four
+            times the one of "low".
+
+        """
+        if max_workers < 1:
+            raise ValueError(f"max_workers must be a positive number, got {max_workers}")
+
+        self._priorities = dict(priorities or PRIORITIES)
+
+        for name, weight in self._priorities.items():
+            if weight <= 0:
+                raise ValueError(f"The weight of priority {name} must be positive, got {weight}")
+
+        self._max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="peppi-scheduler")
+        self._lock = threading.Lock()
+        self._ready: list = []
+        self._sequence = itertools.count()
+        self._virtual_time = 0.0
+        self._in_flight = 0
+        self._queries: set = set()
+        self._closed = False
+
+    def submit(self, query, priority: str = "normal", max_buffered_pages: Optional[int] = 2) -> ScheduledQuery:
+        """Schedules the pages of a query.
+
+        The query is executed from its current filters, fields, limit and raw
+        mode; the QueryBuilder may be modified or submitted again afterward.
+
+        Parameters
+        ----------
+        query : pds.peppi.query_builder.QueryBuilder
+            The query to execute. Parallel queries, asynchronous queries,
+            queries filtered locally, see `where()` and `latest_only()`, and
+            queries on lists of identifiers too long to be sent as a single
+            query are not supported.
+        priority : str, optional
+            Priority class of the query. Defaults to "normal".
+        max_buffered_pages : int, optional
+            Maximum number of fetched pages waiting to be consumed. Defaults to
+            2, None for no limit, to collect the products with `result()`
+            while consuming other queries.
+
+        Returns
+        -------
+        The handle streaming the products of the query.
+
+        """
+        if priority not in self._priorities:
+            raise ValueError(f"Unknown priority {priority}, expected one of {', '.join(self._priorities)}")
+
+        if max_buffered_pages is not None and max_buffered_pages < 1:
+            raise ValueError(f"max_buffered_pages must be a positive number of pages, got {max_buffered_pages}")
+
+        if (
+            query._list_filter is not None
+            or query._filters_locally()
+            or isinstance(query._result_set, (AsyncResultSet, ShardedResultSet))
+        ):
+            raise ValueError(f"{query.__class__.__name__} query cannot be scheduled: {query}")
+
+        result_set = ResultSet(query._client)
+        result_set.inherit_settings(query._result_set)
+        result_set.query_hash = query.query_hash()
+        scheduled = ScheduledQuery(
+            self,
+            result_set,
+            query._q_string,
+            list(query._fields),
+            priority,
+            self._priorities[priority],
+            max_buffered_pages,
+        )
+
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot submit a query to a scheduler which has been shut down")
+
+            self._queries.add(scheduled)
+            self._make_ready(scheduled)
+            self._dispatch()
+
+        return scheduled
+
+    def _make_ready(self, scheduled: ScheduledQuery):
+        """Queues the next page request of a query, at the later of its own virtual time and the current one."""
+        scheduled._start_tag = max(scheduled._start_tag, self._virtual_time)
+        heapq.heappush(self._ready, (scheduled._start_tag, next(self._sequence), scheduled))
+
+    def _dispatch(self):
+        """Sends the page requests of the ready queries lagging the most, while workers are available."""
+        while self._in_flight < self._max_workers and self._ready:
+            start_tag, _, scheduled = heapq.heappop(self._ready)
+
+            if scheduled._cancelled:
+                continue
+
+            self._virtual_time = start_tag
+            scheduled._start_tag = start_tag + 1.0 / scheduled._weight
+            scheduled._buffered_pages += 1
+            self._in_flight += 1
+            self._executor.submit(self._run, scheduled)
+
+    def _run(self, scheduled: ScheduledQuery):
+        """Fetches a page of a query, on a worker, then dispatches the next page requests."""
+        try:
+            more = not scheduled._cancelled and scheduled._fetch()
+            error = None
+        except Exception as err:
+            logger.error("Scheduled query failed: %s", err)
+            more, error = False, err
+
+        with self._lock:
+            self._in_flight -= 1
+
+            if scheduled._cancelled:
+                pass
+            elif not more:
+                self._queries.discard(scheduled)
+                scheduled._finish(error)
+            elif scheduled._has_room():
+                self._make_ready(scheduled)
+            else:
+                scheduled._waiting = True
+
+            self._dispatch()
+
+    def _page_consumed(self, scheduled: ScheduledQuery):
+        """Frees the buffer space of a consumed page, resuming the query if it was waiting for it."""
+        with self._lock:
+            scheduled._buffered_pages -= 1
+
+            if scheduled._waiting and scheduled._has_room():
+                scheduled._waiting = False
+                self._make_ready(scheduled)
+                self._dispatch()
+
+    def _cancel(self, scheduled: ScheduledQuery):
+        """Cancels a query, discarding its buffered pages."""
+        with self._lock:
+            if scheduled.done():
+                return
+
+            scheduled._cancelled = True
+            self._queries.discard(scheduled)
+
+            while True:
+                try:
+                    scheduled._buffer.get_nowait()
+                except queue.Empty:
+                    break
+
+            scheduled._finish()
+
+    def shutdown(self, wait: bool = True):
+        """Cancels the queries not done yet, and releases the workers.
+
+        Parameters
+        ----------
+        wait : bool, optional
+            If True (default), waits for the page requests in flight to complete.
+
+        """
+        with self._lock:
+            self._closed = True
+            queries = list(self._queries)
+
+        for scheduled in queries:
+            scheduled.cancel()
+
+        self._executor.shutdown(wait=wait)
+
+    def __enter__(self):
+        """Returns this scheduler, to be shut down when exiting the context."""
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Cancels the queries not done yet, and waits for the page requests in flight."""
+        self.shutdown()
@@ -0,0 +1,299 @@
+"""Module of the ShardedResultSet."""
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from typing import Optional
+
+from .client import PDSRegistryClient
+from .result_set import format_harvest_time
+from .result_set import parse_harvest_time
+from .result_set import ResultSet
+
+logger = logging.getLogger(__name__)
+
+
+class ShardedResultSet(ResultSet):
+    """ResultSet paging a query over disjoint harvest time ranges concurrently.
+
+    The harvest time range of the query is split into shards holding roughly
+    the same number of products, based on the hit counts of finer time buckets.
+    Each shard is then paged on its own connection, on a pool of worker threads,
+    and the products of all shards are merged into a single stream.
+
+    """
+
+    _OVERSAMPLING = 4
+    """Number of time buckets aimed at per shard to place the split points."""
+
+    _SPLIT_FACTOR = 16
+    """Number of sub-buckets a time bucket holding too many hits is split into."""
+
+    _MAX_REFINEMENTS = 8
+    """Maximum number of rounds of hit counts used to place the split points."""
+
+    _MIN_BUCKET_WIDTH = timedelta(milliseconds=1)
+    """Time buckets narrower than this are not split anymore."""
+
+    _QUEUE_DEPTH = 2
+    """Number of pages a shard may fetch ahead of the consumer."""
+
+    _POLL_INTERVAL = 0.1
+    """Seconds between two checks of the cancellation flag while a queue is full."""
+
+    _SHARD_DONE = object()
+    """Sentinel put on the queue once a shard has been exhausted."""
+
+    def __init__(
+        self, client: PDSRegistryClient, shards: int = 4, ordered: bool = True, max_workers: Optional[int] = None
+    ):
+        """Constructor of the ShardedResultSet.
+
+        Parameters
+        ----------
+        client : PDSRegistryClient
+            Client defining the connexion with the PDS Search API.
+        shards : int, optional
+            Number of harvest time ranges to page concurrently. Defaults to 4.
+        ordered : bool, optional
+            If True (default), products are yielded in ascending harvest time,
+            as a serial pagination would. Otherwise products are yielded as soon
+            as their page is received, whatever the shard.
+        max_workers : int, optional
+            Maximum number of concurrent page requests. Defaults to one per shard.
+
+        """
+        if shards < 1:
+            raise ValueError(f"shards must be a positive number, got {shards}")
+
+        super().__init__(client)
+        self._shards = shards
+        self._ordered = ordered
+        self._max_workers = max_workers or shards
+        self._cancelled = threading.Event()
+        self._executor = None
+
+    def _plan_shards(self, query_string, executor):
+        """Returns the (lower, upper) harvest time bounds of each shard, None meaning unbounded.
+
+        The lowest harvest time is read from the first product of the query.
+        The range from there up to now is split into time buckets, the ones
+        holding too many hits being split again until the hits are spread
+        finely enough, or until the bucket cannot be narrowed anymore.
+        Consecutive buckets are then gathered into shards of similar sizes.
+
+        """
+        kwargs = self._build_page_kwargs(query_string, fields=[self._SORT_PROPERTY])
+        kwargs["limit"] = 1
+        first_page = self._fetch_page(kwargs)
+
+        if not first_page.data:
+            return []
+
+        start = parse_harvest_time(first_page.data[0].properties[self._SORT_PROPERTY][0])
+        end = datetime.now(timezone.utc)
+
+        if self._shards == 1 or end <= start:
+            return [(None, None)]
+
+        hits = first_page.summary.hits
+        max_bucket_hits = hits / (self._shards * self._OVERSAMPLING)
+        buckets = [(start, end, hits)]
+
+        for _ in range(self._MAX_REFINEMENTS):
+            if not any(n > max_bucket_hits and upper - lower > self._MIN_BUCKET_WIDTH for lower, upper, n in buckets):
+                break
+
+            refined = []
+            for lower, upper, n in buckets:
+                if n > max_bucket_hits and upper - lower > self._MIN_BUCKET_WIDTH:
+                    step = (upper - lower) / self._SPLIT_FACTOR
+                    bounds = [lower + step * i for i in range(self._SPLIT_FACTOR)] + [upper]
+                    refined.extend((lo, hi, None) for lo, hi in zip(bounds[:-1], bounds[1:]))
+                else:
+                    refined.append((lower, upper, n))
+
+            def count(bucket):
+                lower, upper, n = bucket
+                if n is not None:
+                    return bucket
+                bounds = format_harvest_time(lower), format_harvest_time(upper)
+                return lower, upper, self._count_hits(self._shard_query(query_string, *bounds))
+
+            buckets = [b for b in executor.map(count, refined) if b[2] > 0]
+
+        target = hits / self._shards
+        split_points = []
+        accumulated = 0
+
+        for _, upper, n in buckets[:-1]:
+            accumulated += n
+            if len(split_points) < self._shards - 1 and accumulated >= target * (len(split_points) + 1):
+                split_points.append(format_harvest_time(upper))
+
+        logger.debug("Harvest time split points of %d shards: %s", len(split_points) + 1, split_points)
+
+        return list(zip([None] + split_points, split_points + [None]))
+
+    def _shard_query(self, query_string, lower, upper):
+        """Returns the query string restricted to the harvest time range [lower, upper)."""
+        clauses = [f"({query_string})"] if query_string else []
+
+        if lower is not None:
+            clauses.append(f'({self._SORT_PROPERTY} ge "{lower}")')
+
+        if upper is not None:
+            clauses.append(f'({self._SORT_PROPERTY} lt "{upper}")')
+
+        return " and ".join(clauses)
+
+    def _shard_queries(self, query_string, executor):
+        """Returns the query strings of the shards to page concurrently."""
+        return [
+            self._shard_query(query_string, lower, upper) for lower, upper in self._plan_shards(query_string, executor)
+        ]
+
+    def _accept(self, product):
+        """Returns True if a product received from a shard is to be yielded, always since shards are disjoint."""
+        return True
+
+    def _put(self, out_queue, item):
+        """Puts an item on a queue, giving up if the iteration gets cancelled meanwhile."""
+        while not self._cancelled.is_set():
+            try:
+                out_queue.put(item, timeout=self._POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+
+        return False
+
+    def _run_shard(self, query_string, fields, out_queue):
+        """Pages through the products of one shard, putting each page on the output queue."""
+        kwargs = self._build_page_kwargs(query_string, fields)
+        kwargs.pop("search_after", None)
+        kwargs["limit"] = self._page_size()
+        fetched_products = 0
+
+        try:
+            while not self._cancelled.is_set():
+                results = self._fetch_page(kwargs)
+                fetched_products += len(results.data)
+
+                if results.data and not self._put(out_queue, results.data):
+                    return
+
+                # The server may return less products than requested, the shard ends with its hits
+                if not results.data or fetched_products >= results.summary.hits:
+                    break
+
+                # A single shard never needs more than the maximum number of products
+                kwargs["limit"] = self._page_size(fetched_products)
+                if kwargs["limit"] <= 0:
+                    break
+
+                kwargs["search_after"] = [results.data[-1].properties[self._SORT_PROPERTY][0]]
+        except Exception as err:
+            self._put(out_queue, err)
+            return
+
+        self._put(out_queue, self._SHARD_DONE)
+
+    def _merge(self, queues, shards_per_queue):
+        """Yields the pages put on the queues, one queue after the other.
+
+        With one queue per shard, products come out in shard order, hence in
+        ascending harvest time; with a single queue shared by all the shards,
+        they come out as soon as they are received.
+
+        """
+        for shard_queue in queues:
+            done = 0
+
+            while done < shards_per_queue:
+                item = shard_queue.get()
+
+                if item is self._SHARD_DONE:
+                    done += 1
+                    self._page_counter += 1
+                    continue
+
+                if isinstance(item, Exception):
+                    raise item
+
+                for product in item:
+                    if not self._accept(product):
+                        continue
+
+                    if self.max_products is not None and self._received >= self.max_products:
+                        return
+
+                    self._latest_harvest_time = product.properties[self._SORT_PROPERTY][0]
+                    self._received += 1
+                    yield product
+
+    def init_new_page(self, query_string="", fields=None):
+        """Queries all the shards of the query concurrently and yields their products.
+
+        All the products of the query are yielded on the first call of this
+        method, subsequent calls end the iteration until `reset()` is called.
+
+        Parameters
+        ----------
+        query_string : str, optional
+            The query string to submit to the PDS API.
+        fields : iterable, optional
+            Additional fields to include with the query parameters.
+
+        Yields
+        ------
+        product : pds.api_client.models.pds_product.PDSProduct
+            The next product fetched from any of the shards.
+
+        Raises
+        ------
+        StopIteration
+            Once all the shards have been exhausted.
+
+        """
+        if self._expected_pages is not None:
+            raise StopIteration
+
+        self._cancelled.clear()
+        self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="peppi-shard")
+        completed = False
+
+        try:
+            shard_queries = self._shard_queries(query_string, self._executor)
+            self._expected_pages = len(shard_queries)
+            self._page_counter = 0
+
+            if self._ordered:
+                queues = [queue.Queue(maxsize=self._QUEUE_DEPTH) for _ in shard_queries]
+            else:
+                depth = self._QUEUE_DEPTH * min(len(shard_queries), self._max_workers)
+                queues = [queue.Queue(maxsize=depth)] if shard_queries else []
+
+            for i, shard_query in enumerate(shard_queries):
+                shard_queue = queues[i] if self._ordered else queues[0]
+                self._executor.submit(self._run_shard, shard_query, fields, shard_queue)
+
+            yield from self._merge(queues, 1 if self._ordered else len(shard_queries))
+            completed = True
+        finally:
+            self.stop_prefetch()
+
+            # Shards cannot be resumed individually, an abandoned iteration starts over
+            if not completed:
+                self.reset()
+
+    def stop_prefetch(self):
+        """Cancels the page requests of all the shards still running, if any."""
+        self._cancelled.set()
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,99 @@
+"""Persistent state of the incremental synchronizations of queries."""
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import datetime
+from datetime import timezone
+from typing import NamedTuple
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SyncCheckpoint(NamedTuple):
+    """High-water mark reached by the latest synchronization of a query."""
+
+    harvest_time: str
+    """Highest harvest time of the products synchronized so far."""
+
+    lidvids: list
+    """Identifiers of the products harvested exactly at harvest_time, used to break ties."""
+
+    query: str
+    """Query string of the synchronized query."""
+
+
+class SyncState:
+    """High-water marks of named queries, stored in a small JSON file.
+
+    Each synchronization of a named query records the highest harvest time of
+    the products it received, together with the LIDVIDs of the products
+    harvested at that exact time. The next synchronization of that query only
+    requests the products harvested since, and skips the ones already received.
+
+    """
+
+    def __init__(self, path: str):
+        """Opens, or creates on first update, a synchronization state file.
+
+        Parameters
+        ----------
+        path : str
+            Path of the JSON state file.
+
+        """
+        self._path = path
+        self._lock = threading.Lock()
+
+    def _read(self) -> dict:
+        """Returns the content of the state file, empty if it does not exist yet."""
+        if not os.path.exists(self._path):
+            return {}
+
+        with open(self._path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, state: dict):
+        """Replaces the content of the state file, atomically."""
+        directory = os.path.dirname(os.path.abspath(self._path))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(state, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self._path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    def get(self, name: str) -> Optional[SyncCheckpoint]:
+        """Returns the checkpoint of the latest synchronization of a query, None if it was never synchronized."""
+        with self._lock:
+            entry = self._read().get(name)
+
+        if entry is None:
+            return None
+
+        return SyncCheckpoint(entry["harvest_time"], entry["lidvids"], entry["query"])
+
+    def update(self, name: str, checkpoint: SyncCheckpoint):
+        """Records the checkpoint reached by a synchronization of a query."""
+        with self._lock:
+            state = self._read()
+            state[name] = dict(checkpoint._asdict(), synced_at=datetime.now(timezone.utc).isoformat())
+            self._write(state)
+
+    def forget(self, name: str):
+        """Removes the checkpoint of a query, so that its next synchronization starts from scratch."""
+        with self._lock:
+            state = self._read()
+            if state.pop(name, None) is not None:
+                self._write(state)
+
+    def names(self) -> list:
+        """Returns the names of the synchronized queries."""
+        with self._lock:
+            return sorted(self._read())
@@ -0,0 +1,339 @@
+"""In-memory stand-in of the PDS Registry API products end-point, used by offline tests."""
+import fnmatch
+import re
+import threading
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs
+from typing import Optional
+from urllib.parse import urlparse
+
+from pds.api_client import PdsProducts
+
+SORT_PROPERTY = "ops:Harvest_Info.ops:harvest_date_time"
+
+_EPOCH = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+_TOKENS = re.compile(r'\s*(?:(\()|(\))|("(?:[^"\\]|\\.)*")|([^\s()"]+))')
+"""Tokens of a query string: parentheses, quoted literals and words"""
+
+_OPERATORS = ("eq", "ne", "gt", "ge", "lt", "le", "like")
+"""Comparison operators of the query language"""
+
+
+def make_product(i, **properties):
+    """Returns the dictionary of a synthetic product, harvested i seconds after a fixed epoch."""
+    lid = f"urn:nasa:pds:fake:data:product_{i:06d}"
+    harvest_time = (_EPOCH + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+    props = {
+        "lid": [lid],
+        "vid": ["1.0"],
+        "lidvid": [f"{lid}::1.0"],
+        "product_class": ["Product_Observational"],
+        "ref_lid_target": ["urn:nasa:pds:context:target:planet.mercury"],
+        SORT_PROPERTY: [harvest_time],
+    }
+    props.update({key: value if isinstance(value, list) else [value] for key, value in properties.items()})
+
+    return {
+        "id": f"{lid}::1.0",
+        "metadata": {"label_url": f"https://pds.example/{i:06d}.xml"},
+        "properties": props,
+    }
+
+
+def harvest_range_matcher(q, product):
+    """Evaluates the harvest time range clauses (ge, lt) of a query string against a product."""
+    harvest_time = product["properties"][SORT_PROPERTY][0]
+
+    for operator, value in re.findall(rf'{re.escape(SORT_PROPERTY)} (ge|lt) "([^"]+)"', q or ""):
+        if operator == "ge" and not harvest_time >= value:
+            return False
+        if operator == "lt" and not harvest_time < value:
+            return False
+
+    return True
+
+
+def _tokenize(query_string: str) -> list:
+    """Returns the tokens of a query string."""
+    tokens = []
+    position = 0
+    query_string = query_string.strip()
+
+    while position < len(query_string):
+        match = _TOKENS.match(query_string, position)
+        if match is None or match.end() == position:
+            raise ValueError(f"Invalid query string at position {position}: {query_string!r}")
+        tokens.append(next(group for group in match.groups() if group is not None))
+        position = match.end()
+
+    return tokens
+
+
+def _literal(token: str):
+    """Returns the value of a literal token, without its quotes."""
+    if token.startswith('"'):
+        return token[1:-1].replace('\\"', '"')
+    return token
+
+
+def _compare(values: list, operator: str, literal: str) -> bool:
+    """Returns True if any of the values of a property compares to the literal as the operator requires."""
+    if operator == "ne":
+        return not _compare(values, "eq", literal)
+
+    for value in values:
+        value = str(value)
+
+        if operator == "like":
+            if fnmatch.fnmatchcase(value, literal):
+                return True
+            continue
+
+        try:
+            left, right = float(value), float(literal)
+        except ValueError:
+            left, right = value, literal
+
+        if (
+            (operator == "eq" and left == right)
+            or (operator == "gt" and left > right)
+            or (operator == "ge" and left >= right)
+            or (operator == "lt" and left < right)
+            or (operator == "le" and left <= right)
+        ):
+            return True
+
+    return False
+
+
+@lru_cache(maxsize=256)
+def compile_query(query_string: Optional[str]):
+    """Returns a predicate evaluating a query string of the PDS Registry API on the properties of a product.
+
+    The eq, ne, gt, ge, lt, le and like comparisons and the exists test are
+    supported, combined with the not, and, or operators and parentheses. Numeric values are
+    compared as numbers, others as strings.
+
+    Raises
+    ------
+    ValueError
+        If the query string is not valid.
+
+    """
+    if not query_string:
+        return lambda properties: True
+
+    tokens = _tokenize(query_string)
+    position = 0
+
+    def peek():
+        return tokens[position].lower() if position < len(tokens) else None
+
+    def take():
+        nonlocal position
+        if position >= len(tokens):
+            raise ValueError(f"Unexpected end of query string: {query_string!r}")
+        position += 1
+        return tokens[position - 1]
+
+    def expression():
+        operands = [term()]
+        while peek() == "or":
+            take()
+            operands.append(term())
+        return operands[0] if len(operands) == 1 else lambda p: any(o(p) for o in operands)
+
+    def term():
+        operands = [factor()]
+        while peek() == "and":
+            take()
+            operands.append(factor())
+        return operands[0] if len(operands) == 1 else lambda p: all(o(p) for o in operands)
+
+    def factor():
+        token = take()
+
+        if token.lower() == "not":
+            operand = factor()
+            return lambda p: not operand(p)
+
+        if token == "(":
+            operand = expression()
+            if take() != ")":
+                raise ValueError(f"Unbalanced parentheses in query string: {query_string!r}")
+            return operand
+
+        operator = take().lower()
+        if operator == "exists":
+            return lambda p: bool(p.get(token))
+        if operator not in _OPERATORS:
+            raise ValueError(f'Invalid operator "{operator}" in query string: {query_string!r}')
+
+        name, literal = token, _literal(take())
+        return lambda p: _compare(p.get(name) or [], operator, literal)
+
+    predicate = expression()
+
+    if position != len(tokens):
+        raise ValueError(f"Unexpected token {tokens[position]!r} in query string: {query_string!r}")
+
+    return predicate
+
+
+def query_matcher(q, product):
+    """Evaluates a query string against a product dictionary, see `compile_query()`."""
+    return compile_query(q)(product["properties"])
+
+
+class FakeRegistry:
+    """Serves pages of synthetic products sorted by harvest time, honoring limit, search_after and fields.
+
+    Query strings are recorded but not evaluated, unless a ``matcher`` callable
+    is given, which receives the query string and a product dictionary.
+
+    Errors are injected with ``failures``, mapping the index of a request to the
+    (status, headers) of the error response it gets instead of a page.
+
+    """
+
+    def __init__(self, n_products=250, products=None, matcher=None):
+        self.products = products if products is not None else [make_product(i) for i in range(n_products)]
+        self.matcher = matcher
+        self.requests = []
+        self.failures = {}
+        self._lock = threading.Lock()
+
+    def product_list(self, fields=None, keywords=None, limit=None, q=None, sort=None, search_after=None, **kwargs):
+        with self._lock:
+            self.requests.append({"fields": fields, "limit": limit, "q": q, "sort": sort, "search_after": search_after})
+
+        matching = [p for p in self.products if self.matcher is None or self.matcher(q, p)]
+        page = matching
+
+        if search_after:
+            page = [p for p in page if p["properties"][SORT_PROPERTY][0] > search_after[0]]
+
+        page = page[:limit] if limit is not None else page
+
+        if fields:
+            page = [dict(p, properties={k: v for k, v in p["properties"].items() if k in fields}) for p in page]
+
+        return PdsProducts.from_dict({"data": page, "summary": {"hits": len(matching), "limit": limit}})
+
+    def response(self, **kwargs):
+        """Returns the raw HTTP response of a page request, as read by the API client."""
+        failure = self.failures.get(len(self.requests))
+        page = self.product_list(**kwargs)
+
+        if failure is not None:
+            status, headers = failure
+            return FakeResponse(b'{"message": "injected failure"}', status=status, reason="Error", headers=headers)
+
+        return FakeResponse(page.to_json().encode("utf-8"))
+
+    def patch(self):
+        """Returns a patcher routing the page requests of AllProductsApi to this fake registry."""
+        return mock.patch(
+            "pds.api_client.api.all_products_api.AllProductsApi.product_list_without_preload_content",
+            autospec=True,
+            side_effect=lambda _api, **kwargs: self.response(**kwargs),
+        )
+
+
+class FakeResponse:
+    """Minimal stand-in of the RESTResponse returned by the API client."""
+
+    def __init__(self, data, status=200, reason="OK", headers=None):
+        self.data = data
+        self.status = status
+        self.reason = reason
+        self.headers = dict({"content-type": "application/json"}, **(headers or {}))
+
+    def read(self):
+        return self.data
+
+    def getheader(self, name, default=None):
+        return self.headers.get(name.lower(), default)
+
+    def getheaders(self):
+        return self.headers
+
+
+async def serve_async(registry):
+    """Starts a local aiohttp server exposing the products end-point of the fake registry, returns its runner and URL."""
+    from aiohttp import web
+
+    async def products(request):
+        query = request.query
+        limit = query.get("limit")
+        failure = registry.failures.get(len(registry.requests))
+        page = registry.product_list(
+            fields=query.getall("fields", None),
+            limit=int(limit) if limit is not None else None,
+            q=query.get("q"),
+            sort=query.getall("sort", None),
+            search_after=query.getall("search-after", None),
+        )
+
+        if failure is not None:
+            status, headers = failure
+            return web.json_response({"message": "injected failure"}, status=status, headers=headers)
+
+        return web.Response(text=page.to_json(), content_type="application/json")
+
+    app = web.Application()
+    app.router.add_get("/products", products)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def serve_http(registry):
+    """Starts a local HTTP server exposing the products end-point of the fake registry, returns it and its URL.
+
+    Unlike the patched page requests, the API client reads real urllib3 responses from this server.
+
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):  # noqa: N802
+            url = urlparse(self.path)
+
+            if url.path != "/products":
+                self.send_error(404)
+                return
+
+            query = parse_qs(url.query)
+            limit = query.get("limit")
+            page = registry.product_list(
+                fields=query.get("fields"),
+                limit=int(limit[0]) if limit else None,
+                q=(query.get("q") or [None])[0],
+                sort=query.get("sort"),
+                search_after=query.get("search-after"),
+            )
+            body = page.to_json().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
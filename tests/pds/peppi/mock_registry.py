@@ -0,0 +1,326 @@
+"""Local HTTP stand-in of the products end-point of the PDS Registry API, for offline tests and benchmarks.
+
+The server pages through the synthetic products of the `FakeRegistry`, or
+products replayed from recorded fixtures, honoring the ``q``, ``fields``,
+``limit``, ``sort`` and ``search-after`` parameters of the real API. Latency
+and page size limits are configurable, so that the performance of the clients
+can be measured reproducibly::
+
+    with MockRegistry(n_products=10000, latency=0.05) as registry:
+        client = PDSRegistryClient(registry.base_url)
+        df = Products(client).observationals().as_dataframe()
+"""
+import bisect
+import gzip
+import json
+import logging
+import random
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
+
+from .fake_registry import _EPOCH
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+from .fake_registry import query_matcher
+from .fake_registry import SORT_PROPERTY
+
+logger = logging.getLogger(__name__)
+
+OREX_INVESTIGATION = "urn:nasa:pds:context:investigation:mission.orex"
+"""Investigation of the synthetic products carrying OREX spatial properties"""
+
+
+def synthetic_product(i: int, n_properties: int = 0, seed: int = 0) -> dict:
+    """Returns the i-th synthetic product, as returned by the PDS Registry API.
+
+    The products are the ones of `make_product()`, harvested one second
+    apart. Half of them are OREX observational products with spatial properties, the others alternate
+    between targets and processing levels. The values are the same for
+    the same index and seed.
+
+    Parameters
+    ----------
+    i : int
+        Index of the product.
+    n_properties : int, optional
+        Number of additional filler properties, to weigh the products.
+    seed : int, optional
+        Seed of the pseudo-random values.
+
+    """
+    rng = random.Random(seed * 1_000_003 + i)
+    start_time = _EPOCH - timedelta(days=365) + timedelta(minutes=i)
+    properties = {
+        "title": f"Mock product {i}",
+        "product_class": "Product_Observational" if i % 10 else "Product_Collection",
+        "ref_lid_target": (
+            "urn:nasa:pds:context:target:asteroid.101955_bennu",
+            "urn:nasa:pds:context:target:planet.mars",
+        )[i % 2],
+        "pds:Primary_Result_Summary.pds:processing_level": ("Raw", "Calibrated", "Derived")[i % 3],
+        "pds:Time_Coordinates.pds:start_date_time": start_time.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+        "pds:Time_Coordinates.pds:stop_date_time": (start_time + timedelta(seconds=30)).strftime(
+            "%Y-%m-%dT%H:%M:%S.%fZ"
+        ),
+    }
+
+    if i % 2 == 0:
+        properties["ref_lid_investigation"] = OREX_INVESTIGATION
+        properties["orex:Spatial.orex:latitude"] = f"{rng.uniform(-90, 90):.4f}"
+        properties["orex:Spatial.orex:longitude"] = f"{rng.uniform(0, 360):.4f}"
+        properties["orex:Spatial.orex:target_range"] = f"{rng.uniform(0.1, 50):.4f}"
+
+    for j in range(n_properties):
+        properties[f"mock:Filler.mock:property_{j}"] = f"value_{i}_{j}_{rng.random():.6f}"
+
+    return make_product(i, **properties)
+
+
+def load_fixture(path: str) -> list:
+    """Returns the products recorded in a fixture file.
+
+    Supported fixtures are the JSON bodies of responses of the PDS Registry
+    API (a single page or a list of pages), JSON lists of products, and the
+    NDJSON files written by `QueryBuilder.to_ndjson()`, optionally gzipped.
+    Products missing a harvest time get increasing ones, in file order.
+
+    Fixtures are recorded from the real API with ``to_ndjson()``, or by
+    saving the bodies of its responses.
+
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+
+    with opener(path, "rt", encoding="utf-8") as f:
+        if ".ndjson" in path or ".jsonl" in path:
+            products = [json.loads(line) for line in f if line.strip()]
+        else:
+            content = json.load(f)
+            pages = content if isinstance(content, list) else [content]
+            products = []
+            for page in pages:
+                products.extend(page["data"] if isinstance(page, dict) and "data" in page else [page])
+
+    for i, product in enumerate(products):
+        # The API client requires the URL of the label, which exported products do not keep
+        product.setdefault("metadata", {}).setdefault("label_url", "")
+        properties = product.setdefault("properties", {})
+        properties.setdefault(SORT_PROPERTY, [(_EPOCH + timedelta(seconds=i)).strftime("%Y-%m-%dT%H:%M:%S.%fZ")])
+
+    return products
+
+
+class MockRegistry(FakeRegistry):
+    """Local HTTP server serving the products of a FakeRegistry as the products end-point of the PDS Registry API.
+
+    Products are served sorted by harvest time, whatever the requested sort.
+    The query strings are evaluated with `query_matcher()`, once per query.
+    The requests served are recorded in `requests`, and the number of
+    products they returned is counted in `products_served`.
+
+    """
+
+    def __init__(
+        self,
+        n_products: int = 1000,
+        products: Optional[list] = None,
+        latency: float = 0.0,
+        latency_per_product: float = 0.0,
+        max_page_size: int = 10000,
+        n_properties: int = 0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        """Creates a new MockRegistry, started by `start()` or on entering a ``with`` block.
+
+        Parameters
+        ----------
+        n_products : int, optional
+            Number of synthetic products to serve, ignored if products are given.
+        products : list of dict, optional
+            Products to serve, for example loaded with `load_fixture()`.
+        latency : float, optional
+            Delay before answering each request, in seconds.
+        latency_per_product : float, optional
+            Additional delay per product returned, in seconds.
+        max_page_size : int, optional
+            Maximum number of products returned per page, whatever the requested limit.
+        n_properties : int, optional
+            Number of filler properties of the synthetic products.
+        seed : int, optional
+            Seed of the pseudo-random values of the synthetic products.
+        host : str, optional
+            Address the server listens on.
+        port : int, optional
+            Port the server listens on, any free one by default.
+
+        """
+        if products is None:
+            products = [synthetic_product(i, n_properties, seed) for i in range(n_products)]
+
+        super().__init__(
+            products=sorted(products, key=lambda p: p["properties"][SORT_PROPERTY][0]), matcher=query_matcher
+        )
+        self.latency = latency
+        self.latency_per_product = latency_per_product
+        self.max_page_size = max_page_size
+        self.products_served = 0
+        self._address = (host, port)
+        self._server = None
+        self._thread = None
+        self._matches: dict = {}
+
+    @classmethod
+    def from_fixture(cls, path: str, **kwargs) -> "MockRegistry":
+        """Creates a MockRegistry replaying the products of a fixture file, see `load_fixture()`."""
+        return cls(products=load_fixture(path), **kwargs)
+
+    @property
+    def base_url(self) -> str:
+        """Base URL to create a PDSRegistryClient with, once started."""
+        if self._server is None:
+            raise RuntimeError("The mock registry is not started")
+
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _matching(self, query_string: Optional[str]) -> tuple:
+        """Returns the products matching a query string, with their harvest times, computed once per query."""
+        with self._lock:
+            matches = self._matches.get(query_string)
+
+        if matches is None:
+            products = [p for p in self.products if self.matcher(query_string, p)]
+            matches = products, [p["properties"][SORT_PROPERTY][0] for p in products]
+
+            with self._lock:
+                self._matches[query_string] = matches
+
+        return matches
+
+    def page(self, q=None, fields=None, limit=None, search_after=None) -> dict:
+        """Returns the body of the response to a page request, as a dictionary.
+
+        Parameters
+        ----------
+        q : str, optional
+            Query string.
+        fields : list of str, optional
+            Properties to return, all of them by default.
+        limit : int, optional
+            Maximum number of products to return, capped by the maximum page size.
+        search_after : list of str, optional
+            Harvest time after which the page starts.
+
+        """
+        start = time.perf_counter()
+        products, harvest_times = self._matching(q)
+        limit = min(self.max_page_size if limit is None else limit, self.max_page_size)
+        first = bisect.bisect_right(harvest_times, search_after[0]) if search_after else 0
+        page = products[first : first + limit]
+
+        if fields:
+            fields = set(fields)
+            page = [dict(p, properties={k: v for k, v in p["properties"].items() if k in fields}) for p in page]
+
+        with self._lock:
+            self.requests.append({"fields": fields, "limit": limit, "q": q, "sort": None, "search_after": search_after})
+            self.products_served += len(page)
+
+        summary = {
+            "hits": len(products),
+            "limit": limit,
+            "q": q or "",
+            "search_after": search_after or [],
+            "sort": [SORT_PROPERTY],
+            "properties": sorted(fields or []),
+            "took": int((time.perf_counter() - start) * 1000),
+        }
+        return {"summary": summary, "data": page}
+
+    def stats(self) -> dict:
+        """Returns the number of requests served and of products returned, also served at the ``_stats`` end-point."""
+        with self._lock:
+            return {"requests": len(self.requests), "products_served": self.products_served}
+
+    def _handler(self):
+        """Returns the request handler class of the server."""
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):  # noqa: A002
+                logger.debug("%s %s", self.address_string(), format % args)
+
+            def _send(self, status, body):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):  # noqa: N802
+                url = urlparse(self.path)
+                end_point = url.path.rstrip("/").rsplit("/", 1)[-1]
+
+                if end_point == "_stats":
+                    self._send(200, registry.stats())
+                    return
+
+                if end_point != "products":
+                    self._send(404, {"message": f"Unknown end-point {url.path}"})
+                    return
+
+                params = parse_qs(url.query)
+                fields = [f for value in params.get("fields", []) for f in value.split(",") if f]
+                limit = params.get("limit")
+
+                try:
+                    body = registry.page(
+                        q=params.get("q", [None])[0],
+                        fields=fields,
+                        limit=int(limit[0]) if limit else None,
+                        search_after=params.get("search-after"),
+                    )
+                except ValueError as err:
+                    self._send(400, {"message": str(err)})
+                    return
+
+                time.sleep(registry.latency + registry.latency_per_product * len(body["data"]))
+                self._send(200, body)
+
+        return Handler
+
+    def start(self) -> "MockRegistry":
+        """Starts serving requests on a background thread, returns this registry."""
+        self._server = ThreadingHTTPServer(self._address, self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, name="peppi-mock-registry", daemon=True)
+        self._thread.start()
+        logger.info("Mock registry serving %d products at %s", len(self.products), self.base_url)
+        return self
+
+    def stop(self):
+        """Stops serving requests."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
+
+    def __enter__(self):
+        """Starts the server, see `start()`."""
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Stops the server."""
+        self.stop()
@@ -0,0 +1,74 @@
+import asyncio
+import importlib.util
+import unittest
+
+import pds.peppi as pep
+
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+from .fake_registry import serve_async
+
+
+def _target_matcher(q, product):
+    if q and "Product_Context" in q:
+        return product["properties"]["product_class"] == ["Product_Context"]
+    if q and "ref_lid_target" in q:
+        return "planet.mercury" in q and product["properties"]["product_class"] != ["Product_Context"]
+    return True
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncProductsTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        mercury = make_product(
+            10**6,
+            lid="urn:nasa:pds:context:target:planet.mercury",
+            product_class="Product_Context",
+        )
+        self.registry = FakeRegistry(products=[make_product(i) for i in range(250)] + [mercury])
+        self.runner, base_url = await serve_async(self.registry)
+        self.client = pep.AsyncPDSRegistryClient(base_url)
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_async_iteration(self):
+        ids = [p.id async for p in pep.AsyncProducts(self.client)]
+
+        assert ids == [p["id"] for p in self.registry.products]
+        assert len(self.registry.requests) == 3
+
+    async def test_sync_iteration_not_supported(self):
+        with self.assertRaises(TypeError):
+            iter(pep.AsyncProducts(self.client))
+
+    async def test_as_dataframe(self):
+        df = await pep.AsyncProducts(self.client).fields(["lid"]).as_dataframe(max_rows=10)
+
+        assert len(df) == 10
+        assert df["lid"].iloc[0] == "urn:nasa:pds:fake:data:product_000000"
+
+    async def test_iter_dataframes(self):
+        frames = [df async for df in pep.AsyncProducts(self.client).fields(["lid"]).iter_dataframes(chunk_size=100)]
+
+        assert [len(df) for df in frames] == [100, 100, 51]
+        assert all(list(df.columns) == list(frames[0].columns) for df in frames)
+
+    async def test_concurrent_queries(self):
+        queries = [pep.AsyncProducts(self.client).observationals() for _ in range(20)]
+        frames = await asyncio.gather(*(q.as_dataframe(max_rows=5) for q in queries))
+
+        assert all(len(df) == 5 for df in frames)
+
+    async def test_has_target_keyword(self):
+        self.registry.matcher = _target_matcher
+        products = pep.AsyncProducts(self.client).has_target("Mercury")
+        ids = [p.id async for p in products]
+
+        assert len(ids) == 250
+        assert 'ref_lid_target eq "urn:nasa:pds:context:target:planet.mercury"' in products._q_string
+
+
+if __name__ == "__main__":
+    unittest.main()
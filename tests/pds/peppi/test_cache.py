@@ -0,0 +1,145 @@
+import os
+import tempfile
+import time
+import unittest
+
+import pds.peppi as pep
+from pds.api_client.exceptions import NotFoundException
+from pds.peppi.cache import normalize_query
+from pds.peppi.cache import PageCache
+
+from .fake_registry import FakeRegistry
+from .fake_registry import serve_http
+
+
+class PageCacheTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.cache = PageCache(":memory:")
+        self.client = pep.PDSRegistryClient(cache=self.cache)
+
+    def test_warm_cache_replays_query(self):
+        cold = [p.id for p in pep.Products(self.client).observationals()]
+        n_requests = len(self.registry.requests)
+        warm = [p.id for p in pep.Products(self.client).observationals()]
+
+        assert warm == cold
+        assert len(self.registry.requests) == n_requests
+
+        stats = self.cache.stats()
+        assert stats.entries == 3
+        assert stats.hits == 3
+        assert stats.misses == 3
+        assert stats.size > 0
+
+    def test_key_normalization(self):
+        kwargs = {"q": '(product_class eq "Product_Bundle")', "fields": ["b", "a"], "limit": 100}
+        equivalent = {"q": ' product_class  eq "Product_Bundle" ', "fields": ["a", "b"], "limit": 100}
+
+        assert PageCache.key("url", kwargs) == PageCache.key("url", equivalent)
+        assert PageCache.key("url", kwargs) != PageCache.key("other_url", kwargs)
+        assert PageCache.key("url", kwargs) != PageCache.key("url", dict(kwargs, search_after=["t"]))
+
+    def test_normalize_query(self):
+        assert normalize_query('((a eq "x"))') == 'a eq "x"'
+        assert normalize_query('(a eq "x") and (b eq "y")') == '(a eq "x") and (b eq "y")'
+        assert normalize_query('(a eq ")(")') == 'a eq ")("'
+
+    def test_ttl(self):
+        self.cache.put("key", "q", b"body", ttl=0.01)
+        time.sleep(0.02)
+
+        assert self.cache.get("key") is None
+        assert self.cache.stats().entries == 0
+
+    def test_lru_eviction(self):
+        cache = PageCache(":memory:", max_size=10)
+        cache.put("a", "q", b"aaaa")
+        cache.put("b", "q", b"bbbb")
+        cache.get("a")
+        cache.put("c", "q", b"cccc")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"aaaa"
+        assert cache.stats().evictions == 1
+        assert cache.stats().size == 8
+
+    def test_eviction_of_a_shared_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "pages.sqlite")
+            first, second = PageCache(path, max_size=10), PageCache(path, max_size=10)
+            self.addCleanup(first.close)
+            self.addCleanup(second.close)
+
+            first.put("a", "q", b"aaaa")
+            second.put("b", "q", b"bbbb")
+            second.put("c", "q", b"cccc")
+
+            # The pages stored by the other instance count towards the maximum size
+            assert first.get("a") is None
+            assert first.stats().size == second.stats().size == 8
+
+            second.invalidate()
+            first.put("d", "q", b"dddd")
+            assert first.stats().entries == 1
+
+            # The total size is kept by the database, a cache opened later starts from it
+            third = PageCache(path, max_size=10)
+            self.addCleanup(third.close)
+            assert third.stats().size == 4
+
+    def test_size_after_removals(self):
+        self.cache.put("a", "q1", b"aaaa")
+        self.cache.put("a", "q1", b"aaaaaa")
+        self.cache.put("b", "q2", b"bb", ttl=0)
+        self.cache.put("c", "q3", b"ccc")
+        assert self.cache.stats().size == 11
+
+        assert self.cache.purge_expired() == 1
+        assert self.cache.stats().size == 9
+
+        self.cache.invalidate("q1")
+        assert self.cache.stats().size == 3
+
+        self.cache.invalidate()
+        assert self.cache.stats().size == 0
+
+    def test_invalidate(self):
+        products = pep.Products(self.client).observationals()
+        list(products)
+        list(pep.Products(self.client).bundles())
+
+        assert self.cache.invalidate('product_class eq "Product_Observational"') == 3
+        assert self.cache.stats().entries == 3
+        assert self.cache.invalidate() == 3
+
+
+class HTTPResponseTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250)
+        self.server, self.base_url = serve_http(self.registry)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+    def test_pages_are_read_from_the_response_body(self):
+        products = [p.id for p in pep.Products(pep.PDSRegistryClient(self.base_url))]
+
+        assert products == [p["id"] for p in self.registry.products]
+
+        cache = PageCache(":memory:")
+        cold = [p.id for p in pep.Products(pep.PDSRegistryClient(self.base_url, cache=cache))]
+        warm = [p.id for p in pep.Products(pep.PDSRegistryClient(self.base_url, cache=cache))]
+
+        assert cold == warm == products
+        assert cache.stats().hits == 3
+
+    def test_error_status(self):
+        with self.assertRaises(NotFoundException):
+            list(pep.Products(pep.PDSRegistryClient(f"{self.base_url}/missing")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+import pds.peppi as pep
+from pds.peppi.predicates import prop
+
+from .fake_registry import FakeRegistry
+from .fake_registry import serve_async
+
+
+class _Crash(Exception):
+    pass
+
+
+def _consume(products, crash_after=None):
+    """Returns the ids of the products iterated on, until the crash if any."""
+    ids = []
+
+    try:
+        for product in products:
+            ids.append(product.id)
+            if len(ids) == crash_after:
+                raise _Crash()
+    except _Crash:
+        pass
+
+    return ids
+
+
+class CheckpointTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=450)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "checkpoints", "pull.json")
+        self.all_ids = [p["id"] for p in self.registry.products]
+
+    def _products(self, every_pages=1):
+        return pep.Products(self.client).observationals().checkpoint(self.path, every_pages=every_pages)
+
+    def test_resume_without_duplicates_nor_gaps(self):
+        first = _consume(self._products(), crash_after=250)
+        resumed = _consume(self._products())
+
+        assert first == self.all_ids[:250]
+        assert resumed == self.all_ids[200:]
+        assert self.registry.requests[-3]["search_after"] == [
+            self.registry.products[199]["properties"]["ops:Harvest_Info.ops:harvest_date_time"][0]
+        ]
+
+    def test_checkpoint_interval(self):
+        _consume(self._products(every_pages=3), crash_after=299)
+        assert not os.path.exists(self.path)
+
+        _consume(self._products(every_pages=3), crash_after=301)
+        with open(self.path, encoding="utf-8") as f:
+            state = json.load(f)
+
+        assert state["received"] == 300
+        assert state["hits"] == 450
+        assert not state["complete"]
+
+    def test_complete(self):
+        assert len(_consume(self._products(every_pages=100))) == 450
+
+        with open(self.path, encoding="utf-8") as f:
+            assert json.load(f)["complete"]
+
+        assert _consume(self._products()) == []
+
+    def test_from_checkpoint(self):
+        _consume(self._products().fields(["lid"]), crash_after=120)
+
+        products = pep.Products.from_checkpoint(self.client, self.path)
+        resumed = _consume(products)
+
+        assert resumed == self.all_ids[100:]
+        assert products.query_hash() == self._products().query_hash()
+        assert self.registry.requests[-1]["q"] == self.registry.requests[0]["q"]
+        assert "lid" in self.registry.requests[-1]["fields"]
+
+    def test_resume_with_limit(self):
+        _consume(self._products().limit(300), crash_after=150)
+
+        assert _consume(pep.Products.from_checkpoint(self.client, self.path)) == self.all_ids[100:300]
+
+    def test_other_query(self):
+        _consume(self._products(), crash_after=150)
+
+        with self.assertRaises(ValueError):
+            list(pep.Products(self.client).bundles().checkpoint(self.path))
+
+    def test_missing_checkpoint(self):
+        with self.assertRaises(FileNotFoundError):
+            pep.Products.from_checkpoint(self.client, self.path)
+
+    def test_not_parallel(self):
+        with self.assertRaises(ValueError):
+            self._products().parallel()
+
+        with self.assertRaises(ValueError):
+            pep.Products(self.client).parallel().checkpoint(self.path)
+
+    def test_not_filtered_locally(self):
+        with self.assertRaises(ValueError):
+            pep.Products(self.client).where(prop("lid").matches("1$")).checkpoint(self.path)
+
+        with self.assertRaises(ValueError):
+            pep.Products(self.client).latest_only(server_side=False).checkpoint(self.path)
+
+        with self.assertRaises(ValueError):
+            list(self._products().where(prop("lid").matches("1$")))
+
+        assert not os.path.exists(self.path)
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncCheckpointTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = FakeRegistry(n_products=450)
+        self.runner, base_url = await serve_async(self.registry)
+        self.client = pep.AsyncPDSRegistryClient(base_url)
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "pull.json")
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_resume(self):
+        ids = []
+        async for product in pep.AsyncProducts(self.client).checkpoint(self.path, every_pages=1):
+            ids.append(product.id)
+            if len(ids) == 250:
+                break
+
+        resumed = [p.id async for p in pep.AsyncProducts(self.client).checkpoint(self.path)]
+
+        assert ids[:200] + resumed == [p["id"] for p in self.registry.products]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+import importlib.util
+import re
+import unittest
+
+import pds.peppi as pep
+from pds.peppi.chunked_result_set import MAX_CHUNK_LENGTH
+from pds.peppi.chunked_result_set import MAX_CHUNK_VALUES
+from pds.peppi.chunked_result_set import or_clauses
+
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+from .fake_registry import serve_async
+
+
+def _list_matcher(q, product):
+    """Evaluates a query string ORing values of the same property and ANDing distinct properties against a product."""
+    values = {}
+    for name, value in re.findall(r'([\w:.]+) eq "([^"]+)"', q or ""):
+        values.setdefault(name, set()).add(value)
+    return all(set(product["properties"].get(name, [])) & accepted for name, accepted in values.items())
+
+
+def _cap_page_size(registry, max_page_size=7):
+    """Makes the fake registry return less products than requested, as a server capping the page size would."""
+    product_list = registry.product_list
+
+    def capped_product_list(limit=None, **kwargs):
+        return product_list(limit=min(limit, max_page_size) if limit else limit, **kwargs)
+
+    registry.product_list = capped_product_list
+
+
+class OrClausesTestCase(unittest.TestCase):
+    def test_single_clause(self):
+        assert or_clauses("lidvid", ["a::1.0", "b::1.0", "a::1.0"]) == ['lidvid eq "a::1.0" or lidvid eq "b::1.0"']
+
+    def test_bounded_clauses(self):
+        values = [f"urn:nasa:pds:fake:data:product_{i:06d}::1.0" for i in range(1000)]
+
+        clauses = or_clauses("lidvid", values)
+
+        assert all(c.count(" or ") < MAX_CHUNK_VALUES and len(c) <= MAX_CHUNK_LENGTH for c in clauses)
+        assert [v for c in clauses for v in re.findall(r'"([^"]+)"', c)] == values
+
+    def test_length_bound(self):
+        clauses = or_clauses("lidvid", ["x" * 30, "y" * 30, "z" * 30], max_length=100)
+
+        assert len(clauses) == 2
+
+
+class GetManyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        targets = ["urn:nasa:pds:context:target:planet.mercury", "urn:nasa:pds:context:target:planet.venus"]
+        products = [make_product(i, ref_lid_target=targets[i % 2]) for i in range(600)]
+        self.registry = FakeRegistry(products=products, matcher=_list_matcher)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+        self.lidvids = [p["id"] for p in products[:500]]
+
+    def test_get_many(self):
+        ids = [p.id for p in pep.Products(self.client).get_many(self.lidvids + self.lidvids[:10])]
+
+        assert sorted(ids) == sorted(self.lidvids)
+        assert all(len(r["q"]) < 2 * MAX_CHUNK_LENGTH for r in self.registry.requests)
+        assert len({r["q"] for r in self.registry.requests}) == 500 // MAX_CHUNK_VALUES
+
+    def test_get_many_short_list(self):
+        ids = [p.id for p in pep.Products(self.client).get_many(self.lidvids[:3])]
+
+        assert ids == self.lidvids[:3]
+        assert len(self.registry.requests) == 1
+
+    def test_get_many_with_other_filters(self):
+        products = (
+            pep.Products(self.client).get_many(self.lidvids).has_target("urn:nasa:pds:context:target:planet.venus")
+        )
+        ids = [p.id for p in products]
+
+        assert sorted(ids) == self.lidvids[1::2]
+        assert all("planet.venus" in r["q"] for r in self.registry.requests)
+
+    def test_duplicates_across_chunks(self):
+        targets = [f"urn:nasa:pds:context:target:t{i}" for i in range(200)]
+        targets += ["urn:nasa:pds:context:target:planet.mercury", "urn:nasa:pds:context:target:planet.venus"]
+
+        ids = [p.id for p in pep.Products(self.client)._has_target(targets)]
+
+        assert sorted(ids) == sorted(p["id"] for p in self.registry.products)
+
+    def test_several_long_lists(self):
+        targets = [f"urn:nasa:pds:context:target:t{i}" for i in range(200)]
+        targets.append("urn:nasa:pds:context:target:planet.venus")
+
+        products = pep.Products(self.client)._has_target(targets).get_many(self.lidvids)
+        ids = [p.id for p in products]
+
+        # Only the LIDVIDs are split into queries, the targets are checked locally
+        assert sorted(ids) == sorted(self.lidvids[1::2])
+        assert len(self.registry.requests) == 500 // MAX_CHUNK_VALUES
+        assert not any("ref_lid_target" in r["q"] for r in self.registry.requests)
+
+        products = pep.Products(self.client)._has_target(targets).get_many(self.lidvids)
+        assert products.count() == 250
+
+    def test_count_of_a_multi_valued_property(self):
+        targets = [f"urn:nasa:pds:context:target:t{i}" for i in range(100)]
+
+        for i, product in enumerate(self.registry.products):
+            product["properties"]["ref_lid_target"] = [targets[i % 100], targets[(i + 50) % 100]]
+
+        # Each product matches the chunks of its two targets, and is counted once
+        assert pep.Products(self.client)._has_target(targets).count() == 600
+        assert pep.Products(self.client)._has_target(targets).limit(70).count() == 70
+
+    def test_count_and_limit(self):
+        assert pep.Products(self.client).get_many(self.lidvids).count() == 500
+
+        ids = [p.id for p in pep.Products(self.client).get_many(self.lidvids).limit(120)]
+
+        assert len(set(ids)) == 120
+
+    def test_server_page_size_cap(self):
+        _cap_page_size(self.registry)
+        ids = [p.id for p in pep.Products(self.client).get_many(self.lidvids)]
+
+        assert sorted(ids) == sorted(self.lidvids)
+
+    def test_reset_clears_chunks(self):
+        products = pep.Products(self.client).get_many(self.lidvids)
+        products.reset()
+
+        assert len(list(products)) == 600
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncGetManyTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = FakeRegistry(n_products=300, matcher=_list_matcher)
+        self.runner, base_url = await serve_async(self.registry)
+        self.client = pep.AsyncPDSRegistryClient(base_url)
+        self.lidvids = [p["id"] for p in self.registry.products[:220]]
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_async_get_many(self):
+        ids = [p.id async for p in pep.AsyncProducts(self.client).get_many(self.lidvids * 2)]
+
+        assert sorted(ids) == sorted(self.lidvids)
+        assert await pep.AsyncProducts(self.client).get_many(self.lidvids).count() == 220
+
+    async def test_server_page_size_cap(self):
+        _cap_page_size(self.registry)
+        ids = [p.id async for p in pep.AsyncProducts(self.client).get_many(self.lidvids)]
+
+        assert sorted(ids) == sorted(self.lidvids)
+
+
+if __name__ == "__main__":
+    unittest.main()
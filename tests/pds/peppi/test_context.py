@@ -0,0 +1,217 @@
+import importlib.util
+import os
+import re
+import tempfile
+import unittest
+
+import pds.peppi as pep
+from pds.peppi.context import ALTERNATE_TITLE_PROPERTY
+from pds.peppi.context import context_type_of
+from pds.peppi.context import ContextResolver
+from pds.peppi.context import TITLE_PROPERTY
+
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+from .fake_registry import serve_async
+
+_CONTEXTS = [
+    ("urn:nasa:pds:context:target:planet.mercury", "Mercury", []),
+    ("urn:nasa:pds:context:target:planet.mars", "Mars", ["Red Planet"]),
+    ("urn:nasa:pds:context:target:satellite.earth.moon", "Moon", []),
+    ("urn:nasa:pds:context:instrument:mro.hirise", "HiRISE", ["High Resolution Imaging Science Experiment"]),
+    ("urn:nasa:pds:context:investigation:mission.mars_reconnaissance_orbiter", "Mars Reconnaissance Orbiter", []),
+]
+
+
+def _registry_matcher(q, product):
+    """Selects the context products by title, case insensitive, the other products by referenced context LIDs."""
+    properties = product["properties"]
+
+    if q and "Product_Context" in q:
+        if properties["product_class"] != ["Product_Context"]:
+            return False
+        titles = re.findall(r'(?:title|alternate_title) eq "([^"]+)"', q)
+        names = {
+            n.casefold() for n in properties.get(TITLE_PROPERTY, []) + properties.get(ALTERNATE_TITLE_PROPERTY, [])
+        }
+        return not titles or any(title.casefold() in names for title in titles)
+
+    if properties["product_class"] == ["Product_Context"]:
+        return False
+
+    for name, value in re.findall(r'(ref_lid_\w+) eq "([^"]+)"', q or ""):
+        if value in properties.get(name, []):
+            return True
+
+    return "ref_lid_" not in (q or "")
+
+
+def _registry():
+    products = [
+        make_product(
+            10**5 + i,
+            lid=lid,
+            product_class="Product_Context",
+            **{TITLE_PROPERTY: title, ALTERNATE_TITLE_PROPERTY: alternate_titles},
+        )
+        for i, (lid, title, alternate_titles) in enumerate(_CONTEXTS)
+    ]
+    products += [make_product(i, ref_lid_target=_CONTEXTS[i % 3][0]) for i in range(30)]
+    return FakeRegistry(products=products, matcher=_registry_matcher)
+
+
+def _context_requests(registry):
+    return [r for r in registry.requests if "Product_Context" in (r["q"] or "")]
+
+
+class ContextResolverTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = _registry()
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.resolver = ContextResolver(pep.PDSRegistryClient())
+
+    def test_context_type_of(self):
+        assert context_type_of("urn:nasa:pds:context:target:planet.mars") == "target"
+        assert context_type_of("urn:nasa:pds:fake:data:product_000001") is None
+
+    def test_resolve_once(self):
+        assert self.resolver.resolve("mars", "target") == ["urn:nasa:pds:context:target:planet.mars"]
+        assert self.resolver.resolve("MARS", "target") == ["urn:nasa:pds:context:target:planet.mars"]
+        assert self.resolver.resolve("red planet") == ["urn:nasa:pds:context:target:planet.mars"]
+
+        assert len(self.registry.requests) == 1
+        assert self.registry.requests[0]["fields"][:3] == ["lid", TITLE_PROPERTY, ALTERNATE_TITLE_PROPERTY]
+
+    def test_unknown_keyword_requested_once(self):
+        assert self.resolver.resolve("vulcan", "target") == []
+        assert self.resolver.resolve("Vulcan", "target") == []
+
+        assert len(self.registry.requests) == 1
+
+    def test_resolve_many_batched(self):
+        keywords = ["mercury", "mars", "moon", "hirise", "vulcan"] + [f"unknown {i}" for i in range(40)]
+
+        lids = self.resolver.resolve_many(keywords, "target")
+
+        assert lids["mercury"] == ["urn:nasa:pds:context:target:planet.mercury"]
+        assert lids["moon"] == ["urn:nasa:pds:context:target:satellite.earth.moon"]
+        assert lids["hirise"] == []
+        assert lids["vulcan"] == []
+        assert len(self.registry.requests) == 2
+
+        assert self.resolver.resolve("hirise", "instrument") == ["urn:nasa:pds:context:instrument:mro.hirise"]
+        assert len(self.registry.requests) == 2
+
+    def test_lids_are_not_requested(self):
+        assert self.resolver.resolve("urn:nasa:pds:context:target:planet.mars") == [
+            "urn:nasa:pds:context:target:planet.mars"
+        ]
+        assert self.registry.requests == []
+
+    def test_preload(self):
+        self.resolver.preload()
+
+        assert self.resolver.resolve("Moon", "target") == ["urn:nasa:pds:context:target:satellite.earth.moon"]
+        assert self.resolver.resolve("vulcan", "target") == []
+        assert len(_context_requests(self.registry)) == 1
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "contexts.json")
+            self.resolver.preload().save(path)
+
+            resolver = ContextResolver(pep.PDSRegistryClient(), path=path)
+
+            assert resolver.resolve("mars reconnaissance orbiter", "investigation") == [
+                "urn:nasa:pds:context:investigation:mission.mars_reconnaissance_orbiter"
+            ]
+            assert resolver.resolve("vulcan", "target") == []
+            assert len(self.registry.requests) == 1
+
+    def test_save_requires_path(self):
+        with self.assertRaises(ValueError):
+            self.resolver.save()
+
+
+class QueryBuilderContextTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = _registry()
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+        ContextResolver.shared(self.client).clear()
+        self.addCleanup(ContextResolver.shared(self.client).clear)
+
+    def test_has_target_shared_resolver(self):
+        for _ in range(3):
+            ids = [p.id for p in pep.Products(self.client).has_target("Mercury")]
+            assert len(ids) == 10
+
+        assert len(_context_requests(self.registry)) == 1
+
+    def test_shared_resolver_uses_the_client_of_the_query(self):
+        assert len(list(pep.Products(self.client).has_target("Mercury"))) == 10
+
+        metrics = pep.MetricsAggregator()
+        cache = pep.PageCache(":memory:")
+        self.addCleanup(cache.close)
+        client = pep.PDSRegistryClient(cache=cache, instrument=metrics)
+
+        assert len(list(pep.Products(client).has_target(["Mercury", "Moon"]))) == 20
+
+        # Only the keyword missing from the shared index is looked up, with the second client
+        assert len(_context_requests(self.registry)) == 2
+        assert len(metrics.events()) == 2
+        assert cache.stats().entries == 2
+
+    def test_has_target_list(self):
+        products = pep.Products(self.client).has_target(["mercury", "moon", "urn:nasa:pds:context:target:planet.mars"])
+
+        assert len(list(products)) == 30
+        assert len(_context_requests(self.registry)) == 1
+
+    def test_unknown_keyword_selects_nothing(self):
+        with self.assertLogs("pds.peppi.query_builder", level="WARNING"):
+            products = pep.Products(self.client).has_target("vulcan")
+
+        assert products._q_string == 'ref_lid_target eq "vulcan"'
+        assert list(products) == []
+        assert len(list(pep.Products(self.client).has_target(["Mercury", "vulcan"]))) == 10
+
+    def test_has_instrument_keyword(self):
+        products = pep.Products(self.client).has_instrument("HiRISE")
+
+        assert products._q_string == 'ref_lid_instrument eq "urn:nasa:pds:context:instrument:mro.hirise"'
+
+    def test_has_investigation_lid(self):
+        products = pep.Products(self.client).has_investigation("urn:nasa:pds:context:investigation:mission.x")
+
+        assert products._q_string == 'ref_lid_investigation eq "urn:nasa:pds:context:investigation:mission.x"'
+        assert self.registry.requests == []
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncContextTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = _registry()
+        self.runner, base_url = await serve_async(self.registry)
+        self.client = pep.AsyncPDSRegistryClient(base_url)
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_async_has_target_list(self):
+        for _ in range(2):
+            products = pep.AsyncProducts(self.client).has_target(["Mercury", "Mars"])
+            ids = [p.id async for p in products]
+            assert len(ids) == 20
+
+        assert len(_context_requests(self.registry)) == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
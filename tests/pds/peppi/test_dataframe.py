@@ -0,0 +1,239 @@
+import unittest
+
+import pandas as pd
+import pds.peppi as pep
+from pds.peppi.dataframe import DataFrameBuilder
+from pds.peppi.dataframe import FIELD_TYPES
+from pds.peppi.predicates import prop
+
+from .fake_registry import compile_query
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+
+
+class DataFrameBuilderTestCase(unittest.TestCase):
+    def test_single_valued_columns_are_unwrapped(self):
+        builder = DataFrameBuilder()
+        builder.append("a::1.0", {"title": ["A"], "targets": ["x", "y"]})
+        builder.append("b::1.0", {"title": ["B"], "targets": ["z"]})
+
+        df = builder.build()
+
+        assert list(df.index) == ["a::1.0", "b::1.0"]
+        assert df.loc["a::1.0", "title"] == "A"
+        assert df.loc["a::1.0", "targets"] == ["x", "y"]
+        assert df.loc["b::1.0", "targets"] == ["z"]
+
+    def test_missing_properties(self):
+        builder = DataFrameBuilder()
+        builder.append("a::1.0", {"title": ["A"]})
+        builder.append("b::1.0", {"description": ["desc"]})
+        builder.append("c::1.0", {"title": []})
+
+        df = builder.build()
+
+        assert list(df.columns) == ["title", "description"]
+        assert df["title"].isna().tolist() == [False, True, True]
+        assert df["description"].isna().tolist() == [True, False, True]
+
+    def test_explode(self):
+        builder = DataFrameBuilder(multi_valued="explode")
+        builder.append("a::1.0", {"title": ["A"], "targets": ["x", "y"]})
+        builder.append("b::1.0", {"title": ["B"], "targets": ["z"]})
+
+        df = builder.build()
+
+        assert list(df.index) == ["a::1.0", "a::1.0", "b::1.0"]
+        assert df["targets"].tolist() == ["x", "y", "z"]
+        assert df["title"].tolist() == ["A", "A", "B"]
+
+    def test_explode_several_columns(self):
+        builder = DataFrameBuilder(multi_valued="explode")
+        builder.append("a::1.0", {"lat": ["1", "2"], "lon": ["10", "20"]})
+        builder.append("b::1.0", {"lat": ["3", "4", "5"], "lon": ["30"]})
+        builder.append("c::1.0", {"lat": ["6"]})
+
+        df = builder.build()
+
+        # Values are paired by position rather than combined
+        assert list(df.index) == ["a::1.0"] * 2 + ["b::1.0"] * 3 + ["c::1.0"]
+        assert df["lat"].tolist() == ["1", "2", "3", "4", "5", "6"]
+        assert df["lon"].tolist() == ["10", "20", "30", None, None, None]
+
+    def test_empty(self):
+        assert DataFrameBuilder().build() is None
+
+    def test_invalid_multi_valued(self):
+        with self.assertRaises(ValueError):
+            DataFrameBuilder(multi_valued="flatten")
+
+    def test_as_dataframe(self):
+        registry = FakeRegistry(products=[make_product(i, ref_lid_target=["t1", "t2"]) for i in range(150)])
+
+        with registry.patch():
+            df = pep.Products(pep.PDSRegistryClient()).as_dataframe(max_rows=120, multi_valued="explode")
+
+        assert len(df) == 240
+        assert df.index.nunique() == 120
+
+    def test_clear_rows_keeps_columns(self):
+        builder = DataFrameBuilder()
+        builder.append("a::1.0", {"title": ["A"], "targets": ["x", "y"]})
+        builder.build()
+        builder.clear_rows()
+        builder.append("b::1.0", {"description": ["desc"], "targets": ["z"]})
+
+        df = builder.build()
+
+        assert list(df.columns) == ["title", "targets", "description"]
+        assert df.loc["b::1.0", "targets"] == ["z"]
+        assert df["title"].isna().all()
+
+    def test_fixed_columns(self):
+        builder = DataFrameBuilder(columns=["lid", "title"])
+        builder.append("a::1.0", {"title": ["A"], "extra": ["e"]})
+
+        assert list(builder.build().columns) == ["lid", "title"]
+
+
+class TypedDataFrameTestCase(unittest.TestCase):
+    @staticmethod
+    def _properties(i):
+        return {
+            "pds:Time_Coordinates.pds:start_date_time": [f"2020-01-01T00:00:{i % 60:02d}.5Z"],
+            "orex:Spatial.orex:latitude": [str(i / 4)],
+            "pds:File.pds:file_size": [str(1000 + i)],
+            "product_class": ["Product_Observational"],
+            "pds:Identification_Area.pds:title": [f"title {i % 3}"],
+            "lid": [f"urn:p{i}"],
+            "ref_lid_instrument": ["a", "b"] if i == 0 else ["a"],
+        }
+
+    def _builder(self, n=40, types=FIELD_TYPES, **kwargs):
+        builder = DataFrameBuilder(types=types, **kwargs)
+
+        for i in range(n):
+            builder.append(f"p{i}::1.0", self._properties(i))
+
+        return builder
+
+    def test_types(self):
+        df = self._builder().build()
+
+        assert str(df["pds:Time_Coordinates.pds:start_date_time"].dtype) == "datetime64[ns, UTC]"
+        assert df["pds:Time_Coordinates.pds:start_date_time"].iloc[1] == pd.Timestamp("2020-01-01T00:00:01.5Z")
+        assert df["orex:Spatial.orex:latitude"].dtype == "float64"
+        assert df["pds:File.pds:file_size"].dtype == "Int64"
+        assert df["product_class"].dtype == "category"
+        assert df["pds:Identification_Area.pds:title"].dtype == "category"
+        assert df["lid"].dtype == object
+        # Multi-valued columns keep their lists
+        assert df["ref_lid_instrument"].dtype == object
+
+    def test_explode_types(self):
+        df = self._builder(multi_valued="explode").build()
+
+        assert df["ref_lid_instrument"].dtype == "category"
+        assert len(df) == 41
+
+    def test_invalid_values_kept(self):
+        builder = DataFrameBuilder(types={"size": "int"})
+        builder.append("a::1.0", {"size": ["12"]})
+        builder.append("b::1.0", {"size": ["unknown"]})
+
+        with self.assertLogs("pds.peppi.dataframe", level="WARNING"):
+            df = builder.build()
+
+        assert df["size"].tolist() == ["12", "unknown"]
+
+    def test_type_kept_in_later_dataframes(self):
+        builder = DataFrameBuilder(types={"size": "int", "start": "datetime"})
+        builder.append("a::1.0", {"size": ["12"], "start": ["2020-01-01T00:00:00Z"]})
+        first = builder.build()
+        builder.clear_rows()
+        builder.append("b::1.0", {"size": ["unknown"], "start": ["n/a"]})
+        builder.append("c::1.0", {"size": ["2.5"], "start": ["2021-01-01T00:00:00Z"]})
+        builder.append("d::1.0", {"size": ["3"], "start": [None]})
+
+        with self.assertLogs("pds.peppi.dataframe", level="WARNING"):
+            df = builder.build()
+
+        assert (df.dtypes == first.dtypes).all()
+        assert df["size"].tolist() == [pd.NA, pd.NA, 3]
+        assert df["start"].isna().tolist() == [True, False, True]
+
+    def test_smaller(self):
+        def size(builder):
+            df = builder.build().drop(columns=["lid", "ref_lid_instrument"])
+            return df.memory_usage(index=False, deep=True).sum()
+
+        assert size(self._builder(n=2000)) * 3 < size(self._builder(n=2000, types=None))
+
+    def test_as_dataframe_typed(self):
+        registry = FakeRegistry(n_products=30)
+
+        with registry.patch():
+            df = pep.Products(pep.PDSRegistryClient()).as_dataframe(typed={"vid": "float"})
+
+        assert df["vid"].dtype == "float64"
+        assert df["product_class"].dtype == "category"
+        assert str(df["ops:Harvest_Info.ops:harvest_date_time"].dtype) == "datetime64[ns, UTC]"
+
+    def test_iter_dataframes_same_types(self):
+        registry = FakeRegistry(n_products=300)
+
+        with registry.patch():
+            chunks = list(pep.Products(pep.PDSRegistryClient()).iter_dataframes(chunk_size=100, typed=True))
+
+        assert all((df.dtypes == chunks[0].dtypes).all() for df in chunks)
+
+
+class IterDataFramesTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        products = [make_product(i) for i in range(250)]
+        # Properties only found in later chunks
+        products[120]["properties"]["title"] = ["late"]
+        products[130]["properties"]["ref_lid_target"] = ["t1", "t2"]
+        self.registry = FakeRegistry(products=products)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_chunks(self):
+        chunks = list(pep.Products(pep.PDSRegistryClient()).iter_dataframes(chunk_size=60))
+
+        assert [len(df) for df in chunks] == [60, 60, 60, 60, 10]
+        assert list(pd.concat(chunks).index) == [p["id"] for p in self.registry.products]
+        assert len(self.registry.requests) == 3
+        assert "title" not in chunks[1].columns
+        assert list(chunks[3].columns) == list(chunks[2].columns)[: len(chunks[3].columns)]
+        assert chunks[3]["ref_lid_target"].map(type).eq(list).all()
+
+    def test_fields_columns(self):
+        fields = ["lid", "title"]
+        chunks = list(pep.Products(pep.PDSRegistryClient()).fields(fields).iter_dataframes(chunk_size=100))
+
+        assert all(list(df.columns) == fields + ["ops:Harvest_Info.ops:harvest_date_time"] for df in chunks)
+
+    def test_explode_with_local_checks(self):
+        products = [make_product(i, tag=["a", "b"] if i % 2 else ["c", "d"]) for i in range(50)]
+        self.registry.products = products
+        self.registry.matcher = lambda q, p: compile_query(q)(p["properties"])
+
+        query = pep.Products(pep.PDSRegistryClient()).fields(["lid"]).where(prop("tag").matches("a"))
+        chunks = list(query.iter_dataframes(chunk_size=10, multi_valued="explode"))
+
+        # The property of the local check is requested, but is not a column
+        assert "tag" in self.registry.requests[0]["fields"]
+        assert all("tag" not in df.columns for df in chunks)
+        assert list(pd.concat(chunks).index) == [p["id"] for p in products[1::2]]
+
+    def test_abandoned(self):
+        products = pep.Products(pep.PDSRegistryClient())
+        next(iter(products.iter_dataframes(chunk_size=10)))
+
+        assert len(self.registry.requests) == 1
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import gzip
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+
+import pds.peppi as pep
+from pds.api_client import PdsProduct
+from pds.peppi.export import export
+from pds.peppi.export import NdjsonWriter
+from pds.peppi.export import ParquetWriter
+
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+
+
+def _read_ndjson(path, opener=open):
+    with opener(path, "rt", encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+class NdjsonExportTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.products = pep.Products(pep.PDSRegistryClient())
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_single_file(self):
+        path = os.path.join(self.directory.name, "results.ndjson")
+
+        paths = self.products.to_ndjson(path, row_group_size=40)
+
+        assert paths == [path]
+        rows = _read_ndjson(path)
+        assert len(rows) == 250
+        assert rows[0]["id"] == "urn:nasa:pds:fake:data:product_000000::1.0"
+        assert rows[0]["properties"]["vid"] == ["1.0"]
+
+    def test_rollover_by_rows(self):
+        path = os.path.join(self.directory.name, "results.ndjson")
+
+        paths = self.products.to_ndjson(path, row_group_size=40, max_rows_per_file=100)
+
+        assert [os.path.basename(p) for p in paths] == [f"results-{i:05d}.ndjson" for i in range(3)]
+        assert [len(_read_ndjson(p)) for p in paths] == [100, 100, 50]
+
+    def test_rollover_by_bytes(self):
+        path = os.path.join(self.directory.name, "results.ndjson")
+
+        paths = self.products.to_ndjson(path, row_group_size=10, max_bytes_per_file=20000)
+
+        assert len(paths) > 1
+        assert sum(len(_read_ndjson(p)) for p in paths) == 250
+        # A file may only exceed its limit by the group which filled it
+        assert all(os.path.getsize(p) < 20000 + 10 * 1000 for p in paths)
+
+    def test_gzip(self):
+        path = os.path.join(self.directory.name, "results.ndjson")
+
+        paths = self.products.to_ndjson(path, max_rows_per_file=200, compression="gzip")
+
+        assert [os.path.basename(p) for p in paths] == ["results-00000.ndjson.gz", "results-00001.ndjson.gz"]
+        assert [len(_read_ndjson(p, gzip.open)) for p in paths] == [200, 50]
+
+    def test_no_product(self):
+        path = os.path.join(self.directory.name, "results.ndjson")
+
+        assert export(iter([]), NdjsonWriter(path)) == []
+        assert not os.path.exists(path)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            NdjsonWriter("results.ndjson", compression="zip")
+
+        with self.assertRaises(ValueError):
+            NdjsonWriter("results.ndjson", row_group_size=0)
+
+
+@unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+class ParquetExportTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def test_row_groups_and_rollover(self):
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.directory.name, "results.parquet")
+
+        with FakeRegistry(n_products=250).patch():
+            paths = pep.Products(pep.PDSRegistryClient()).to_parquet(path, row_group_size=40, max_rows_per_file=100)
+
+        assert [os.path.basename(p) for p in paths] == [f"results-{i:05d}.parquet" for i in range(3)]
+        assert [pq.ParquetFile(p).metadata.num_rows for p in paths] == [100, 100, 50]
+        assert [pq.ParquetFile(p).metadata.num_row_groups for p in paths] == [3, 3, 2]
+
+        table = pq.read_table(paths[0])
+        assert table.column("id")[0].as_py() == "urn:nasa:pds:fake:data:product_000000::1.0"
+        assert table.column("vid")[0].as_py() == ["1.0"]
+
+    def test_new_properties_start_new_file(self):
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.directory.name, "results.parquet")
+        products = [PdsProduct.from_dict(make_product(i)) for i in range(20)]
+        products += [PdsProduct.from_dict(make_product(i, title=f"Product {i}")) for i in range(20, 30)]
+
+        paths = export(products, ParquetWriter(path, row_group_size=10))
+
+        assert [os.path.basename(p) for p in paths] == ["results-00000.parquet", "results-00001.parquet"]
+        assert "title" not in pq.read_schema(paths[0]).names
+        table = pq.read_table(paths[1])
+        assert table.num_rows == 10
+        assert table.column("title")[0].as_py() == ["Product 20"]
+
+    def test_missing_properties_are_null(self):
+        import pyarrow.parquet as pq
+
+        path = os.path.join(self.directory.name, "results.parquet")
+        products = [PdsProduct.from_dict(make_product(0, title="A")), PdsProduct.from_dict(make_product(1))]
+
+        assert export(products, ParquetWriter(path)) == [path]
+        assert pq.read_table(path).column("title").to_pylist() == [["A"], None]
+
+
+if __name__ == "__main__":
+    unittest.main()
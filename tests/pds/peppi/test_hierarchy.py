@@ -0,0 +1,132 @@
+import threading
+import time
+import unittest
+from collections import Counter
+
+import pds.peppi as pep
+
+from .fake_registry import compile_query
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+
+_INVESTIGATION = "urn:nasa:pds:context:investigation:mission.x"
+
+
+def _archive():
+    """Returns an investigation of 2 bundles, each of 3 collections of 30 products."""
+    products = []
+
+    def add(lid, **properties):
+        product = make_product(len(products), lid=lid, lidvid=f"{lid}::1.0", **properties)
+        product["id"] = f"{lid}::1.0"
+        products.append(product)
+
+    add(_INVESTIGATION, product_class="Product_Context")
+
+    for b in range(2):
+        bundle = f"urn:nasa:pds:x_{b}"
+        add(bundle, product_class="Product_Bundle", ref_lid_investigation=_INVESTIGATION)
+
+        for c in range(3):
+            collection = f"{bundle}:data_{c}"
+            add(
+                collection,
+                product_class="Product_Collection",
+                **{"ops:Provenance.ops:parent_bundle_identifier": f"{bundle}::1.0"},
+            )
+
+            for p in range(30):
+                add(
+                    f"{collection}:product_{p:02d}",
+                    title=f"product {p}",
+                    **{"ops:Provenance.ops:parent_collection_identifier": f"{collection}::1.0"},
+                )
+
+    return products
+
+
+class ConcurrencyRecordingRegistry(FakeRegistry):
+    """Fake registry recording the highest number of page requests served concurrently."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.active = 0
+        self.max_active = 0
+
+    def product_list(self, **kwargs):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+        try:
+            time.sleep(0.01)
+            return super().product_list(**kwargs)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+class HierarchyWalkerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = ConcurrencyRecordingRegistry(
+            products=_archive(), matcher=lambda q, p: compile_query(q)(p["properties"])
+        )
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.walker = pep.HierarchyWalker(pep.PDSRegistryClient(), max_workers=3)
+
+    def test_walk_investigation(self):
+        records = list(self.walker.walk(_INVESTIGATION))
+
+        assert Counter(r.level for r in records) == {"bundle": 2, "collection": 6, "product": 180}
+        assert all(r.depth == pep.hierarchy.LEVELS.index(r.level) for r in records)
+        assert len({r.child.id for r in records}) == len(records)
+
+        for r in records:
+            if r.level == "product":
+                assert r.child.properties["ops:Provenance.ops:parent_collection_identifier"] == [r.parent]
+
+        # Breadth first: all the bundles, then all the collections are found before the products
+        levels = [r.level for r in records]
+        assert levels[:8] == ["bundle"] * 2 + ["collection"] * 6
+
+        assert 1 < self.registry.max_active <= 3
+
+    def test_fields_and_depth(self):
+        records = list(self.walker.walk("urn:nasa:pds:x_1::1.0", fields={"product": ["lid"]}, max_depth=1))
+
+        assert [r.child.id for r in records] == [f"urn:nasa:pds:x_1:data_{c}::1.0" for c in range(3)]
+        assert {r.parent for r in records} == {"urn:nasa:pds:x_1::1.0"}
+
+        records = list(self.walker.walk("urn:nasa:pds:x_1", fields={"product": ["lid"]}))
+        products = [r for r in records if r.level == "product"]
+
+        assert len(products) == 90
+        assert all("title" not in r.child.properties for r in products)
+        assert all("lid" in r.child.properties for r in products)
+        assert self.registry.requests[-1]["fields"] == ["lid", "ops:Harvest_Info.ops:harvest_date_time"]
+
+    def test_early_stop(self):
+        records = self.walker.walk(_INVESTIGATION)
+
+        assert next(records).level == "bundle"
+        records.close()
+
+        # The workers stop without listing the remaining products
+        time.sleep(0.3)
+        assert not [t for t in threading.enumerate() if t.name.startswith("peppi-hierarchy")]
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            list(self.walker.walk("urn:nasa:pds:x_0:data_0:product_00::1.0"))
+
+        with self.assertRaises(ValueError):
+            list(self.walker.walk("urn:nasa:pds:missing::1.0"))
+
+        with self.assertRaises(ValueError):
+            list(self.walker.walk(_INVESTIGATION, fields={"products": ["lid"]}))
+
+
+if __name__ == "__main__":
+    unittest.main()
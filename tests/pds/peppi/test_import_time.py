@@ -0,0 +1,49 @@
+import subprocess
+import sys
+import unittest
+
+IMPORT_TIME_BUDGET = 0.5
+"""Maximum cumulative time of `import pds.peppi`, in seconds, generous enough for slow CI runners"""
+
+HEAVY_MODULES = ("pandas", "numpy", "pds.api_client", "urllib3", "asyncio", "aiohttp")
+"""Modules only imported once a query is executed or a DataFrame is built"""
+
+
+def _import_times(code: str) -> dict:
+    """Runs code in a fresh interpreter, returns the cumulative import time of each module, in seconds."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True, check=True
+    )
+    times = {}
+
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        _, cumulative, module = line[len("import time:") :].split("|")
+        times[module.strip()] = int(cumulative) / 1e6
+
+    return times
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    def _assert_not_imported(self, times: dict):
+        heavy = [m for m in times if m.split(".")[0] in HEAVY_MODULES or m.startswith(HEAVY_MODULES)]
+        assert heavy == [], f"Imported eagerly: {', '.join(heavy)}"
+
+    def test_import_budget(self):
+        times = _import_times("import pds.peppi")
+
+        assert times["pds.peppi"] < IMPORT_TIME_BUDGET, f"import pds.peppi took {times['pds.peppi']:.3f} s"
+        self._assert_not_imported(times)
+
+    def test_query_building(self):
+        times = _import_times(
+            "import pds.peppi as pep; pep.Products(pep.PDSRegistryClient()).observationals().fields(['lid'])"
+        )
+
+        self._assert_not_imported(times)
+
+
+if __name__ == "__main__":
+    unittest.main()
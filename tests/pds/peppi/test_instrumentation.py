@@ -0,0 +1,168 @@
+import importlib.util
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+import pds.peppi as pep
+from pds.peppi.instrumentation import Instrument
+from pds.peppi.instrumentation import MetricsAggregator
+from pds.peppi.instrumentation import PageEvent
+from pds.peppi.predicates import prop
+from pds.peppi.retry import RetryPolicy
+
+from .fake_registry import FakeRegistry
+from .fake_registry import harvest_range_matcher
+from .fake_registry import serve_async
+
+
+def _event(query_hash="q", page=1, request_time=0.1, consumer_gap=None, size=100):
+    return PageEvent(query_hash, page, request_time, 0.01, consumer_gap, size, 10, 5, 0, False)
+
+
+class MetricsAggregatorTestCase(unittest.TestCase):
+    def test_percentiles(self):
+        metrics = MetricsAggregator()
+        for i in range(1, 101):
+            metrics.on_page(_event(request_time=float(i)))
+
+        assert metrics.percentiles("request_time") == {50: 50.5, 90: 90.1, 99: 99.01}
+        assert metrics.percentiles("request_time", (0, 100)) == {0: 1.0, 100: 100.0}
+        assert metrics.percentiles("consumer_gap") == {50: None, 90: None, 99: None}
+
+        with self.assertRaises(ValueError):
+            metrics.percentiles("query_hash")
+
+    def test_summary_by_query(self):
+        metrics = MetricsAggregator()
+        metrics.on_page(_event("a", page=1))
+        metrics.on_page(_event("a", page=2, consumer_gap=0.5))
+        metrics.on_page(_event("b", size=7))
+
+        summary = metrics.summary()
+
+        assert summary["a"].pages == 2
+        assert summary["a"].size == 200
+        assert summary["a"].consumer_time == 0.5
+        assert summary["b"].products == 5
+        assert metrics.percentiles("size", (50,), query_hash="b") == {50: 7}
+
+    def test_max_events(self):
+        metrics = MetricsAggregator(max_events=3)
+        for i in range(5):
+            metrics.on_page(_event(page=i))
+
+        assert [e.page for e in metrics.events()] == [2, 3, 4]
+
+        metrics.clear()
+        assert metrics.events() == []
+
+
+class InstrumentedPaginationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.metrics = MetricsAggregator()
+        self.client = pep.PDSRegistryClient(instrument=self.metrics)
+
+    def test_page_events(self):
+        products = pep.Products(self.client).observationals()
+        query_hash = products.query_hash()
+
+        for i, _ in enumerate(products):
+            if i == 150:
+                time.sleep(0.05)
+
+        events = self.metrics.events()
+        assert [e.page for e in events] == [1, 2, 3]
+        assert [e.products for e in events] == [100, 100, 50]
+        assert {e.query_hash for e in events} == {query_hash}
+        assert all(e.hits == 250 and e.size > 0 and not e.cached for e in events)
+        assert events[0].consumer_gap is None
+        assert events[2].consumer_gap >= 0.05 > events[1].consumer_gap
+        assert self.metrics.summary()[query_hash].products == 250
+
+    def test_sharded_and_filtered_queries(self):
+        self.registry.matcher = harvest_range_matcher
+        products = pep.Products(self.client).observationals().parallel(shards=4)
+        query_hash = products.query_hash()
+
+        assert len(list(products)) == 250
+        # The shards send distinct query strings, their pages are all reported as the ones of the query
+        assert len({r["q"] for r in self.registry.requests}) > 1
+        assert list(self.metrics.summary()) == [query_hash]
+
+        self.metrics.clear()
+        products = pep.Products(self.client).where(prop("lid").matches(r".*_00000[0-9]$"))
+        query_hash = products.query_hash()
+
+        assert len(list(products)) == 10
+        assert {e.query_hash for e in self.metrics.events()} == {query_hash}
+
+    def test_count_is_page_zero(self):
+        pep.Products(self.client).count()
+
+        assert [(e.page, e.products, e.hits) for e in self.metrics.events()] == [(0, 0, 250)]
+
+    def test_retries(self):
+        self.registry.failures = {1: (503, None)}
+        client = pep.PDSRegistryClient(retry_policy=RetryPolicy(backoff_factor=0.0), instrument=self.metrics)
+
+        assert len(list(pep.Products(client))) == 250
+        assert [e.retries for e in self.metrics.events()] == [0, 1, 0]
+
+    def test_cached_pages(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = pep.PageCache(os.path.join(tmp, "pages.sqlite"))
+            client = pep.PDSRegistryClient(cache=cache, instrument=self.metrics)
+
+            for _ in range(2):
+                list(pep.Products(client).raw())
+
+            cache.close()
+
+        assert [e.cached for e in self.metrics.events()] == [False] * 3 + [True] * 3
+
+    def test_prefetch(self):
+        assert len(list(pep.Products(self.client, prefetch=2))) == 250
+        assert [e.page for e in self.metrics.events()] == [1, 2, 3]
+
+    def test_custom_instrument(self):
+        instrument = mock.Mock(spec=Instrument)
+        client = pep.PDSRegistryClient(instrument=instrument)
+
+        list(pep.Products(client).raw())
+
+        assert instrument.on_page.call_count == 3
+
+    def test_disabled(self):
+        with mock.patch("pds.peppi.result_set.PageEvent") as event:
+            assert len(list(pep.Products(pep.PDSRegistryClient()))) == 250
+
+        event.assert_not_called()
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncInstrumentedPaginationTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250)
+        self.runner, base_url = await serve_async(self.registry)
+        self.metrics = MetricsAggregator()
+        self.client = pep.AsyncPDSRegistryClient(base_url, instrument=self.metrics)
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_page_events(self):
+        products = pep.AsyncProducts(self.client)
+
+        assert len([p async for p in products]) == 250
+        assert [(e.page, e.products) for e in self.metrics.events()] == [(1, 100), (2, 100), (3, 50)]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import importlib.util
+import unittest
+
+import pds.peppi as pep
+from pds.peppi.predicates import prop
+from pds.peppi.query_builder import SUPERSEDED_BY
+
+from .fake_registry import compile_query
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+from .fake_registry import serve_async
+
+_VERSIONS = ["1.0", "1.9", "1.10", "2.0"]
+
+
+def _products():
+    """Returns products of 100 LIDs, the i-th one having i % 4 + 1 versions, newest first for odd LIDs."""
+    versions = []
+
+    for i in range(100):
+        lid = f"urn:nasa:pds:fake:data:lid_{i:03d}"
+        n_versions = i % 4 + 1
+        order = range(n_versions - 1, -1, -1) if i % 2 else range(n_versions)
+        versions.extend((lid, v, v == n_versions - 1) for v in order)
+
+    products = []
+
+    for i, (lid, v, latest) in enumerate(versions):
+        vid = _VERSIONS[v]
+        product = make_product(i, lid=lid, vid=vid, lidvid=f"{lid}::{vid}", level="raw" if v % 2 else "calibrated")
+        product["id"] = f"{lid}::{vid}"
+
+        if not latest:
+            product["properties"][SUPERSEDED_BY] = [f"{lid}::{_VERSIONS[v + 1]}"]
+
+        products.append(product)
+
+    return products
+
+
+def _latest(products):
+    return sorted(p["id"] for p in products if SUPERSEDED_BY not in p["properties"])
+
+
+class LatestOnlyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(products=_products(), matcher=lambda q, p: compile_query(q)(p["properties"]))
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+        self.expected = _latest(self.registry.products)
+
+    def test_server_side(self):
+        products = pep.Products(self.client).latest_only()
+
+        assert sorted(p.id for p in products) == self.expected
+        assert f"not ({SUPERSEDED_BY} exists)" in self.registry.requests[0]["q"]
+
+    def test_local(self):
+        products = pep.Products(self.client).latest_only(server_side=False)
+
+        assert sorted(p.id for p in products) == self.expected
+        # LIDVIDs first, then the products
+        assert self.registry.requests[0]["fields"] == ["lid", "ops:Harvest_Info.ops:harvest_date_time"]
+        assert self.registry.requests[-1]["fields"] is None
+
+    def test_local_latest_among_query(self):
+        products = pep.Products(self.client).filter('level eq "calibrated"').latest_only(server_side=False)
+        ids = [p.id for p in products]
+
+        # Versions 1.0 and 1.10 are calibrated, 1.10 being the latest
+        assert len(ids) == 100
+        assert sum(i.endswith("::1.10") for i in ids) == 50
+
+    def test_local_with_limit_and_where(self):
+        def products():
+            return pep.Products(self.client).latest_only(server_side=False).where(prop("lid").matches("[02468]$"))
+
+        assert len(list(products().limit(10))) == 10
+        assert products().count() == 50
+        assert all(int(p.properties["lid"][0][-1]) % 2 == 0 for p in products())
+        assert pep.Products(self.client).latest_only(server_side=False).count() == 100
+        assert pep.Products(self.client).latest_only(server_side=False).limit(7).count() == 7
+        assert pep.Products(self.client).latest_only(server_side=False).exists()
+
+    def test_dataframe(self):
+        df = pep.Products(self.client).latest_only(server_side=False).as_dataframe()
+
+        assert sorted(df.index) == self.expected
+
+    def test_query_hash(self):
+        assert (
+            pep.Products(self.client).latest_only(server_side=False).query_hash()
+            != pep.Products(self.client).query_hash()
+        )
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncLatestOnlyTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = FakeRegistry(products=_products())
+        self.runner, base_url = await serve_async(self.registry)
+        self.client = pep.AsyncPDSRegistryClient(base_url)
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_local(self):
+        products = pep.AsyncProducts(self.client).latest_only(server_side=False)
+
+        assert sorted([p.id async for p in products]) == _latest(self.registry.products)
+        assert await pep.AsyncProducts(self.client).latest_only(server_side=False).count() == 100
+
+
+if __name__ == "__main__":
+    unittest.main()
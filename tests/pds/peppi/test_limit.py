@@ -0,0 +1,144 @@
+import importlib.util
+import unittest
+
+import pds.peppi as pep
+
+from .fake_registry import FakeRegistry
+from .fake_registry import harvest_range_matcher
+from .fake_registry import serve_async
+
+
+def _observational_matcher(q, product):
+    if q and "Product_Observational" in q:
+        return product["properties"]["product_class"] == ["Product_Observational"]
+    return True
+
+
+class CountTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250, matcher=_observational_matcher)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+
+    def test_count(self):
+        assert pep.Products(self.client).observationals().count() == 250
+        assert [r["limit"] for r in self.registry.requests] == [0]
+        assert "Product_Observational" in self.registry.requests[0]["q"]
+
+    def test_count_within_limit(self):
+        assert pep.Products(self.client).limit(10).count() == 10
+        assert pep.Products(self.client).limit(1000).count() == 250
+
+    def test_exists(self):
+        assert pep.Products(self.client).exists()
+
+        self.registry.products = []
+        assert not pep.Products(self.client).exists()
+
+    def test_count_keeps_query(self):
+        products = pep.Products(self.client).observationals()
+        products.count()
+
+        assert len(list(products)) == 250
+        assert "Product_Observational" in self.registry.requests[-1]["q"]
+
+
+class LimitTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250, matcher=harvest_range_matcher)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+        self.expected = [p["id"] for p in self.registry.products]
+
+    def test_limit_within_page(self):
+        ids = [p.id for p in pep.Products(self.client).limit(10)]
+
+        assert ids == self.expected[:10]
+        assert [r["limit"] for r in self.registry.requests] == [10]
+
+    def test_limit_across_pages(self):
+        ids = [p.id for p in pep.Products(self.client).head(150)]
+
+        assert ids == self.expected[:150]
+        assert [r["limit"] for r in self.registry.requests] == [100, 50]
+
+    def test_limit_beyond_hits(self):
+        ids = [p.id for p in pep.Products(self.client).limit(1000)]
+
+        assert ids == self.expected
+        assert [r["limit"] for r in self.registry.requests] == [100, 100, 100]
+
+    def test_limit_resumes_after_break(self):
+        products = pep.Products(self.client).limit(120)
+        ids = []
+
+        for p in products:
+            ids.append(p.id)
+            if len(ids) == 42:
+                break
+
+        ids.extend(p.id for p in products)
+
+        assert ids == self.expected[:120]
+
+    def test_limit_with_prefetch(self):
+        ids = [p.id for p in pep.Products(self.client, prefetch=2).limit(150)]
+
+        assert ids == self.expected[:150]
+        assert [r["limit"] for r in self.registry.requests] == [100, 50]
+
+    def test_limit_with_adaptive_page_size(self):
+        ids = [p.id for p in pep.Products(self.client).adaptive_page_size().limit(230)]
+
+        assert ids == self.expected[:230]
+        assert sum(r["limit"] for r in self.registry.requests) == 230
+
+    def test_limit_parallel(self):
+        ids = [p.id for p in pep.Products(self.client).limit(30).parallel(shards=4)]
+
+        assert ids == self.expected[:30]
+
+    def test_as_dataframe_max_rows_pushed_down(self):
+        df = pep.Products(self.client).as_dataframe(max_rows=10)
+
+        assert list(df.index) == self.expected[:10]
+        assert [r["limit"] for r in self.registry.requests] == [10]
+
+    def test_reset_clears_limit(self):
+        products = pep.Products(self.client).limit(10)
+        products.reset()
+
+        assert len(list(products)) == 250
+
+    def test_invalid_limit(self):
+        with self.assertRaises(ValueError):
+            pep.Products(self.client).limit(0)
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncCountTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = FakeRegistry(n_products=150)
+        self.runner, base_url = await serve_async(self.registry)
+        self.client = pep.AsyncPDSRegistryClient(base_url)
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_count_and_limit(self):
+        assert await pep.AsyncProducts(self.client).count() == 150
+        assert await pep.AsyncProducts(self.client).exists()
+
+        ids = [p.id async for p in pep.AsyncProducts(self.client).limit(120)]
+
+        assert len(ids) == 120
+        assert [r["limit"] for r in self.registry.requests] == [0, 0, 100, 20]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import time
+import unittest
+
+import pds.peppi as pep
+from pds.api_client.exceptions import BadRequestException
+
+from .fake_registry import compile_query
+from .mock_registry import MockRegistry
+from .mock_registry import synthetic_product
+
+
+class CompileQueryTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.properties = {"lid": ["urn:a"], "vid": ["2.0"], "targets": ["mars", "bennu"], "lat": ["-12.5"]}
+
+    def test_comparisons(self):
+        assert compile_query('lid eq "urn:a"')(self.properties)
+        assert compile_query('targets eq "bennu"')(self.properties)
+        assert compile_query("vid gt 1.5")(self.properties)
+        assert compile_query("lat ge -13 and lat le -12")(self.properties)
+        assert compile_query('lid like "urn:*"')(self.properties)
+        assert not compile_query('lid ne "urn:a"')(self.properties)
+        assert not compile_query('missing eq "x"')(self.properties)
+
+    def test_operators(self):
+        assert compile_query('(lid eq "urn:b") or (vid eq "2.0" and not targets eq "venus")')(self.properties)
+        assert not compile_query('lid eq "urn:a" and (vid eq "1.0" or vid eq "3.0")')(self.properties)
+        assert compile_query(None)(self.properties)
+
+    def test_exists(self):
+        assert compile_query("targets exists")(self.properties)
+        assert compile_query("not (missing exists) and lid exists")(self.properties)
+        assert not compile_query("missing exists")(self.properties)
+
+    def test_invalid(self):
+        for query_string in ('lid eq "urn:a" and', '(lid eq "urn:a"', 'lid is "urn:a"'):
+            with self.assertRaises(ValueError):
+                compile_query(query_string)
+
+
+class MockRegistryTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = MockRegistry(n_products=500, max_page_size=40).start()
+        self.addCleanup(self.registry.stop)
+        self.client = pep.PDSRegistryClient(self.registry.base_url)
+
+    def test_pagination(self):
+        ids = [p.id for p in pep.Products(self.client)]
+
+        assert ids == [p["id"] for p in self.registry.products]
+        assert len(self.registry.requests) == 13
+
+    def test_query_and_fields(self):
+        df = pep.Products(self.client).observationals().fields(["lid"]).as_dataframe()
+
+        assert len(df) == 450
+        assert list(df.columns) == ["lid", "ops:Harvest_Info.ops:harvest_date_time"]
+
+    def test_orex_query(self):
+        products = list(pep.OrexProducts(self.client).within_range(10.0))
+        expected = [
+            p
+            for p in self.registry.products
+            if "orex:Spatial.orex:target_range" in p["properties"]
+            and float(p["properties"]["orex:Spatial.orex:target_range"][0]) <= 10.0
+        ]
+
+        assert len(products) == len(expected) > 0
+
+    def test_invalid_query(self):
+        with self.assertRaises(BadRequestException):
+            list(pep.Products(self.client).filter("lid is nothing"))
+
+    def test_stats(self):
+        assert pep.Products(self.client).count() == 500
+        assert self.registry.stats() == {"requests": 1, "products_served": 0}
+
+
+class MockRegistryOptionsTestCase(unittest.TestCase):
+    def test_latency(self):
+        with MockRegistry(n_products=10, latency=0.05) as registry:
+            start = time.perf_counter()
+            assert len(list(pep.Products(pep.PDSRegistryClient(registry.base_url)))) == 10
+
+            assert time.perf_counter() - start >= 0.05
+
+    def test_synthetic_products_are_reproducible(self):
+        assert synthetic_product(42, n_properties=3) == synthetic_product(42, n_properties=3)
+        assert synthetic_product(42, seed=1) != synthetic_product(42, seed=2)
+
+    def test_fixture_replay(self):
+        with MockRegistry(n_products=120) as registry, tempfile.TemporaryDirectory() as tmp:
+            client = pep.PDSRegistryClient(registry.base_url)
+            path = (
+                pep.Products(client)
+                .observationals()
+                .to_ndjson(os.path.join(tmp, "fixture.ndjson"), compression="gzip")[0]
+            )
+
+            with MockRegistry.from_fixture(path) as replay:
+                client = pep.PDSRegistryClient(replay.base_url)
+                ids = [p.id for p in pep.Products(client)]
+
+        assert ids == [p["id"] for p in registry.products if p["properties"]["product_class"] != ["Product_Collection"]]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+import pds.peppi as pep
+from pds.peppi.orex import spatial_index
+from pds.peppi.orex.spatial_index import LATITUDE
+from pds.peppi.orex.spatial_index import LONGITUDE
+from pds.peppi.orex.spatial_index import OrexSpatialIndex
+from pds.peppi.orex.spatial_index import TARGET_RANGE
+
+from .fake_registry import compile_query
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+
+
+def _footprints(rng, n):
+    return [f"{rng.uniform(-90, 90):.3f}" for _ in range(n)], [f"{rng.uniform(0, 360):.3f}" for _ in range(n)]
+
+
+def _products(n_products=300, seed=0):
+    rng = random.Random(seed)
+    products = []
+
+    for i in range(n_products):
+        latitudes, longitudes = _footprints(rng, 1 + i % 3)
+        properties = {LATITUDE: latitudes, LONGITUDE: longitudes, TARGET_RANGE: f"{rng.uniform(0, 50):.2f}"}
+
+        if i % 50 == 0:
+            properties = {}
+
+        products.append(
+            make_product(i, ref_lid_investigation="urn:nasa:pds:context:investigation:mission.orex", **properties)
+        )
+
+    return products
+
+
+def _within(product, lat_min, lat_max, lon_min, lon_max):
+    properties = product["properties"]
+    footprints = zip(properties.get(LATITUDE, []), properties.get(LONGITUDE, []))
+    return any(lat_min <= float(lat) <= lat_max and lon_min <= float(lon) <= lon_max for lat, lon in footprints)
+
+
+class OrexSpatialIndexTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(products=_products(), matcher=lambda q, p: compile_query(q)(p["properties"]))
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+        self.index = pep.OrexProducts(self.client).spatial_index()
+        self.boxes = [(lat, lat + 30, lon, lon + 60) for lat in range(-90, 90, 20) for lon in range(0, 360, 45)]
+
+    def _expected(self, box):
+        return sorted(p["id"] for p in self.registry.products if _within(p, *box))
+
+    def test_build(self):
+        assert len(self.index) == 300
+        assert self.registry.requests[0]["fields"] == [
+            LATITUDE,
+            LONGITUDE,
+            TARGET_RANGE,
+            "ops:Harvest_Info.ops:harvest_date_time",
+        ]
+
+    def test_within_bbox(self):
+        for box in self.boxes[:10]:
+            assert self.index.within_bbox(*box).tolist() == self._expected(box)
+
+    def test_within_bboxes(self):
+        results = self.index.within_bboxes(self.boxes)
+
+        assert [r.tolist() for r in results] == [self._expected(box) for box in self.boxes]
+        assert self.index.count_within_bboxes(self.boxes).tolist() == [len(r) for r in results]
+        assert self.index.count_within_bboxes(np.empty((0, 4))).tolist() == []
+
+        with self.assertRaises(ValueError):
+            self.index.within_bboxes([(0, 1, 2)])
+
+    def test_batches(self):
+        with mock.patch.object(spatial_index, "_MAX_CANDIDATES", 7):
+            results = self.index.within_bboxes(self.boxes)
+
+        assert [r.tolist() for r in results] == [self._expected(box) for box in self.boxes]
+
+    def test_within_range(self):
+        expected = sorted(
+            p["id"] for p in self.registry.products if float(p["properties"].get(TARGET_RANGE, ["inf"])[0]) <= 20.0
+        )
+
+        assert self.index.within_range(20.0).tolist() == expected
+
+    def test_cache(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "orex", "spatial.npz")
+            saved = pep.OrexProducts(self.client).spatial_index(path)
+            requests = len(self.registry.requests)
+
+            loaded = pep.OrexProducts(self.client).spatial_index(path)
+            assert len(self.registry.requests) == requests
+            assert loaded.within_bboxes(self.boxes)[5].tolist() == saved.within_bboxes(self.boxes)[5].tolist()
+            assert loaded.within_range(10.0).tolist() == saved.within_range(10.0).tolist()
+
+            # The index of another query is rebuilt
+            other = pep.OrexProducts(self.client).has_instrument("urn:nasa:pds:context:instrument:ocams")
+            other.spatial_index(path)
+            assert len(self.registry.requests) > requests
+            assert OrexSpatialIndex.load(path).query_hash == other.query_hash()
+
+    def test_use_spatial_index(self):
+        box = (-10.0, 30.0, 100.0, 200.0)
+        products = pep.OrexProducts(self.client).use_spatial_index(self.index).within_bbox(*box)
+
+        assert sorted(p.id for p in products) == self._expected(box)
+        assert "lidvid eq" in self.registry.requests[-1]["q"]
+
+    def test_use_spatial_index_without_match(self):
+        requests = len(self.registry.requests)
+        products = pep.OrexProducts(self.client).use_spatial_index(self.index).within_range(-1.0)
+
+        assert list(products) == []
+        assert len(self.registry.requests) == requests
+
+
+if __name__ == "__main__":
+    unittest.main()
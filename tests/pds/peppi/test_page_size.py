@@ -0,0 +1,109 @@
+import unittest
+
+import pds.peppi as pep
+from pds.peppi.page_size import AdaptivePageSize
+from pds.peppi.result_set import ResultSet
+
+from .fake_registry import FakeRegistry
+from .fake_registry import harvest_range_matcher
+
+
+class AdaptivePageSizeTestCase(unittest.TestCase):
+    def test_grows_on_fast_responses(self):
+        sizer = AdaptivePageSize(min_size=10, max_size=500, target_time=1.0)
+
+        sizes = []
+        for _ in range(4):
+            sizer.observe(sizer.size, elapsed=0.01, size=sizer.size * 100)
+            sizes.append(sizer.size)
+
+        assert sizes == [200, 400, 500, 500]
+
+    def test_shrinks_on_slow_responses(self):
+        sizer = AdaptivePageSize(min_size=10, max_size=500, target_time=1.0)
+
+        sizer.observe(100, elapsed=4.0, size=100 * 100)
+        assert sizer.size == 50
+
+        for _ in range(10):
+            sizer.observe(sizer.size, elapsed=sizer.size * 0.04, size=sizer.size * 100)
+
+        assert sizer.size == 25
+
+    def test_payload_limit(self):
+        sizer = AdaptivePageSize(min_size=10, max_size=1000, target_time=1.0, max_bytes=60 * 1000)
+
+        for _ in range(5):
+            sizer.observe(sizer.size, elapsed=0.01, size=sizer.size * 1000)
+
+        assert sizer.size == 60
+
+    def test_small_pages_ignored(self):
+        sizer = AdaptivePageSize(min_size=10)
+
+        sizer.observe(1, elapsed=10.0, size=100)
+
+        assert sizer.size == 100
+
+    def test_invalid_bounds(self):
+        with self.assertRaises(ValueError):
+            AdaptivePageSize(min_size=100, max_size=10)
+
+        with self.assertRaises(ValueError):
+            AdaptivePageSize(target_time=0)
+
+
+class AdaptivePaginationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=1000, matcher=harvest_range_matcher)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+        self.expected = [p["id"] for p in self.registry.products]
+
+    def test_page_size_changes_during_query(self):
+        ids = [p.id for p in pep.Products(self.client).adaptive_page_size(max_size=400)]
+
+        assert ids == self.expected
+        assert [r["limit"] for r in self.registry.requests] == [100, 200, 400, 400]
+
+    def test_page_bookkeeping(self):
+        result_set = ResultSet(self.client)
+        result_set.page_sizer = AdaptivePageSize(max_size=400)
+        ids = []
+
+        while True:
+            try:
+                ids.extend(p.id for p in result_set.init_new_page())
+            except RuntimeError:
+                break
+
+        assert ids == self.expected
+        assert result_set._page_counter == result_set._expected_pages == len(self.registry.requests) == 4
+
+    def test_shrinking_pages(self):
+        products = pep.Products(self.client).adaptive_page_size(min_size=10, max_bytes=30 * 1024)
+        ids = [p.id for p in products]
+
+        assert ids == self.expected
+        limits = [r["limit"] for r in self.registry.requests]
+        assert limits[0] == 100
+        assert limits[1] < 100
+
+    def test_prefetch(self):
+        ids = [p.id for p in pep.Products(self.client, prefetch=2).adaptive_page_size(max_size=400)]
+
+        assert ids == self.expected
+        assert [r["limit"] for r in self.registry.requests] == [100, 200, 400, 400]
+
+    def test_parallel(self):
+        products = pep.Products(self.client).adaptive_page_size(max_size=400).parallel(shards=4)
+        ids = [p.id for p in products]
+
+        assert ids == self.expected
+        assert max(r["limit"] for r in self.registry.requests) > 100
+
+
+if __name__ == "__main__":
+    unittest.main()
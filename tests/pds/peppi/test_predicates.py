@@ -0,0 +1,184 @@
+import importlib.util
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+
+import pds.peppi as pep
+from pds.peppi.predicates import plan
+from pds.peppi.predicates import prop
+
+from .fake_registry import compile_query
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+from .fake_registry import serve_async
+
+_LID = "urn:nasa:pds:fake:data:product_"
+
+
+def _product(**properties):
+    return SimpleNamespace(properties={k: v if isinstance(v, list) else [v] for k, v in properties.items()})
+
+
+def _registry():
+    products = [make_product(i, level="calibrated" if i % 3 else "raw", size=str(i % 50)) for i in range(450)]
+    return FakeRegistry(products=products, matcher=lambda q, p: compile_query(q)(p["properties"]))
+
+
+class PlanTestCase(unittest.TestCase):
+    def test_prefix(self):
+        server, residual = plan(prop("lid").startswith("urn:a"))
+
+        assert server.query_string() == '(lid ge "urn:a") and (lid lt "urn:b")'
+        assert residual.compile()(_product(lid="urn:a:1"))
+        assert not residual.compile()(_product(lid="urn:b"))
+
+    def test_regex(self):
+        server, residual = plan(prop("lid").matches(r"^urn:nasa\.x_\d+$"))
+        assert server.query_string() == '(lid ge "urn:nasa.x_") and (lid lt "urn:nasa.x`")'
+        assert residual.compile()(_product(lid="urn:nasa.x_12"))
+        assert not residual.compile()(_product(lid="urn:nasa.x_a"))
+
+        assert plan(prop("lid").matches(r"_\d+$")).server is None
+        assert plan(prop("lid").matches(r"^ab?c")).server.query_string() == '(lid ge "a") and (lid lt "b")'
+        assert plan(prop("lid").matches(r"^a|^b")).server is None
+
+    def test_exact_predicates(self):
+        predicate = prop("lid").isin(["b", "a"]) & ~prop("vid").eq("1.0") & prop("t").ge(datetime(2020, 1, 1))
+
+        server, residual = plan(predicate)
+
+        assert residual is None
+        assert server.query_string() == (
+            '((lid eq "a") or (lid eq "b")) and (not (vid eq "1.0")) and (t ge "2020-01-01T00:00:00Z")'
+        )
+
+    def test_range(self):
+        predicate = prop("size").between(10, 20)
+        server, residual = plan(predicate)
+
+        # A multi-valued property may have a value above 10 and another one below 20
+        assert server.query_string() == "(size ge 10) and (size le 20)"
+        assert residual == predicate
+        assert not residual.compile()(_product(size=["5", "25"]))
+        assert residual.compile()(_product(size=["5", "12.5"]))
+        assert not residual.compile()(_product(size="n/a"))
+
+        check = prop("start").between(datetime(2020, 1, 1), datetime(2021, 1, 1)).compile()
+        assert check(_product(start="2020-06-01T12:00:00.000Z"))
+        assert not check(_product(start="2021-06-01T12:00:00.000Z"))
+
+    def test_residual_of_combinations(self):
+        lid = prop("lid")
+
+        server, residual = plan(lid.eq("a") & lid.matches("b$"))
+        assert server.query_string() == 'lid eq "a"'
+        assert residual == lid.matches("b$")
+
+        server, residual = plan(lid.eq("a") | lid.matches("b$"))
+        assert server is None
+        assert residual.compile()(_product(lid="xb"))
+
+        server, residual = plan(~lid.startswith("a"))
+        assert server is None
+        assert residual.compile()(_product(lid="b"))
+        assert not residual.compile()(_product(lid="ab"))
+
+
+class WhereTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = _registry()
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+
+    def _ids(self, condition):
+        return [p["id"] for p in self.registry.products if condition(p["properties"])]
+
+    def test_regex(self):
+        products = pep.Products(self.client).where(prop("lid").matches(rf"^{_LID}0001\d[05]$"))
+
+        expected = self._ids(lambda p: p["lid"][0][-6:-2] == "0001" and p["lid"][0][-1] in "05")
+
+        assert [p.id for p in products] == expected
+        # Only the products of the literal prefix were downloaded
+        assert self.registry.requests[0]["q"] == f'((lid ge "{_LID}0001") and (lid lt "{_LID}0002"))'
+        assert len(self.registry.requests) == 1
+
+    def test_combined_with_clauses(self):
+        products = (
+            pep.Products(self.client)
+            .filter('level eq "raw"')
+            .where(prop("size").between(10, 12), prop("lid").matches("[02468]$"))
+        )
+
+        expected = self._ids(
+            lambda p: p["level"] == ["raw"] and 10 <= int(p["size"][0]) <= 12 and int(p["lid"][0][-1]) % 2 == 0
+        )
+
+        assert [p.id for p in products] == expected
+        assert products.count() == len(expected)
+        assert self.registry.requests[-1]["fields"] == ["lid", "size", "ops:Harvest_Info.ops:harvest_date_time"]
+
+    def test_limit_applies_to_matching_products(self):
+        products = pep.Products(self.client).where(prop("lid").matches("5$")).limit(12)
+
+        assert [p.id for p in products] == self._ids(lambda p: p["lid"][0].endswith("5"))[:12]
+        assert self.registry.requests[0]["limit"] == 100
+        assert len(self.registry.requests) == 2
+
+        # The query is not paginating anymore
+        products.filter('level eq "raw"')
+
+    def test_fields(self):
+        products = pep.Products(self.client).fields(["lidvid"]).where(prop("level").startswith("cal"))
+
+        assert all(p.properties["level"] == ["calibrated"] for p in products)
+        assert self.registry.requests[0]["fields"] == ["lidvid", "level", "ops:Harvest_Info.ops:harvest_date_time"]
+        assert products._fields == ["lidvid"]
+
+    def test_exists(self):
+        assert pep.Products(self.client).where(prop("lid").matches("0449$")).exists()
+        assert not pep.Products(self.client).where(prop("lid").matches("x$")).exists()
+
+    def test_long_set_is_chunked(self):
+        lids = [f"{_LID}{i:06d}" for i in range(0, 450, 4)]
+
+        products = pep.Products(self.client).where(prop("lid").isin(lids))
+
+        assert sorted(p.id for p in products) == sorted(f"{lid}::1.0" for lid in lids)
+        assert products._residual is None
+        assert all(" or " in r["q"] for r in self.registry.requests)
+
+    def test_query_hash(self):
+        plain = pep.Products(self.client).where(prop("lid").startswith(_LID))
+        checked = pep.Products(self.client).where(prop("lid").matches(f"^{_LID}"))
+
+        assert plain._q_string == checked._q_string
+        assert plain.query_hash() != checked.query_hash()
+        assert pep.Products(self.client).where(prop("lid").eq("a")).query_hash() == (
+            pep.Products(self.client).filter('lid eq "a"').query_hash()
+        )
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncWhereTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = _registry()
+        self.runner, base_url = await serve_async(self.registry)
+        self.client = pep.AsyncPDSRegistryClient(base_url)
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_where(self):
+        products = pep.AsyncProducts(self.client).where(prop("lid").matches("[05]$")).limit(30)
+        expected = [p["id"] for p in self.registry.products if p["properties"]["lid"][0][-1] in "05"][:30]
+
+        assert [p.id async for p in products] == expected
+        assert await pep.AsyncProducts(self.client).where(prop("lid").matches("[05]$")).count() == 90
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -245,7 +245,7 @@ class ProductsTestCase(unittest.TestCase):
             self.products = self.products.has_target(title)
 
             expected_lid = test_case["expected_lid"]
-            assert str(self.products) == f'((ref_lid_target eq "{expected_lid}"))'
+            assert str(self.products) == f'ref_lid_target eq "{expected_lid}"'
 
             for p in self.products:
                 n += 1
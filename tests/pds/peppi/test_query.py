@@ -0,0 +1,89 @@
+import unittest
+from datetime import datetime
+
+import pds.peppi as pep
+from pds.peppi.query import And
+from pds.peppi.query import Clause
+from pds.peppi.query import Or
+
+from .fake_registry import FakeRegistry
+
+
+class ExpressionTestCase(unittest.TestCase):
+    def test_clause_normalization(self):
+        assert Clause('  ((lid   eq  "a"))  ').compile() == 'lid eq "a"'
+        assert Clause('title eq "two  spaces"').compile() == 'title eq "two  spaces"'
+        assert Clause("(a) or (b)").compile() == "(a) or (b)"
+
+    def test_canonical_form(self):
+        expression = And([And([Clause("b"), Clause("a")]), Clause("b"), And(), Clause("(c)")])
+
+        assert expression.query_string() == "(a) and (b) and (c)"
+
+    def test_single_operand(self):
+        assert Or([Clause("a"), Clause(" a ")]).query_string() == "a"
+        assert And().query_string() == ""
+        assert not And([And()])
+
+    def test_nested_operations(self):
+        expression = And([Or([Clause("b"), Clause("a")]), Clause("c")])
+
+        assert expression.query_string() == "((a) or (b)) and (c)"
+
+    def test_equality(self):
+        assert And([Clause("a"), Clause("b")]) != Or([Clause("a"), Clause("b")])
+        assert Clause("a  eq 1") == Clause("a eq 1")
+        assert len({Clause("a"), Clause("(a)")}) == 1
+
+
+class QueryBuilderExpressionTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = pep.PDSRegistryClient()
+
+    def test_equivalent_queries(self):
+        target = "urn:nasa:pds:context:target:planet.mercury"
+        a = pep.Products(self.client).has_target(target).observationals().before(datetime(2020, 1, 1))
+        b = pep.Products(self.client).before(datetime(2020, 1, 1)).has_target(target).observationals()
+
+        assert a._q_string == b._q_string
+        assert a.query_hash() == b.query_hash()
+        assert a.query_hash() != pep.Products(self.client).observationals().query_hash()
+
+    def test_repeated_filters(self):
+        products = pep.Products(self.client).observationals().observationals()
+
+        assert products._q_string == 'product_class eq "Product_Observational"'
+
+    def test_or_join_precedence(self):
+        products = pep.Products(self.client).get("a::1.0").get("b::1.0").observationals()
+
+        assert products._q_string == (
+            '((lidvid eq "a::1.0") or (lidvid eq "b::1.0")) and (product_class eq "Product_Observational")'
+        )
+
+    def test_target_list_order(self):
+        a = pep.Products(self.client)._has_target(["urn:b", "urn:a"])
+        b = pep.Products(self.client)._has_target(["urn:a", "urn:b", "urn:a"])
+
+        assert a._q_string == b._q_string == '(ref_lid_target eq "urn:a") or (ref_lid_target eq "urn:b")'
+
+    def test_reset(self):
+        products = pep.Products(self.client).observationals()
+        products.reset()
+
+        assert products._q_string == ""
+        assert products.query_hash() == pep.Products(self.client).query_hash()
+
+    def test_sent_query(self):
+        registry = FakeRegistry(n_products=5)
+
+        with registry.patch():
+            list(pep.Products(self.client).observationals().observationals().bundles())
+
+        assert registry.requests[0]["q"] == (
+            '((product_class eq "Product_Bundle") and (product_class eq "Product_Observational"))'
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import importlib.util
+import json
+import unittest
+from unittest import mock
+
+import pandas as pd
+import pds.peppi as pep
+from pds.api_client import ApiClient
+from pds.peppi.raw import parse_page
+from pds.peppi.raw import RawProduct
+
+from .fake_registry import FakeRegistry
+from .fake_registry import make_product
+from .fake_registry import serve_async
+
+
+class ParsePageTestCase(unittest.TestCase):
+    def test_parse_page(self):
+        body = json.dumps({"summary": {"hits": 42, "limit": 1}, "data": [make_product(0)]}).encode("utf-8")
+
+        page = parse_page(body)
+
+        assert page.summary.hits == 42
+        assert isinstance(page.data[0], RawProduct)
+        assert page.data[0].id == "urn:nasa:pds:fake:data:product_000000::1.0"
+        assert page.data[0].properties["vid"] == ["1.0"]
+        assert page.data[0].to_dict() == {"id": page.data[0].id, "properties": page.data[0].properties}
+
+    def test_empty_page(self):
+        page = parse_page(b'{"summary": {"hits": 0}, "data": []}')
+
+        assert page.data == []
+        assert page.summary.hits == 0
+
+    def test_slots(self):
+        with self.assertRaises(AttributeError):
+            RawProduct("a::1.0", {}).metadata = {}
+
+
+class RawIterationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(products=[make_product(i, targets=["a", "b"]) for i in range(250)])
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+
+    def test_raw_iteration(self):
+        models = list(pep.Products(self.client))
+        records = list(pep.Products(self.client).raw())
+
+        assert all(isinstance(p, RawProduct) for p in records)
+        assert [(p.id, p.properties) for p in records] == [(p.id, p.properties) for p in models]
+
+    def test_raw_parallel(self):
+        records = list(pep.Products(self.client).raw().parallel(shards=1))
+
+        assert len(records) == 250
+        assert all(isinstance(p, RawProduct) for p in records)
+
+    def test_as_dataframe_skips_models(self):
+        expected = pep.Products(self.client).as_dataframe()
+
+        with mock.patch.object(ApiClient, "deserialize", side_effect=AssertionError("model deserialization")):
+            df = pep.Products(self.client).as_dataframe()
+
+        pd.testing.assert_frame_equal(df, expected)
+        assert df["targets"].iloc[0] == ["a", "b"]
+
+    def test_as_dataframe_restores_mode(self):
+        products = pep.Products(self.client)
+        products.as_dataframe(max_rows=10)
+
+        assert not products._result_set.raw
+        assert not isinstance(next(iter(products)), RawProduct)
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncRawTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = FakeRegistry(n_products=150)
+        self.runner, base_url = await serve_async(self.registry)
+        self.client = pep.AsyncPDSRegistryClient(base_url)
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_async_raw_iteration(self):
+        records = [p async for p in pep.AsyncProducts(self.client).raw()]
+
+        assert len(records) == 150
+        assert all(isinstance(p, RawProduct) for p in records)
+
+
+if __name__ == "__main__":
+    unittest.main()
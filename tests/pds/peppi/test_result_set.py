@@ -0,0 +1,93 @@
+import threading
+import time
+import unittest
+
+import pds.peppi as pep
+
+from .fake_registry import FakeRegistry
+
+
+class PrefetchTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+
+    def test_prefetch_yields_same_products(self):
+        expected = [p.id for p in pep.Products(self.client)]
+        prefetched = [p.id for p in pep.Products(self.client, prefetch=2)]
+
+        assert len(expected) == 250
+        assert prefetched == expected
+
+    def test_prefetch_fetches_ahead(self):
+        products = pep.Products(self.client, prefetch=2)
+        iterator = iter(products)
+        next(iterator)
+
+        # The consumer only needs the first page, the fetcher keeps the next ones in flight
+        deadline = time.time() + 5
+        while len(self.registry.requests) < 3 and time.time() < deadline:
+            time.sleep(0.01)
+
+        assert len(self.registry.requests) == 3
+        iterator.close()
+
+    def test_prefetch_cancelled_on_break(self):
+        products = pep.Products(self.client, prefetch=1)
+
+        for _ in products:
+            break
+
+        assert products._result_set._prefetcher is None
+        assert all(t.name != "peppi-prefetch" or not t.is_alive() for t in self._wait_for_fetchers())
+
+    def test_prefetch_cancelled_on_reset(self):
+        products = pep.Products(self.client, prefetch=2)
+        df = products.as_dataframe(max_rows=10)
+
+        assert len(df) == 10
+        assert products._result_set._prefetcher is None
+        assert products._result_set._page_counter is None
+
+    def test_prefetch_resumes_after_break(self):
+        products = pep.Products(self.client, prefetch=2)
+        ids = []
+
+        for p in products:
+            ids.append(p.id)
+            if len(ids) == 42:
+                break
+
+        ids.extend(p.id for p in products)
+
+        assert ids == [p["id"] for p in self.registry.products]
+
+    def test_prefetch_propagates_errors(self):
+        self.registry.products = None
+        products = pep.Products(self.client, prefetch=2)
+
+        with self.assertRaises(TypeError):
+            for _ in products:
+                pass
+
+    def test_invalid_prefetch(self):
+        with self.assertRaises(ValueError):
+            pep.Products(self.client, prefetch=-1)
+
+    @staticmethod
+    def _wait_for_fetchers():
+        deadline = time.time() + 5
+        while time.time() < deadline:
+            fetchers = [t for t in threading.enumerate() if t.name == "peppi-prefetch"]
+            if not fetchers:
+                break
+            time.sleep(0.05)
+
+        return threading.enumerate()
+
+
+if __name__ == "__main__":
+    unittest.main()
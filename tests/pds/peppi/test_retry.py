@@ -0,0 +1,143 @@
+import importlib.util
+import unittest
+from datetime import datetime
+from datetime import timezone
+from email.utils import format_datetime
+from unittest import mock
+
+import pds.peppi as pep
+import urllib3
+from pds.api_client.api.all_products_api import AllProductsApi
+from pds.api_client.exceptions import ApiException
+from pds.api_client.exceptions import NotFoundException
+from pds.api_client.exceptions import ServiceException
+from pds.peppi.retry import RetryPolicy
+
+from .fake_registry import FakeRegistry
+from .fake_registry import serve_async
+
+
+def _error(status, headers=None):
+    error = ApiException(status=status, reason="Error")
+    error.headers = headers
+    return error
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+    def test_retryable_errors(self):
+        policy = RetryPolicy()
+
+        assert policy.is_retryable(_error(503))
+        assert policy.is_retryable(_error(429))
+        assert policy.is_retryable(urllib3.exceptions.ReadTimeoutError(None, "/products", "timed out"))
+        assert policy.is_retryable(ConnectionResetError())
+        assert not policy.is_retryable(_error(400))
+        assert not policy.is_retryable(ValueError())
+
+    def test_exponential_backoff_with_jitter(self):
+        policy = RetryPolicy(backoff_factor=1.0, max_backoff=5.0)
+
+        with mock.patch("random.uniform", side_effect=lambda low, high: high):
+            assert [policy.next_delay(_error(503), attempt, 0.0) for attempt in range(4)] == [1.0, 2.0, 4.0, 5.0]
+
+    def test_retry_after(self):
+        policy = RetryPolicy(backoff_factor=0.1)
+
+        assert policy.next_delay(_error(429, {"Retry-After": "7"}), 0, 0.0) == 7.0
+
+        retry_at = format_datetime(datetime.now(timezone.utc), usegmt=True)
+        assert policy.next_delay(_error(503, {"retry-after": retry_at}), 0, 0.0) <= 0.1
+
+    def test_limits(self):
+        policy = RetryPolicy(max_retries=2, max_retry_time=10.0)
+
+        assert policy.next_delay(_error(503), 2, 0.0) is None
+        assert policy.next_delay(_error(503, {"Retry-After": "30"}), 0, 0.0) is None
+        assert policy.next_delay(_error(503), 0, 10.0) is None
+
+
+class RetryPaginationTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sleep_patcher = mock.patch("time.sleep")
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def test_retry_resumes_from_same_cursor(self):
+        self.registry.failures = {1: (503, None), 2: (502, None)}
+        client = pep.PDSRegistryClient(retry_policy=RetryPolicy(max_retries=3))
+
+        ids = [p.id for p in pep.Products(client)]
+
+        assert ids == [p["id"] for p in self.registry.products]
+        cursors = [r["search_after"] for r in self.registry.requests]
+        assert cursors[1] == cursors[2] == cursors[3]
+        assert len(self.registry.requests) == 5
+        assert self.sleep.call_count == 2
+
+    def test_retry_after_honored(self):
+        self.registry.failures = {0: (429, {"Retry-After": "3"})}
+        client = pep.PDSRegistryClient(retry_policy=RetryPolicy(backoff_factor=0.01))
+
+        assert len(list(pep.Products(client))) == 250
+        self.sleep.assert_called_once_with(3.0)
+
+    def test_retries_exhausted(self):
+        self.registry.failures = {i: (503, None) for i in range(1, 10)}
+        client = pep.PDSRegistryClient(retry_policy=RetryPolicy(max_retries=2))
+
+        with self.assertRaises(ServiceException):
+            list(pep.Products(client))
+
+        assert self.sleep.call_count == 2
+
+    def test_client_errors_not_retried(self):
+        self.registry.failures = {0: (404, None)}
+
+        with self.assertRaises(NotFoundException):
+            list(pep.Products(pep.PDSRegistryClient()))
+
+        self.sleep.assert_not_called()
+
+    def test_retries_disabled(self):
+        self.registry.failures = {0: (503, None)}
+
+        with self.assertRaises(ServiceException):
+            list(pep.Products(pep.PDSRegistryClient(retry_policy=None)))
+
+    def test_timeouts_and_pool_size(self):
+        client = pep.PDSRegistryClient(pool_size=32, connect_timeout=3.0, read_timeout=30.0)
+
+        list(pep.Products(client).fields(["lid"]))
+
+        assert client.api_client.configuration.connection_pool_maxsize == 32
+        assert client.api_client.rest_client.pool_manager.connection_pool_kw["maxsize"] == 32
+        call = AllProductsApi.product_list_without_preload_content.call_args
+        assert call.kwargs["_request_timeout"] == (3.0, 30.0)
+
+
+@unittest.skipUnless(importlib.util.find_spec("aiohttp"), "aiohttp is not installed")
+class AsyncRetryTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.registry = FakeRegistry(n_products=250)
+        self.runner, base_url = await serve_async(self.registry)
+        self.client = pep.AsyncPDSRegistryClient(base_url, retry_policy=RetryPolicy(backoff_factor=0.01))
+
+    async def asyncTearDown(self) -> None:
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_retry_resumes_from_same_cursor(self):
+        self.registry.failures = {1: (503, {"Retry-After": "0"})}
+
+        ids = [p.id async for p in pep.AsyncProducts(self.client)]
+
+        assert ids == [p["id"] for p in self.registry.products]
+        assert self.registry.requests[1]["search_after"] == self.registry.requests[2]["search_after"]
+
+
+if __name__ == "__main__":
+    unittest.main()
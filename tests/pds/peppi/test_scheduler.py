@@ -0,0 +1,137 @@
+import threading
+import time
+import unittest
+from concurrent.futures import CancelledError
+from unittest import mock
+
+import pds.peppi as pep
+from pds.api_client.exceptions import BadRequestException
+from pds.peppi.scheduler import QueryScheduler
+
+from .fake_registry import FakeRegistry
+
+
+class QuerySchedulerTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=2000)
+        self.latency = 0.0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        patcher = mock.patch(
+            "pds.api_client.api.all_products_api.AllProductsApi.product_list_without_preload_content",
+            autospec=True,
+            side_effect=self._response,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+        self.scheduler = QueryScheduler(max_workers=2)
+        self.addCleanup(self.scheduler.shutdown)
+
+    def _response(self, _api, **kwargs):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        time.sleep(self.latency)
+
+        with self._lock:
+            self.in_flight -= 1
+
+        return self.registry.response(**kwargs)
+
+    def _requests_of(self, query):
+        return [i for i, r in enumerate(self.registry.requests) if r["q"] == f"({query._q_string})"]
+
+    def test_stream_and_result(self):
+        stream = self.scheduler.submit(pep.Products(self.client).observationals().limit(450))
+        collected = self.scheduler.submit(pep.Products(self.client).bundles(), max_buffered_pages=None)
+
+        assert [p.id for p in stream] == [p["id"] for p in self.registry.products[:450]]
+        assert len(collected.result(timeout=10)) == 2000
+        assert stream.done() and collected.done()
+
+    def test_high_priority_served_first(self):
+        self.latency = 0.02
+        scheduler = QueryScheduler(max_workers=1)
+        self.addCleanup(scheduler.shutdown)
+        exports = [pep.Products(self.client).observationals(), pep.Products(self.client).collections()]
+        lookup = pep.Products(self.client).bundles().limit(300)
+
+        handles = [scheduler.submit(e, priority="low", max_buffered_pages=None) for e in exports]
+        assert len(scheduler.submit(lookup, priority="high").result()) == 300
+
+        # One page of each export was in flight, or dispatched at the same virtual time, before the lookup
+        assert self._requests_of(lookup) == [1, 2, 3] or self._requests_of(lookup) == [2, 3, 4]
+        assert all(len(h.result()) == 2000 for h in handles)
+
+    def test_fair_share(self):
+        self.latency = 0.005
+        scheduler = QueryScheduler(max_workers=1, priorities={"a": 3.0, "b": 1.0})
+        self.addCleanup(scheduler.shutdown)
+        a = pep.Products(self.client).observationals()
+        b = pep.Products(self.client).bundles()
+
+        handles = [scheduler.submit(q, priority=p, max_buffered_pages=None) for q, p in ((a, "a"), (b, "b"))]
+        for handle in handles:
+            handle.result()
+
+        # "a" gets 3 pages for each page of "b"
+        assert len([i for i in self._requests_of(a) if i < 20]) == 15
+
+    def test_bounded_workers(self):
+        self.latency = 0.01
+        handles = [
+            self.scheduler.submit(pep.Products(self.client).filter(f'lid eq "{i}"'), max_buffered_pages=None)
+            for i in range(6)
+        ]
+
+        assert all(len(h.result()) == 2000 for h in handles)
+        assert self.max_in_flight == 2
+
+    def test_backpressure(self):
+        handle = self.scheduler.submit(pep.Products(self.client), max_buffered_pages=2)
+        time.sleep(0.2)
+
+        assert len(self.registry.requests) == 2
+        assert len(list(handle)) == 2000
+
+    def test_cancel(self):
+        handle = self.scheduler.submit(pep.Products(self.client), max_buffered_pages=1)
+        next(iter(handle))
+        handle.cancel()
+
+        assert handle.done()
+        with self.assertRaises(CancelledError):
+            list(handle)
+
+    def test_error(self):
+        self.registry.failures = {0: (400, None)}
+        handle = self.scheduler.submit(pep.Products(self.client))
+
+        with self.assertRaises(BadRequestException):
+            list(handle)
+
+        assert handle.done()
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(pep.Products(self.client), priority="urgent")
+
+        with self.assertRaises(ValueError):
+            self.scheduler.submit(pep.Products(self.client).parallel())
+
+    def test_shutdown(self):
+        handle = self.scheduler.submit(pep.Products(self.client), max_buffered_pages=1)
+        self.scheduler.shutdown()
+
+        with self.assertRaises(CancelledError):
+            list(handle)
+
+        with self.assertRaises(RuntimeError):
+            self.scheduler.submit(pep.Products(self.client))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+
+import pds.peppi as pep
+
+from .fake_registry import FakeRegistry
+from .fake_registry import harvest_range_matcher
+from .fake_registry import make_product
+
+
+class ShardedResultSetTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        # Products harvested in bursts, so that equal time ranges hold very different hit counts
+        products = [make_product(i) for i in range(150)] + [make_product(10**6 + i) for i in range(350)]
+        self.registry = FakeRegistry(products=products, matcher=harvest_range_matcher)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+
+    def test_ordered(self):
+        expected = [p.id for p in pep.Products(self.client)]
+        sharded = [p.id for p in pep.Products(self.client).parallel(shards=4)]
+
+        assert len(expected) == 500
+        assert sharded == expected
+
+    def test_unordered(self):
+        expected = [p.id for p in pep.Products(self.client)]
+        sharded = [p.id for p in pep.Products(self.client).parallel(shards=3, ordered=False, max_workers=2)]
+
+        assert sorted(sharded) == sorted(expected)
+
+    def test_shards_are_disjoint_and_balanced(self):
+        products = pep.Products(self.client).parallel(shards=4)
+        result_set = products._result_set
+        shards = result_set._plan_shards("", result_set._executor or _SerialExecutor())
+
+        assert len(shards) == 4
+        assert shards[0][0] is None and shards[-1][1] is None
+        assert all(shards[i][1] == shards[i + 1][0] for i in range(3))
+
+        counts = [result_set._count_hits(result_set._shard_query("", *shard)) for shard in shards]
+        assert sum(counts) == 500
+        assert max(counts) <= 2 * 500 // 4
+
+    def test_break_and_iterate_again(self):
+        products = pep.Products(self.client).parallel(shards=4)
+
+        for i, _ in enumerate(products):
+            if i == 10:
+                break
+
+        assert products._result_set._executor is None
+        assert len(list(products)) == 500
+
+    def test_empty_query(self):
+        self.registry.products = []
+        assert list(pep.Products(self.client).parallel(shards=4)) == []
+
+    def test_server_page_size_cap(self):
+        product_list = self.registry.product_list
+
+        def capped_product_list(limit=None, **kwargs):
+            return product_list(limit=min(limit, 7) if limit else limit, **kwargs)
+
+        self.registry.product_list = capped_product_list
+        sharded = [p.id for p in pep.Products(self.client).parallel(shards=4)]
+
+        assert len(sharded) == 500
+        assert len(set(sharded)) == 500
+
+    def test_invalid_shards(self):
+        with self.assertRaises(ValueError):
+            pep.Products(self.client).parallel(shards=0)
+
+
+class _SerialExecutor:
+    @staticmethod
+    def map(fn, iterable):
+        return map(fn, iterable)
+
+
+if __name__ == "__main__":
+    unittest.main()
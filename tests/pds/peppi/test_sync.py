@@ -0,0 +1,86 @@
+import importlib.util
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+import pds.peppi as pep
+
+from .fake_registry import FakeRegistry
+from .fake_registry import harvest_range_matcher
+from .fake_registry import make_product
+
+
+class SyncTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.registry = FakeRegistry(n_products=150, matcher=harvest_range_matcher)
+        patcher = self.registry.patch()
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = pep.PDSRegistryClient()
+
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.tmp_dir = tmp_dir.name
+        self.state = pep.SyncState(os.path.join(self.tmp_dir, "sync.json"))
+
+    def test_sync_only_new_products(self):
+        first = [p.id for p in pep.Products(self.client).sync("all", self.state)]
+        assert len(first) == 150
+
+        checkpoint = self.state.get("all")
+        assert checkpoint.lidvids == [first[-1]]
+
+        # A new product, and another one harvested at the same time as the latest synchronized one
+        tie = make_product(149)
+        tie["id"] = tie["properties"]["lidvid"][0] = "urn:nasa:pds:fake:data:tie::1.0"
+        self.registry.products += [tie, make_product(200)]
+
+        second = [p.id for p in pep.Products(self.client).sync("all", self.state)]
+        assert second == ["urn:nasa:pds:fake:data:tie::1.0", "urn:nasa:pds:fake:data:product_000200::1.0"]
+
+        third = list(pep.Products(self.client).sync("all", self.state))
+        assert third == []
+
+    def test_abandoned_sync_not_recorded(self):
+        for _ in pep.Products(self.client).sync("all", self.state):
+            break
+
+        assert self.state.get("all") is None
+
+    def test_sync_dataframe(self):
+        df = pep.Products(self.client).sync_dataframe("all", self.state)
+        assert len(df) == 150
+
+        updated = make_product(0, product_class="Product_Updated")
+        updated["properties"]["ops:Harvest_Info.ops:harvest_date_time"] = make_product(300)["properties"][
+            "ops:Harvest_Info.ops:harvest_date_time"
+        ]
+        self.registry.products += [make_product(250), updated]
+
+        df = pep.Products(self.client).sync_dataframe("all", self.state, df=df)
+        assert len(df) == 151
+        assert df.loc["urn:nasa:pds:fake:data:product_000000::1.0", "product_class"] == "Product_Updated"
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow is not installed")
+    def test_sync_parquet(self):
+        path = os.path.join(self.tmp_dir, "dataset")
+        assert pep.Products(self.client).sync_parquet("all", self.state, path) is not None
+        assert pep.Products(self.client).sync_parquet("all", self.state, path) is None
+
+        self.registry.products.append(make_product(500))
+        pep.Products(self.client).sync_parquet("all", self.state, path)
+
+        assert len(os.listdir(path)) == 2
+        assert len(pd.read_parquet(path)) == 151
+
+    def test_forget(self):
+        list(pep.Products(self.client).sync("all", self.state))
+        assert self.state.names() == ["all"]
+
+        self.state.forget("all")
+        assert len(list(pep.Products(self.client).sync("all", self.state))) == 150
+
+
+if __name__ == "__main__":
+    unittest.main()